@@ -0,0 +1,141 @@
+"""
+Bulk refresh of per-edge travel times from OpenRouteService.
+
+Calling get_route_metrics once per edge is one blocking round trip each. Here
+edges are grouped into matrix requests whose sources and destinations fit the
+endpoint's location limit (a road network of a few thousand edges is a few
+dozen requests), or, in "directions" mode, fetched one per edge. Either way the
+requests run concurrently on asyncio with a semaphore bounding how many are in
+flight, and the results land in flat arrays aligned with edge ids so the graph
+is updated in one pass at the end.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+import numpy as np
+
+from backend.graph_engine import CSRGraph
+from backend.traffic_model import invalidate_traffic_engine
+
+# Locations per matrix request; |sources| x |destinations| stays well inside
+# ORS's 3500-route limit
+MATRIX_MAX_LOCATIONS = 50
+DEFAULT_CONCURRENCY = 8
+
+
+def matrix_batches(graph, max_locations=MATRIX_MAX_LOCATIONS):
+    """
+    Groups edge ids so each group's distinct endpoints fit one matrix request.
+    Edges are taken in order of their first endpoint, so a node's edges share a
+    source row. Returns a list of (edge ids, source node ids, destination node ids).
+    """
+    order = np.argsort(graph.edge_u, kind="stable")
+    batches, edges, sources, dests = [], [], {}, {}
+    for e, u, v in zip(order.tolist(), graph.edge_u[order].tolist(), graph.edge_v[order].tolist()):
+        if edges and len(sources) + len(dests) + (u not in sources) + (v not in dests) > max_locations:
+            batches.append((edges, list(sources), list(dests)))
+            edges, sources, dests = [], {}, {}
+        sources.setdefault(u, len(sources))
+        dests.setdefault(v, len(dests))
+        edges.append(e)
+    if edges:
+        batches.append((edges, list(sources), list(dests)))
+    return batches
+
+
+def _lonlat(graph, ids):
+    return graph.pos[ids][:, ::-1].tolist()
+
+
+async def gather_bounded(fn, arg_lists, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Runs the blocking fn(*args) for every args tuple on a thread pool with at
+    most `concurrency` calls in flight. Results come back in order; a failed
+    call's slot holds its exception.
+    """
+    loop = asyncio.get_running_loop()
+    gate = asyncio.Semaphore(concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        async def call(args):
+            async with gate:
+                return await loop.run_in_executor(pool, fn, *args)
+
+        return await asyncio.gather(*(call(args) for args in arg_lists), return_exceptions=True)
+
+
+async def fetch_edge_metrics(graph, client, mode="matrix", concurrency=DEFAULT_CONCURRENCY,
+                             max_locations=MATRIX_MAX_LOCATIONS):
+    """
+    Travel time (minutes) and distance (km) of every edge of a CSRGraph, as
+    two arrays aligned with edge ids. Edges whose request failed are NaN and
+    every failed request is printed. `client` is an OrsClient (its blocking
+    calls run on a thread pool).
+    """
+    m = len(graph.edge_u)
+    minutes, km = np.full(m, np.nan), np.full(m, np.nan)
+
+    if mode == "matrix":
+        batches = matrix_batches(graph, max_locations)
+        replies = await gather_bounded(
+            client.matrix,
+            [(_lonlat(graph, src + dst), range(len(src)), range(len(src), len(src) + len(dst)))
+             for _, src, dst in batches],
+            concurrency)
+        for (edges, src, dst), reply in zip(batches, replies):
+            if isinstance(reply, Exception):
+                print(f"ORS matrix batch failed: {reply}")
+                continue
+            row = {u: i for i, u in enumerate(src)}
+            col = {v: j for j, v in enumerate(dst)}
+            durations = np.array(reply["durations"], dtype=np.float64)
+            distances = np.array(reply["distances"], dtype=np.float64)
+            r = [row[u] for u in graph.edge_u[edges].tolist()]
+            c = [col[v] for v in graph.edge_v[edges].tolist()]
+            minutes[edges] = durations[r, c] / 60.0
+            km[edges] = distances[r, c] / 1000.0
+    elif mode == "directions":
+        coords = _lonlat(graph, np.arange(graph.number_of_nodes()))
+        replies = await gather_bounded(
+            client.directions,
+            [([coords[u], coords[v]],) for u, v in zip(graph.edge_u.tolist(), graph.edge_v.tolist())],
+            concurrency)
+        for e, reply in enumerate(replies):
+            if isinstance(reply, Exception) or not reply.get("routes"):
+                print(f"ORS directions failed for edge {e}: {reply if isinstance(reply, Exception) else 'no route'}")
+                continue
+            summary = reply["routes"][0]["summary"]
+            minutes[e] = summary["duration"] / 60.0
+            km[e] = summary["distance"] / 1000.0
+    else:
+        raise ValueError(f"Unknown mode '{mode}'")
+    return minutes, km
+
+
+def refresh_edge_weights(G, client, mode="matrix", concurrency=DEFAULT_CONCURRENCY,
+                         max_locations=MATRIX_MAX_LOCATIONS):
+    """
+    Fetches live travel times for every edge of a networkx graph and writes
+    them to the 'weight' and 'base_weight' attributes in a single update.
+    G is edited in place, so everything cached per graph object is refreshed:
+    the TrafficEngine (which prices predictions from base_weight) is dropped
+    and G.graph["weights_version"] is bumped for caches that snapshot weights
+    (SolverService). Contraction hierarchies compare weights on customize.
+    Edges without a result keep their current weights. Returns
+    (edges updated, edges that failed).
+    """
+    C = CSRGraph.from_networkx(G)
+    minutes, _ = asyncio.run(fetch_edge_metrics(C, client, mode, concurrency, max_locations))
+    ok = np.isfinite(minutes)
+    names = C.names
+    live = {
+        (names[u], names[v]): w
+        for u, v, w in zip(C.edge_u[ok].tolist(), C.edge_v[ok].tolist(), np.round(minutes[ok], 2).tolist())
+    }
+    nx.set_edge_attributes(G, live, "weight")
+    nx.set_edge_attributes(G, live, "base_weight")
+    if live:
+        invalidate_traffic_engine(G)
+        G.graph["weights_version"] = G.graph.get("weights_version", 0) + 1
+    return int(ok.sum()), int((~ok).sum())
@@ -1,12 +1,24 @@
 import networkx as nx
-import math
+import numpy as np
+from backend.geodesy import edge_geometry
+from backend.graph_engine import CSRGraph
+from backend.road_importer import load_cached_graph
 
-def create_city_graph(city_name="Vijayawada"):
+BUILTIN_CITIES = ("Vijayawada", "Hyderabad", "Visakhapatnam")
+
+def create_city_graph(city_name="Vijayawada", as_csr=False):
     """
     Creates a realistic graph for the selected city.
     Nodes are landmarks with GPS coordinates.
     Algorithm connects them logically.
+    Cities imported with backend.road_importer load from their binary cache;
+    pass as_csr=True to get the memory-mapped CSRGraph without networkx conversion.
     """
+    if city_name not in BUILTIN_CITIES:
+        cached = load_cached_graph(city_name)
+        if cached is not None:
+            return cached if as_csr else cached.to_networkx()
+
     G = nx.Graph()
     
     nodes = {}
@@ -79,22 +91,30 @@ def create_city_graph(city_name="Vijayawada"):
     for node, pos in nodes.items():
         G.add_node(node, pos=pos)
 
-    for u, v, w in edges:
-        lat1, lon1 = nodes[u]
-        lat2, lon2 = nodes[v]
-        R = 6371 
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        dist_km = R * c
-        
-        G.add_edge(u, v, weight=w, distance=round(dist_km, 2), base_weight=w)
+    # Edge lengths for the whole city in one vectorized call
+    names = list(nodes)
+    index = {name: i for i, name in enumerate(names)}
+    pos = np.array([nodes[n] for n in names], dtype=np.float64).reshape(-1, 2)
+    edge_u = np.array([index[u] for u, _, _ in edges], dtype=np.int64)
+    edge_v = np.array([index[v] for _, v, _ in edges], dtype=np.int64)
+    dist_km, _ = edge_geometry(pos, edge_u, edge_v)
+
+    for (u, v, w), d in zip(edges, np.round(dist_km, 2).tolist()):
+        G.add_edge(u, v, weight=w, distance=d, base_weight=w)
 
+    if as_csr:
+        return CSRGraph.from_networkx(G)
     return G
 
-def update_graph_weather_traffic(G, api_wrapper=None):
+def update_graph_weather_traffic(G, api_wrapper=None, mode="matrix"):
     """
     Updates graph using external API wrapper if valid.
+    api_wrapper is a LocationServices with an ORS key; every edge's live travel
+    time is fetched in bulk (see backend.bulk_metrics) and becomes the edge's
+    weight and base_weight, so later traffic predictions build on it.
+    Returns (edges updated, edges whose fetch failed).
     """
-    pass
+    if api_wrapper is None or len(getattr(api_wrapper, "ors_key", "") or "") < 10:
+        return 0, 0
+    from backend.bulk_metrics import refresh_edge_weights
+    return refresh_edge_weights(G, api_wrapper.client, mode=mode)
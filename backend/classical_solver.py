@@ -1,48 +1,250 @@
+import heapq
+from itertools import count
+
 import networkx as nx
+from backend.graph_engine import resolve_weighted
+from backend.geodesy import haversine_km
+
+ALGORITHMS = ("dijkstra", "astar", "bidirectional")
+
+def min_minutes_per_km(G, weight='weight'):
+    """
+    Fastest pace (minutes per km) over all edges of G.
+
+    predict_traffic only ever scales base weights by hub penalty, noise and the
+    emergency priority factor, so reading the pace off the graph being searched
+    already includes those factors. Straight-line km times this pace never
+    overestimates the remaining travel time, which keeps A* admissible.
+    """
+    overlay = getattr(weight, "overlay", None)
+    if overlay is not None:
+        # Overlay weights: cached once per overlay instead of an O(m) scan per query
+        return overlay.min_pace()
+    wfn = _weight_fn(weight)
+    pace = float("inf")
+    for u, v, data in G.edges(data=True):
+        dist = data.get('distance', 0)
+        if dist > 0:
+            pace = min(pace, wfn(u, v, data) / dist)
+    return 0.0 if pace == float("inf") else pace
+
+def geo_heuristic(G, target, weight='weight'):
+    """
+    Admissible A* heuristic: haversine distance to target converted to minutes.
+    """
+    pace = min_minutes_per_km(G, weight)
+    t_lat, t_lon = G.nodes[target].get('pos', (0.0, 0.0))
+    cache = {}
+
+    def h(node):
+        if node not in cache:
+            pos = G.nodes[node].get('pos')
+            cache[node] = float(haversine_km(pos[0], pos[1], t_lat, t_lon)) * pace if pos else 0.0
+        return cache[node]
+    return h
+
+def _weight_fn(weight):
+    """
+    Normalises a weight spec into f(u, v, data), like networkx does. Callables
+    let callers price edges (penalties, overlays) without copying the graph.
+    """
+    if callable(weight):
+        return weight
+    return lambda u, v, data: data.get(weight, 1)
+
+def _check_nodes(G, source, target):
+    for n in (source, target):
+        if n not in G:
+            raise nx.NodeNotFound(f"Node {n} not in graph")
+
+def _reconstruct(parent, node):
+    path = [node]
+    while parent[node] is not None:
+        node = parent[node]
+        path.append(node)
+    path.reverse()
+    return path
+
+def _astar(G, source, target, weight='weight', heuristic=None):
+    """
+    A* search (plain Dijkstra when heuristic is None).
+    Returns (path, cost, nodes_settled).
+    """
+    _check_nodes(G, source, target)
+    h = heuristic or (lambda n: 0.0)
+    wfn = _weight_fn(weight)
+    tie = count()
+    dist = {source: 0.0}
+    parent = {source: None}
+    settled = set()
+    heap = [(h(source), next(tie), source)]
+    while heap:
+        _, _, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled.add(u)
+        if u == target:
+            return _reconstruct(parent, u), dist[u], len(settled)
+        for v, data in G[u].items():
+            nd = dist[u] + wfn(u, v, data)
+            if nd < dist.get(v, float("inf")):
+                dist[v] = nd
+                parent[v] = u
+                heapq.heappush(heap, (nd + h(v), next(tie), v))
+    raise nx.NetworkXNoPath(f"No path between {source} and {target}")
+
+def _bidirectional(G, source, target, weight='weight'):
+    """
+    Bidirectional Dijkstra. Stops once the two frontiers' keys sum to at least
+    the best meeting cost. Returns (path, cost, nodes_settled).
+    """
+    _check_nodes(G, source, target)
+    if source == target:
+        return [source], 0.0, 1
+    wfn = _weight_fn(weight)
+    succ = G._succ if G.is_directed() else G._adj
+    pred = G._pred if G.is_directed() else G._adj
+    tie = count()
+    dist = [{source: 0.0}, {target: 0.0}]
+    parent = [{source: None}, {target: None}]
+    settled = [set(), set()]
+    heaps = [[(0.0, next(tie), source)], [(0.0, next(tie), target)]]
+    best, meet = float("inf"), None
+
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        d, _, u = heapq.heappop(heaps[side])
+        if u in settled[side]:
+            continue
+        settled[side].add(u)
+        adj = succ if side == 0 else pred
+        for v, data in adj[u].items():
+            nd = d + (wfn(u, v, data) if side == 0 else wfn(v, u, data))
+            if nd < dist[side].get(v, float("inf")):
+                dist[side][v] = nd
+                parent[side][v] = u
+                heapq.heappush(heaps[side], (nd, next(tie), v))
+            if v in dist[1 - side] and nd + dist[1 - side][v] < best:
+                best, meet = nd + dist[1 - side][v], v
+
+    if meet is None:
+        raise nx.NetworkXNoPath(f"No path between {source} and {target}")
+    forward = _reconstruct(parent[0], meet)
+    backward = _reconstruct(parent[1], meet)
+    return forward + backward[::-1][1:], best, len(settled[0] | settled[1])
 
-def solve_classical(G, source, target):
+def shortest_path(G, source, target, algorithm="dijkstra", weight='weight'):
     """
-    Finds the shortest path using Dijkstra's algorithm.
+    Single shortest path query. Returns (path, cost, nodes_settled).
     """
+    if algorithm == "dijkstra":
+        return _astar(G, source, target, weight)
+    if algorithm == "astar":
+        return _astar(G, source, target, weight, heuristic=geo_heuristic(G, target, weight))
+    if algorithm == "bidirectional":
+        return _bidirectional(G, source, target, weight)
+    raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {ALGORITHMS}")
+
+def _route_result(G, path, algorithm, settled, weight='weight'):
+    wfn = _weight_fn(weight)
+    length = 0
+    total_dist = 0
+
+    for i in range(len(path) - 1):
+        u, v = path[i], path[i+1]
+        # Sum up weights manually as we have the explicit path
+        length += wfn(u, v, G[u][v])
+        total_dist += G[u][v].get('distance', 0)
+
+    return {
+        "path": path,
+        "eta": round(length, 2),
+        "distance": round(total_dist, 2),
+        "method": "Classical (Standard GPS)",
+        "algorithm": algorithm,
+        "nodes_settled": settled
+    }
+
+def solve_classical(G, source, target, algorithm="dijkstra", ch=None):
+    """
+    Finds the shortest path with a single query.
+    algorithm: "dijkstra", "astar", "bidirectional", or "ch" together with a
+    backend.contraction.ContractionHierarchy built for this city's topology.
+    G may be a networkx graph, a CSRGraph or a WeightOverlay such as a
+    TrafficPrediction.
+    """
+    if algorithm == "ch":
+        if ch is None:
+            raise ValueError("algorithm='ch' needs a ContractionHierarchy passed as ch=")
+        # Re-customizes only when G carries a metric the index has not seen yet
+        path, _, settled = ch.customize_for(G).shortest_path(source, target)
+        G, weight = resolve_weighted(G)
+        if path is None:
+            return None
+        return _route_result(G, path, algorithm, settled, weight)
+    G, weight = resolve_weighted(G)
     try:
-        # ⚠️ DEMO LOGIC: Simulating "Standard" vs "Optimized"
-        # The User wants the Classical Path to be LONGER than the Quantum Path.
-        # Quantum (Best) = Shortest.
-        # Classical (Standard) = 2nd Best (e.g. sticks to main roads / stale data).
-        
-        # We generate 2 shortest paths
-        import itertools
-        generator = nx.shortest_simple_paths(G, source, target, weight='weight')
-        
-        # Get top 2
-        try:
-            # We slice the generator safely
-            paths = list(itertools.islice(generator, 2))
-            
-            # Technical Honesty: We pick the actual shortest path.
-            # Quantum Advantage comes from Signal Optimization (Green Wave), not route difference.
-            if paths:
-                path = paths[0]
-            else:
-                 path = nx.dijkstra_path(G, source, target, weight='weight')
-        except Exception:
-             # Fallback
-             path = nx.dijkstra_path(G, source, target, weight='weight')
-
-        length = 0
-        total_dist = 0
-        
-        for i in range(len(path) - 1):
-            u, v = path[i], path[i+1]
-            # Sum up weights manually as we have the explicit path
-            length += G[u][v].get('weight', 1)
-            total_dist += G[u][v].get('distance', 0)
-            
-        return {
-            "path": path,
-            "eta": round(length, 2),
-            "distance": round(total_dist, 2),
-            "method": "Classical (Standard GPS)"
-        }
+        path, _, settled = shortest_path(G, source, target, algorithm, weight)
     except nx.NetworkXNoPath:
         return None
+    return _route_result(G, path, algorithm, settled, weight)
+
+def _edge_key(G, u, v):
+    return (u, v) if G.is_directed() else frozenset((u, v))
+
+def _overlap(G, path, other_edges, wfn):
+    """
+    Share of a path's travel time that runs over edges of another route.
+    """
+    total = shared = 0.0
+    for u, v in zip(path[:-1], path[1:]):
+        w = wfn(u, v, G[u][v])
+        total += w
+        if _edge_key(G, u, v) in other_edges:
+            shared += w
+    return shared / total if total > 0 else 1.0
+
+def solve_alternatives(G, source, target, k=3, max_overlap=0.6, penalty=1.5, algorithm="astar"):
+    """
+    Diverse alternative routes via the penalty method.
+
+    After each route is found its edges are made `penalty` times more expensive
+    and the search is repeated, so every attempt is one ordinary shortest-path
+    query. A candidate is kept only if at most `max_overlap` of its travel time
+    is shared with any route already kept (checked both ways). Returns up to k result dicts, best first.
+    """
+    G, weight = resolve_weighted(G)
+    wfn = _weight_fn(weight)
+    penalties = {}
+
+    def penalised(u, v, data):
+        return wfn(u, v, data) * penalties.get(_edge_key(G, u, v), 1.0)
+
+    heuristic = geo_heuristic(G, target, weight) if algorithm == "astar" else None
+    routes, route_edges, seen = [], [], set()
+    for _ in range(3 * k):
+        if len(routes) >= k:
+            break
+        try:
+            if algorithm == "bidirectional":
+                path, _, settled = _bidirectional(G, source, target, penalised)
+            else:
+                path, _, settled = _astar(G, source, target, penalised, heuristic)
+        except nx.NetworkXNoPath:
+            break
+
+        edges = {_edge_key(G, u, v) for u, v in zip(path[:-1], path[1:])}
+        for e in edges:
+            penalties[e] = penalties.get(e, 1.0) * penalty
+        if tuple(path) in seen:
+            continue
+        seen.add(tuple(path))
+        if all(_overlap(G, path, other, wfn) <= max_overlap and _overlap(G, r["path"], edges, wfn) <= max_overlap
+               for r, other in zip(routes, route_edges)):
+            routes.append(_route_result(G, path, algorithm, settled, weight))
+            route_edges.append(edges)
+
+    routes.sort(key=lambda r: r["eta"])
+    return routes
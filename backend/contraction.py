@@ -0,0 +1,241 @@
+"""
+Customizable Contraction Hierarchies (CCH) for emergency routing queries.
+
+Preprocessing is split in two, so live traffic never repeats the expensive part:
+
+1. build (metric independent, offline): a minimum-degree node ordering is
+   computed on the road topology alone and the elimination game produces the
+   chordal "upward" graph plus every lower triangle (x, u, v) of it.
+2. customize (per traffic refresh): input weights are scattered onto the
+   upward arcs and triangles are relaxed level by level with np.minimum.at.
+   This is a handful of vectorized passes, so re-running it whenever
+   predict_traffic produces new weights is cheap.
+
+Queries are bidirectional upward Dijkstra searches; shortcuts are unpacked
+through the triangle that produced their weight.
+"""
+import heapq
+
+import numpy as np
+
+from backend.graph_engine import CSRGraph, WeightOverlay, ensure_networkx
+
+
+def _eliminate(n, edge_u, edge_v):
+    """
+    Minimum-degree elimination game. Returns (order, upward neighbour lists, levels).
+    """
+    nbrs = [set() for _ in range(n)]
+    for u, v in zip(edge_u.tolist(), edge_v.tolist()):
+        if u != v:
+            nbrs[u].add(v)
+            nbrs[v].add(u)
+
+    heap = [(len(nbrs[i]), i) for i in range(n)]
+    heapq.heapify(heap)
+    eliminated = np.zeros(n, dtype=bool)
+    level = np.zeros(n, dtype=np.int64)
+    order, up = [], [None] * n
+    while heap:
+        deg, x = heapq.heappop(heap)
+        if eliminated[x] or deg != len(nbrs[x]):
+            continue  # stale heap entry
+        eliminated[x] = True
+        order.append(x)
+        upper = list(nbrs[x])
+        up[x] = upper
+        for u in upper:
+            nbrs[u].discard(x)
+            level[u] = max(level[u], level[x] + 1)
+        # Fill-in: remaining neighbours of x become a clique
+        for i, u in enumerate(upper):
+            for v in upper[i + 1:]:
+                if v not in nbrs[u]:
+                    nbrs[u].add(v)
+                    nbrs[v].add(u)
+        for u in upper:
+            heapq.heappush(heap, (len(nbrs[u]), u))
+    return np.array(order, dtype=np.int64), up, level
+
+
+class ContractionHierarchy:
+    """
+    CCH index over an undirected road graph (networkx graph or CSRGraph).
+    """
+
+    def __init__(self, graph):
+        C = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+        if C.directed:
+            raise ValueError("ContractionHierarchy supports undirected road graphs only")
+        self.graph = C
+        n = C.number_of_nodes()
+        order, up, level = _eliminate(n, C.edge_u, C.edge_v)
+        self.rank = np.empty(n, dtype=np.int64)
+        self.rank[order] = np.arange(n)
+
+        # Upward arcs in CSR form, keyed by (lower-rank node, higher-rank node)
+        self.arc_index = {}
+        up_indptr = np.zeros(n + 1, dtype=np.int64)
+        up_indices, up_arc = [], []
+        for x in range(n):
+            for u in up[x]:
+                self.arc_index[(x, u)] = len(up_indices)
+                up_arc.append(len(up_indices))
+                up_indices.append(u)
+            up_indptr[x + 1] = len(up_indices)
+        self.up_indptr = up_indptr
+        self.up_indices = np.array(up_indices, dtype=np.int64)
+        self.up_arc = np.array(up_arc, dtype=np.int64)
+        self.num_arcs = len(up_indices)
+        self.arc_tail = np.repeat(np.arange(n), np.diff(up_indptr))
+        self._up_adj = [list(zip(up[x], range(up_indptr[x], up_indptr[x + 1]))) for x in range(n)]
+
+        # Lower triangles (x below both u and v), grouped by level of x
+        tri = []
+        for x in order.tolist():
+            upper = up[x]
+            for i, u in enumerate(upper):
+                for v in upper[i + 1:]:
+                    tri.append((level[x], self.arc_index[(x, u)], self.arc_index[(x, v)], self._arc(u, v)))
+        tri = np.array(tri, dtype=np.int64).reshape(-1, 4)
+        tri = tri[np.argsort(tri[:, 0], kind="stable")]
+        self.tri_xu, self.tri_xv, self.tri_uv = tri[:, 1], tri[:, 2], tri[:, 3]
+        levels = tri[:, 0]
+        self._level_bounds = np.searchsorted(levels, np.arange(levels.max() + 2)) if len(levels) else np.zeros(1, dtype=np.int64)
+
+        # Triangles per upper arc, for unpacking shortcuts
+        by_uv = np.argsort(self.tri_uv, kind="stable")
+        self._tri_by_uv = by_uv
+        self._tri_ptr = np.searchsorted(self.tri_uv[by_uv], np.arange(self.num_arcs + 1))
+
+        self.edge_arc = np.array([self._arc(u, v) for u, v in zip(C.edge_u.tolist(), C.edge_v.tolist())],
+                                 dtype=np.int64)
+        self._applied = None
+        self.customize(C.weight)
+
+    def _arc(self, a, b):
+        return self.arc_index[(a, b) if self.rank[a] < self.rank[b] else (b, a)]
+
+    # ------------------------------------------------------------------
+    # Customization
+    # ------------------------------------------------------------------
+    def customize(self, weights):
+        """
+        Applies a new per-edge weight array (aligned with the graph's edge ids)
+        without touching the node ordering. Skipped if the weights equal the
+        last ones applied; comparing values (not the source object) keeps this
+        correct when a graph's weights are edited in place.
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        if self._applied is not None and np.array_equal(weights, self._applied):
+            return self
+        w = np.full(self.num_arcs, np.inf)
+        np.minimum.at(w, self.edge_arc, weights)
+        self.input_weight = w.copy()
+        bounds = self._level_bounds
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            if hi > lo:
+                np.minimum.at(w, self.tri_uv[lo:hi], w[self.tri_xu[lo:hi]] + w[self.tri_xv[lo:hi]])
+        self.arc_weight = w
+        self._arc_weight_list = w.tolist()  # plain floats for the query loop
+        self._applied = weights.copy()
+        return self
+
+    def customize_from_networkx(self, G, weight='weight'):
+        """
+        Re-customizes from a networkx graph with the same topology, e.g. the
+        output of predict_traffic.
+        """
+        names, eu, ev = self.graph.names, self.graph.edge_u.tolist(), self.graph.edge_v.tolist()
+        weights = np.array([G[names[u]][names[v]].get(weight, 1) for u, v in zip(eu, ev)], dtype=np.float64)
+        return self.customize(weights)
+
+    def customize_for(self, graph, weight='weight'):
+        """
+        Re-customizes for whatever a solver was handed: a WeightOverlay over the
+        same topology (weights used as-is), a CSRGraph, or a networkx graph.
+        """
+        if isinstance(graph, (WeightOverlay, CSRGraph)):
+            topo = graph.graph if isinstance(graph, WeightOverlay) else graph
+            if topo is self.graph or (np.array_equal(topo.edge_u, self.graph.edge_u)
+                                      and np.array_equal(topo.edge_v, self.graph.edge_v)):
+                return self.customize(graph.weight)
+        return self.customize_from_networkx(ensure_networkx(graph), weight)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def upward_search(self, root, other=None):
+        """
+        Dijkstra over upward arcs only. When the opposite search's distances are
+        given, tracks the best meeting node and stops once no better one can appear.
+        """
+        dist = {root: 0.0}
+        parent = {root: None}
+        heap = [(0.0, root)]
+        settled = 0
+        best, meet = np.inf, None
+        weight = self._arc_weight_list
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if d >= best:
+                break
+            settled += 1
+            if other is not None and u in other and d + other[u] < best:
+                best, meet = d + other[u], u
+            for v, a in self._up_adj[u]:
+                nd = d + weight[a]
+                if nd < dist.get(v, np.inf):
+                    dist[v] = nd
+                    parent[v] = u
+                    heapq.heappush(heap, (nd, v))
+        return dist, parent, settled, best, meet
+
+    def query_ids(self, s, t):
+        """
+        Shortest path between node ids. Returns (path ids, cost, nodes_settled)
+        or (None, inf, settled) when t is unreachable.
+        """
+        df, pf, sf, _, _ = self.upward_search(s)
+        _, pb, sb, best, meet = self.upward_search(t, other=df)
+        if meet is None:
+            return None, np.inf, sf + sb
+
+        up_path = [meet]
+        while pf[up_path[-1]] is not None:
+            up_path.append(pf[up_path[-1]])
+        up_path.reverse()
+        down = meet
+        while pb[down] is not None:
+            up_path.append(pb[down])
+            down = pb[down]
+
+        path = [up_path[0]]
+        for a, b in zip(up_path[:-1], up_path[1:]):
+            path.extend(self._unpack(a, b)[1:])
+        return path, float(best), sf + sb
+
+    def _unpack(self, a, b):
+        arc = self._arc(a, b)
+        w = self.arc_weight[arc]
+        if w == self.input_weight[arc]:
+            return [a, b]
+        for i in self._tri_by_uv[self._tri_ptr[arc]:self._tri_ptr[arc + 1]]:
+            xu, xv = self.tri_xu[i], self.tri_xv[i]
+            if self.arc_weight[xu] + self.arc_weight[xv] == w:
+                # The triangle's bottom node is the shared lower endpoint of both arcs
+                x = int(self.arc_tail[xu])
+                return self._unpack(a, x) + self._unpack(x, b)[1:]
+        return [a, b]
+
+    def shortest_path(self, source, target):
+        """
+        Name-level query. Returns (path names, cost, nodes_settled).
+        """
+        C = self.graph
+        path, cost, settled = self.query_ids(C.node_id(source), C.node_id(target))
+        if path is None:
+            return None, cost, settled
+        return [C.node_name(i) for i in path], cost, settled
@@ -1,9 +1,14 @@
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
+from sqlalchemy import create_engine, event, text, Column, Integer, String, Float, DateTime, LargeBinary, Index, insert
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+import atexit
 import os
+import numpy as np
+import queue
+import threading
+import time
 
 # Create Database Directory if not exists
 if not os.path.exists("data"):
@@ -11,7 +16,35 @@ if not os.path.exists("data"):
 
 # Database Setup
 DATABASE_URL = "sqlite:///data/history.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# writer; synchronous=NORMAL is durable across app crashes under WAL (only an
+# OS crash can lose the last commits); negative cache_size is in KiB.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+def create_tuned_engine(url, pragmas=SQLITE_PRAGMAS, **kwargs):
+    """
+    SQLAlchemy engine whose SQLite connections get `pragmas` on connect.
+    """
+    kwargs.setdefault("connect_args", {"check_same_thread": False})
+    eng = create_engine(url, **kwargs)
+    if pragmas:
+        @event.listens_for(eng, "connect")
+        def _set_pragmas(dbapi_conn, _record):
+            cur = dbapi_conn.cursor()
+            for name, value in pragmas.items():
+                cur.execute(f"PRAGMA {name}={value}")
+            cur.close()
+    return eng
+
+engine = create_tuned_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -31,34 +64,414 @@ class MissionHistory(Base):
     qubits_used = Column(Integer)
     status = Column(String)
 
-# Create Tables
-Base.metadata.create_all(bind=engine)
+    __table_args__ = (
+        Index("ix_missions_city_timestamp", "city", "timestamp"),
+        Index("ix_missions_type_timestamp", "emergency_type", "timestamp"),
+    )
 
-def log_mission(city, e_type, src, dst, c_eta, q_eta, dist, qubits):
-    session = SessionLocal()
-    try:
-        mission = MissionHistory(
-            city=city,
-            emergency_type=e_type,
-            source=src,
-            destination=dst,
-            classical_eta=c_eta,
-            quantum_eta=q_eta,
-            time_saved=round(c_eta - q_eta, 2),
-            distance_km=dist,
-            qubits_used=qubits,
-            status="COMPLETED"
-        )
-        session.add(mission)
-        session.commit()
-    except Exception as e:
-        print(f"DB Error: {e}")
-    finally:
-        session.close()
+class MissionRollup(Base):
+    """
+    Per (city, emergency type, hour) running totals, kept current by an
+    AFTER INSERT trigger on missions (see MIGRATIONS). hour counts hours since
+    the Unix epoch (UTC). Missions without a quantum result are not counted.
+    """
+    __tablename__ = "mission_rollups"
+
+    city = Column(String, primary_key=True)
+    emergency_type = Column(String, primary_key=True)
+    hour = Column(Integer, primary_key=True)
+    missions = Column(Integer, nullable=False, default=0)
+    sum_time_saved = Column(Float, nullable=False, default=0.0)
+    sum_quantum_eta = Column(Float, nullable=False, default=0.0)
+    sum_classical_eta = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (Index("ix_mission_rollups_hour", "hour"),)
+
+class RouteTrace(Base):
+    """
+    The node sequence a solver dispatched, stored against the graph version
+    it was solved on (see backend.route_traces for the blob formats). Joins
+    missions on (city, timestamp).
+    """
+    __tablename__ = "route_traces"
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    city = Column(String)
+    emergency_type = Column(String)
+    solver = Column(String)
+    graph_version = Column(String)
+    n_nodes = Column(Integer)
+    path = Column(LargeBinary)      # zigzag-delta varint node ids
+    weights = Column(LargeBinary)   # float32 predicted weight per edge
+
+    __table_args__ = (
+        Index("ix_route_traces_version_timestamp", "graph_version", "timestamp"),
+        Index("ix_route_traces_city_timestamp", "city", "timestamp"),
+    )
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# create_all() only builds missing tables, so changes to existing databases go here.
+MIGRATIONS = [
+    # 1: composite indexes for the history filters (city / type, newest first)
+    ["CREATE INDEX IF NOT EXISTS ix_missions_city_timestamp ON missions (city, timestamp)",
+     "CREATE INDEX IF NOT EXISTS ix_missions_type_timestamp ON missions (emergency_type, timestamp)"],
+    # 2: hourly rollups, backfilled once and then maintained by a trigger
+    ["CREATE TABLE IF NOT EXISTS mission_rollups (city VARCHAR NOT NULL, emergency_type VARCHAR NOT NULL, "
+     "hour INTEGER NOT NULL, missions INTEGER NOT NULL DEFAULT 0, sum_time_saved FLOAT NOT NULL DEFAULT 0, "
+     "sum_quantum_eta FLOAT NOT NULL DEFAULT 0, sum_classical_eta FLOAT NOT NULL DEFAULT 0, "
+     "PRIMARY KEY (city, emergency_type, hour))",
+     "CREATE INDEX IF NOT EXISTS ix_mission_rollups_hour ON mission_rollups (hour)",
+     "DELETE FROM mission_rollups",
+     "INSERT INTO mission_rollups SELECT COALESCE(city, ''), COALESCE(emergency_type, ''), "
+     "CAST(strftime('%s', timestamp) AS INTEGER) / 3600, COUNT(*), TOTAL(time_saved), TOTAL(quantum_eta), "
+     "TOTAL(classical_eta) FROM missions WHERE timestamp IS NOT NULL GROUP BY 1, 2, 3",
+     "CREATE TRIGGER IF NOT EXISTS trg_missions_rollup AFTER INSERT ON missions "
+     "WHEN NEW.timestamp IS NOT NULL BEGIN "
+     "INSERT INTO mission_rollups VALUES (COALESCE(NEW.city, ''), COALESCE(NEW.emergency_type, ''), "
+     "CAST(strftime('%s', NEW.timestamp) AS INTEGER) / 3600, 1, COALESCE(NEW.time_saved, 0), "
+     "COALESCE(NEW.quantum_eta, 0), COALESCE(NEW.classical_eta, 0)) "
+     "ON CONFLICT (city, emergency_type, hour) DO UPDATE SET missions = missions + 1, "
+     "sum_time_saved = sum_time_saved + excluded.sum_time_saved, "
+     "sum_quantum_eta = sum_quantum_eta + excluded.sum_quantum_eta, "
+     "sum_classical_eta = sum_classical_eta + excluded.sum_classical_eta; END"],
+    # 3: route traces
+    ["CREATE TABLE IF NOT EXISTS route_traces (id INTEGER NOT NULL PRIMARY KEY, timestamp DATETIME, "
+     "city VARCHAR, emergency_type VARCHAR, solver VARCHAR, graph_version VARCHAR, n_nodes INTEGER, "
+     "path BLOB, weights BLOB)",
+     "CREATE INDEX IF NOT EXISTS ix_route_traces_version_timestamp ON route_traces (graph_version, timestamp)",
+     "CREATE INDEX IF NOT EXISTS ix_route_traces_city_timestamp ON route_traces (city, timestamp)"],
+    # 4: missions still waiting on QAOA (quantum_eta NULL) stay out of the rollups
+    ["DROP TRIGGER IF EXISTS trg_missions_rollup",
+     "CREATE TRIGGER trg_missions_rollup AFTER INSERT ON missions "
+     "WHEN NEW.timestamp IS NOT NULL AND NEW.quantum_eta IS NOT NULL BEGIN "
+     "INSERT INTO mission_rollups VALUES (COALESCE(NEW.city, ''), COALESCE(NEW.emergency_type, ''), "
+     "CAST(strftime('%s', NEW.timestamp) AS INTEGER) / 3600, 1, COALESCE(NEW.time_saved, 0), "
+     "NEW.quantum_eta, COALESCE(NEW.classical_eta, 0)) "
+     "ON CONFLICT (city, emergency_type, hour) DO UPDATE SET missions = missions + 1, "
+     "sum_time_saved = sum_time_saved + excluded.sum_time_saved, "
+     "sum_quantum_eta = sum_quantum_eta + excluded.sum_quantum_eta, "
+     "sum_classical_eta = sum_classical_eta + excluded.sum_classical_eta; END"],
+]
+
+def migrate(bind=None):
+    """
+    Brings a database up to the latest schema version; returns that version.
+    """
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        version = conn.execute(text("PRAGMA user_version")).scalar()
+        for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for stmt in statements:
+                conn.execute(text(stmt))
+            conn.execute(text(f"PRAGMA user_version={target}"))
+    return len(MIGRATIONS)
+
+_MIGRATED = False
+
+def init_db():
+    """
+    Creates tables and runs pending migrations on the app database, once per
+    process and on first use (importing this module does not touch the file).
+    """
+    global _MIGRATED
+    if not _MIGRATED:
+        migrate(engine)
+        _MIGRATED = True
+
+def _mission_row(city, e_type, src, dst, c_eta, q_eta, dist, qubits, timestamp=None):
+    return {
+        "timestamp": timestamp or datetime.utcnow(),
+        "city": city,
+        "emergency_type": e_type,
+        "source": src,
+        "destination": dst,
+        "classical_eta": c_eta,
+        "quantum_eta": q_eta,
+        "time_saved": round(c_eta - q_eta, 2) if q_eta is not None else None,
+        "distance_km": dist,
+        "qubits_used": qubits,
+        # No quantum answer before the deadline: quantum_eta / time_saved stay NULL
+        "status": "COMPLETED" if q_eta is not None else "QUANTUM_PENDING",
+    }
+
+def write_missions(rows, bind=None, table=None):
+    """
+    Inserts rows (dicts) into `table` (default missions) in one transaction
+    as a single executemany.
+    """
+    if rows:
+        with (bind or engine).begin() as conn:
+            conn.execute(insert(table if table is not None else MissionHistory.__table__), rows)
+
+def _write_grouped(items, bind):
+    # (table, row) items -> one executemany per table, all in one transaction
+    groups = {}
+    for table, row in items:
+        groups.setdefault(table, []).append(row)
+    with bind.begin() as conn:
+        for table, rows in groups.items():
+            conn.execute(insert(table), rows)
+
+class MissionWriter:
+    """
+    Background writer for mission rows.
+
+    Rows go into a bounded queue; a daemon thread drains it and inserts them
+    in one transaction every `batch_size` rows or `flush_ms` milliseconds,
+    whichever comes first. When the queue is full (or the writer is closed)
+    the row is written synchronously instead, so nothing is dropped. Rows for
+    other tables (e.g. route traces) can share the queue and transaction.
+    """
+
+    def __init__(self, bind=None, batch_size=100, flush_ms=250, max_queue=10000):
+        self.bind = bind or engine
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.rows_written = 0
+        self.batches = 0
+        self.sync_writes = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._flush_total_ms = 0.0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="mission-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, row, table=None):
+        """
+        Queues one row for `table` (default missions); returns False if it had
+        to be written synchronously.
+        """
+        item = (table if table is not None else MissionHistory.__table__, row)
+        with self._lock:
+            # Checked and queued under the lock close() takes, so nothing lands behind the sentinel
+            if not self._closed:
+                try:
+                    self.queue.put_nowait(item)
+                    return True
+                except queue.Full:
+                    pass
+            self.sync_writes += 1
+        self._write([item])
+        return False
+
+    def _write(self, rows):
+        start = time.perf_counter()
+        try:
+            _write_grouped(rows, self.bind)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"DB Error: {e}")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.rows_written += len(rows)
+            self.batches += 1
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self._flush_total_ms += elapsed
+
+    def _run(self):
+        stop = False
+        while not stop:
+            row = self.queue.get()
+            if row is None:
+                self.queue.task_done()
+                break
+            batch = [row]
+            deadline = time.monotonic() + self.flush_ms / 1000
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    self.queue.task_done()
+                    break
+                batch.append(row)
+            self._write(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    def flush(self):
+        """
+        Blocks until every queued row has been written.
+        """
+        if self._thread.is_alive():
+            self.queue.join()
+
+    def close(self):
+        """
+        Writes what is queued and stops the thread; later rows are written synchronously.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        # Outside the lock: the thread needs it to record stats while draining
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join()
+        leftover = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self.queue.task_done()
+            if item is not None:
+                leftover.append(item)
+        if leftover:
+            self._write(leftover)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "rows_written": self.rows_written,
+                "batches": self.batches,
+                "sync_writes": self.sync_writes,
+                "errors": self.errors,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "mean_flush_ms": round(self._flush_total_ms / self.batches, 3) if self.batches else 0.0,
+                "max_flush_ms": round(self.max_flush_ms, 3),
+            }
+
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+
+def get_mission_writer():
+    """
+    Process-wide MissionWriter, started on first use and flushed at exit.
+    """
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            init_db()
+            _WRITER = MissionWriter()
+            atexit.register(_WRITER.close)
+        return _WRITER
+
+def log_mission(city, e_type, src, dst, c_eta, q_eta, dist, qubits, sync=False, timestamp=None):
+    """
+    Records a completed mission. Rows are batched by the background writer;
+    pass sync=True to insert and commit before returning. Pass the same
+    timestamp to log_route_trace to link the mission's routes.
+    """
+    row = _mission_row(city, e_type, src, dst, c_eta, q_eta, dist, qubits, timestamp)
+    if sync:
+        try:
+            init_db()
+            write_missions([row])
+        except Exception as e:
+            print(f"DB Error: {e}")
+        return
+    get_mission_writer().submit(row)
 
 def get_recent_missions(limit=10):
+    # Rows still queued in this process should show up in the history
+    if _WRITER is not None:
+        _WRITER.flush()
+    init_db()
     session = SessionLocal()
     try:
         return session.query(MissionHistory).order_by(MissionHistory.id.desc()).limit(limit).all()
     finally:
         session.close()
+
+# ----------------------------------------------------------------------
+# Columnar queries (no ORM objects)
+# ----------------------------------------------------------------------
+def cursor_columns(conn, sql, params=None):
+    """
+    Runs a SELECT on a DB-API connection and returns {column: ndarray}.
+    Rows go straight from the cursor into one array per column.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, params or ())
+        names = [d[0] for d in cur.description]
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    if not rows:
+        return {name: np.empty(0) for name in names}
+    # BLOBs stay bytes objects: a fixed-width bytes array would strip trailing NULs
+    return {name: np.array(col, dtype=object) if isinstance(col[0], bytes) else np.array(col)
+            for name, col in zip(names, zip(*rows))}
+
+def fetch_columns(sql, params=None, bind=None):
+    """
+    cursor_columns on a raw connection from the engine's pool.
+    """
+    raw = (bind or engine).raw_connection()
+    try:
+        return cursor_columns(raw, sql, params)
+    finally:
+        raw.close()
+
+def _where(filters):
+    clauses = [f"{column} {op} ?" for column, op, value in filters if value is not None]
+    params = tuple(value for _, _, value in filters if value is not None)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def _epoch_hour(value):
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    return int(np.datetime64(value, "h").astype(np.int64))
+
+# Grouping keys mission_rollups accepts; anything else never reaches the SQL text
+ROLLUP_KEYS = ("city", "emergency_type", "hour")
+
+def mission_rollups(city=None, emergency_type=None, since=None, until=None, by=("city", "emergency_type", "hour"),
+                    bind=None):
+    """
+    Aggregates from the rollup table as columns: the `by` keys plus missions,
+    mean_time_saved, mean_quantum_eta and mean_classical_eta. since / until
+    (datetime or epoch hour, until exclusive) bound the hour; hour comes back
+    as datetime64[h]. Cost depends on the number of groups, not missions.
+    """
+    bad = set(by) - set(ROLLUP_KEYS)
+    if bad:
+        raise ValueError(f"Unknown rollup keys {sorted(bad)}, expected a subset of {ROLLUP_KEYS}")
+    if bind is None:
+        init_db()
+    keys = ", ".join(by)
+    where, params = _where([("city", "=", city), ("emergency_type", "=", emergency_type),
+                            ("hour", ">=", _epoch_hour(since)), ("hour", "<", _epoch_hour(until))])
+    sql = (f"SELECT {keys + ', ' if keys else ''}SUM(missions) AS missions, "
+           "SUM(sum_time_saved) / SUM(missions) AS mean_time_saved, "
+           "SUM(sum_quantum_eta) / SUM(missions) AS mean_quantum_eta, "
+           "SUM(sum_classical_eta) / SUM(missions) AS mean_classical_eta "
+           f"FROM mission_rollups{where}{' GROUP BY ' + keys + ' ORDER BY ' + keys if keys else ''}")
+    cols = fetch_columns(sql, params, bind)
+    if "hour" in cols:
+        cols["hour"] = cols["hour"].astype(np.int64).astype("datetime64[h]")
+    cols["missions"] = cols["missions"].astype(np.int64)
+    return cols
+
+def recent_mission_columns(limit=10, city=None, emergency_type=None, bind=None):
+    """
+    Latest missions as columns (newest first), without loading ORM objects.
+    """
+    if bind is None:
+        if _WRITER is not None:
+            _WRITER.flush()
+        init_db()
+    where, params = _where([("city", "=", city), ("emergency_type", "=", emergency_type)])
+    sql = ("SELECT id, timestamp, city, emergency_type, time_saved, quantum_eta, classical_eta, status "
+           f"FROM missions{where} ORDER BY id DESC LIMIT ?")
+    cols = fetch_columns(sql, params + (int(limit),), bind)
+    if len(cols["id"]):
+        cols["timestamp"] = cols["timestamp"].astype("datetime64[us]")
+    return cols
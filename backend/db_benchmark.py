@@ -0,0 +1,105 @@
+"""
+Concurrent reader / writer throughput of the mission database, with and
+without the tuning profile (SQLITE_PRAGMAS plus the composite indexes).
+
+    python -m backend.db_benchmark [--seconds 3] [--readers 4] [--rows 20000]
+
+Writers insert one mission per transaction, like an unbatched log_mission;
+readers run the Mission History filter (latest missions for one city).
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+
+from backend.database import create_tuned_engine, migrate, write_missions, _mission_row, SQLITE_PRAGMAS
+
+CITIES = ("Vijayawada", "Hyderabad", "Visakhapatnam")
+TYPES = ("Ambulance", "Fire Brigade", "Police Response", "Organ Transport")
+READ_SQL = text("SELECT id, timestamp, time_saved FROM missions WHERE city = :city "
+                "ORDER BY timestamp DESC LIMIT 50")
+
+
+def _random_row(rng):
+    c_eta = rng.uniform(5, 40)
+    return _mission_row(rng.choice(CITIES), rng.choice(TYPES), "src", "dst", c_eta,
+                        c_eta * rng.uniform(0.7, 1.0), rng.uniform(1, 20), rng.randint(4, 20))
+
+
+def run_benchmark(path, tuned=True, readers=4, writers=1, seconds=3.0, rows=20000, seed=0):
+    """
+    Throughput (operations per second) of `readers` + `writers` threads
+    hammering one database file for `seconds`.
+    """
+    eng = create_tuned_engine(f"sqlite:///{path}", pragmas=SQLITE_PRAGMAS if tuned else {},
+                              pool_size=readers + writers)
+    migrate(eng)
+    if not tuned:
+        with eng.begin() as conn:
+            conn.execute(text("DROP INDEX IF EXISTS ix_missions_city_timestamp"))
+            conn.execute(text("DROP INDEX IF EXISTS ix_missions_type_timestamp"))
+    rng = random.Random(seed)
+    write_missions([_random_row(rng) for _ in range(rows)], eng)
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def reader(i):
+        local_rng, n = random.Random(seed + i), 0
+        with eng.connect() as conn:
+            while time.monotonic() < stop:
+                conn.execute(READ_SQL, {"city": local_rng.choice(CITIES)}).fetchall()
+                conn.rollback()  # end the read transaction so WAL checkpoints can proceed
+                n += 1
+        with lock:
+            counts["reads"] += n
+
+    def writer(i):
+        local_rng, n, errors = random.Random(seed + 100 + i), 0, 0
+        while time.monotonic() < stop:
+            try:
+                write_missions([_random_row(local_rng)], eng)
+                n += 1
+            except Exception:
+                errors += 1
+        with lock:
+            counts["writes"] += n
+            counts["errors"] += errors
+
+    threads = ([threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+               + [threading.Thread(target=writer, args=(i,)) for i in range(writers)])
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+    with eng.connect() as conn:
+        mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+    eng.dispose()
+    return {"journal_mode": mode, "reads_per_s": counts["reads"] / elapsed,
+            "writes_per_s": counts["writes"] / elapsed, "errors": counts["errors"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, tuned in (("default", False), ("tuned", True)):
+            res = run_benchmark(os.path.join(tmp, f"{label}.db"), tuned, args.readers, args.writers,
+                                args.seconds, args.rows)
+            print(f"{label:8s} journal={res['journal_mode']:6s} reads/s={res['reads_per_s']:9.0f} "
+                  f"writes/s={res['writes_per_s']:7.0f} errors={res['errors']}")
+
+
+if __name__ == "__main__":
+    main()
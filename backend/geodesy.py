@@ -0,0 +1,53 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in km. Accepts scalars or arrays (broadcast), so a
+    whole edge list is handled in one NumPy call.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def bearing_deg(lat1, lon1, lat2, lon2):
+    """
+    Initial compass bearing (0-360, clockwise from north) from point 1 to point 2.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return (np.degrees(np.arctan2(x, y)) + 360.0) % 360.0
+
+
+def distance_km(p1, p2):
+    """
+    Distance between two (lat, lon) points or (N, 2) arrays of points.
+    """
+    p1 = np.asarray(p1, dtype=np.float64)
+    p2 = np.asarray(p2, dtype=np.float64)
+    return haversine_km(p1[..., 0], p1[..., 1], p2[..., 0], p2[..., 1])
+
+
+def distance_matrix_km(points_a, points_b):
+    """
+    (len(a), len(b)) matrix of distances between two lists of (lat, lon) points.
+    """
+    a = np.asarray(points_a, dtype=np.float64).reshape(-1, 2)
+    b = np.asarray(points_b, dtype=np.float64).reshape(-1, 2)
+    return haversine_km(a[:, None, 0], a[:, None, 1], b[None, :, 0], b[None, :, 1])
+
+
+def edge_geometry(pos, edge_u, edge_v):
+    """
+    Length (km) and bearing (deg) for every edge of a graph given its (N, 2)
+    node position array and edge endpoint id arrays.
+    """
+    pos = np.asarray(pos, dtype=np.float64)
+    a, b = pos[edge_u], pos[edge_v]
+    return (haversine_km(a[:, 0], a[:, 1], b[:, 0], b[:, 1]),
+            bearing_deg(a[:, 0], a[:, 1], b[:, 0], b[:, 1]))
@@ -0,0 +1,301 @@
+"""
+Offline per-edge road geometry for route rendering.
+
+Every edge can carry its real road shape as a polyline. Points are quantised
+to int32 micro-degrees (~0.1 m) and delta-encoded: the first point of an edge
+is absolute, the rest are steps from the previous point, which are small
+numbers that compress well on disk. All edges live in one flat (k, 2) array
+indexed by an offsets array, like the CSR adjacency. Edges without a stored
+shape fall back to the straight segment between their end nodes.
+
+Route geometry is built by concatenating edge segments along a path, so no
+network call is needed to draw a solved route, and Douglas-Peucker
+simplification at the map's zoom keeps folium payloads small. Missing shapes
+are fetched concurrently on a background thread (fill_in_background) while
+the map draws straight segments; edges whose fetch failed are not retried
+for RETRY_FAILED_S.
+"""
+import asyncio
+import os
+import threading
+import time
+import weakref
+
+import numpy as np
+
+from backend.bulk_metrics import DEFAULT_CONCURRENCY, gather_bounded
+from backend.geodesy import EARTH_RADIUS_KM, distance_km
+from backend.ors_client import decode_polyline
+
+SCALE = 1_000_000  # micro-degrees
+GEOMETRY_DIR = os.path.join("data", "geometry")
+# How far a shape's ends may sit from the edge's nodes (road snapping, rounding)
+ENDPOINT_TOLERANCE_KM = 0.1
+RETRY_FAILED_S = 3600
+# Ground metres per pixel at zoom 0 on the equator (Web Mercator, 256 px tiles)
+METRES_PER_PIXEL_Z0 = 156543.03392
+
+
+def encode_points(points):
+    """
+    (lat, lon) points -> int32 (k, 2) array: first point absolute, then deltas.
+    """
+    q = np.round(np.asarray(points, dtype=np.float64).reshape(-1, 2) * SCALE).astype(np.int64)
+    q[1:] = np.diff(q, axis=0)
+    return q.astype(np.int32)
+
+
+def decode_points(deltas):
+    return np.cumsum(np.asarray(deltas, dtype=np.int64), axis=0) / SCALE
+
+
+def zoom_tolerance_m(zoom, lat=0.0, pixels=1.0):
+    """
+    Ground distance (m) covered by `pixels` screen pixels at a map zoom level.
+    """
+    return pixels * METRES_PER_PIXEL_Z0 * np.cos(np.radians(lat)) / 2 ** zoom
+
+
+def simplify(points, tolerance_m):
+    """
+    Douglas-Peucker simplification of a (lat, lon) polyline; points closer than
+    tolerance_m to the simplified line are dropped. Distances are measured on a
+    local equirectangular projection, which is exact enough at city scale.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(pts)
+    if n < 3 or tolerance_m <= 0:
+        return pts
+    lat0 = np.radians(pts[:, 0].mean())
+    xy = np.radians(pts[:, ::-1]) * [np.cos(lat0), 1.0] * EARTH_RADIUS_KM * 1000
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        a, ab = xy[i], xy[j] - xy[i]
+        seg = xy[i + 1:j] - a
+        length2 = ab @ ab
+        t = np.clip(seg @ ab / length2, 0.0, 1.0) if length2 > 0 else np.zeros(len(seg))
+        d = np.hypot(*(seg - t[:, None] * ab).T)
+        k = int(np.argmax(d))
+        if d[k] > tolerance_m:
+            mid = i + 1 + k
+            keep[mid] = True
+            stack.append((i, mid))
+            stack.append((mid, j))
+    return pts[keep]
+
+
+class EdgeGeometryStore:
+    """
+    Delta-encoded polylines for the edges of one CSRGraph, oriented from
+    edge_u to edge_v.
+    """
+
+    def __init__(self, graph, offsets=None, deltas=None):
+        self.graph = graph
+        m = graph.number_of_edges()
+        self.offsets = np.zeros(m + 1, dtype=np.int64) if offsets is None else np.asarray(offsets, dtype=np.int64)
+        self.deltas = np.zeros((0, 2), dtype=np.int32) if deltas is None else np.asarray(deltas, dtype=np.int32)
+        self._pending = {}
+        self.failed = {}  # edge id -> time.monotonic() of its last failed fetch
+        self._lock = threading.Lock()
+        self._filling = None
+
+    def has_edge(self, e):
+        return e in self._pending or self.offsets[e + 1] > self.offsets[e]
+
+    def needs_fetch(self, e, now=None):
+        """
+        True if edge e has no shape and has not failed within RETRY_FAILED_S.
+        """
+        if self.has_edge(e):
+            return False
+        failed_at = self.failed.get(e)
+        return failed_at is None or (time.monotonic() if now is None else now) - failed_at > RETRY_FAILED_S
+
+    def set_edge(self, e, points, tolerance_km=ENDPOINT_TOLERANCE_KM):
+        """
+        Stores the shape of edge e. Points may run in either direction; they are
+        flipped if they start nearer edge_v than edge_u. Raises ValueError if
+        the shape does not start and end within tolerance_km of the edge's nodes.
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(pts) < 2:
+            return
+        C = self.graph
+        u, v = C.pos[C.edge_u[e]], C.pos[C.edge_v[e]]
+        if distance_km(pts[0], v) < distance_km(pts[0], u):
+            pts = pts[::-1]
+        gap = max(distance_km(pts[0], u), distance_km(pts[-1], v))
+        if gap > tolerance_km:
+            raise ValueError(f"Shape for edge {e} ends {gap:.3f} km from its nodes")
+        with self._lock:
+            self._pending[int(e)] = encode_points(pts)
+
+    def pack(self):
+        """
+        Folds edges set since the last pack into the flat arrays.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            m = len(self.offsets) - 1
+            parts = [self._pending.get(e) if e in self._pending else self.deltas[self.offsets[e]:self.offsets[e + 1]]
+                     for e in range(m)]
+            lengths = np.array([len(p) for p in parts], dtype=np.int64)
+            self.offsets = np.concatenate([[0], np.cumsum(lengths)])
+            self.deltas = (np.concatenate(parts).astype(np.int32) if lengths.sum()
+                           else np.zeros((0, 2), dtype=np.int32))
+            self._pending.clear()
+
+    def edge_points(self, e, forward=True):
+        """
+        (k, 2) lat/lon points of edge e, straight if no shape is stored.
+        """
+        with self._lock:  # a background fill may be packing
+            if e in self._pending:
+                deltas = self._pending[e]
+            elif self.offsets[e + 1] > self.offsets[e]:
+                deltas = self.deltas[self.offsets[e]:self.offsets[e + 1]]
+            else:
+                deltas = None
+        if deltas is not None:
+            pts = decode_points(deltas)
+        else:
+            C = self.graph
+            pts = C.pos[[C.edge_u[e], C.edge_v[e]]].astype(np.float64)
+        return pts if forward else pts[::-1]
+
+    def path_edges(self, path):
+        """
+        [(edge id, traversed forward)] for a path of node names.
+        """
+        C = self.graph
+        ids = [C.node_id(n) for n in path]
+        out = []
+        for u, v in zip(ids[:-1], ids[1:]):
+            e = C.edge_id(u, v)
+            if e < 0:
+                raise KeyError(f"No edge between {C.node_name(u)} and {C.node_name(v)}")
+            out.append((e, int(C.edge_u[e]) == u))
+        return out
+
+    def covers(self, path):
+        return all(self.has_edge(e) for e, _ in self.path_edges(path))
+
+    def route_geometry(self, path, zoom=None):
+        """
+        Full (lat, lon) polyline for a path of node names, simplified for the
+        given map zoom (None keeps every point).
+        """
+        if not path:
+            return []
+        if len(path) == 1:
+            return [tuple(self.graph.pos[self.graph.node_id(path[0])].tolist())]
+        segments = [self.edge_points(e, fwd) for e, fwd in self.path_edges(path)]
+        pts = np.concatenate([segments[0]] + [s[1:] for s in segments[1:]])
+        if zoom is not None:
+            pts = simplify(pts, zoom_tolerance_m(zoom, pts[:, 0].mean()))
+        return [tuple(p) for p in pts.tolist()]
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.deltas.nbytes + sum(d.nbytes for d in self._pending.values())
+
+    def save(self, path):
+        self.pack()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, offsets=self.offsets, deltas=self.deltas)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, graph, path):
+        with np.load(path) as data:
+            offsets, deltas = data["offsets"], data["deltas"]
+        if len(offsets) != graph.number_of_edges() + 1:
+            raise ValueError(f"{path} does not match this graph's edges")
+        return cls(graph, offsets, deltas)
+
+
+def fill_from_ors(store, client, path=None, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Fetches shapes for edges that need one (all edges, or those on `path`)
+    from ORS directions, `concurrency` requests at a time; responses go
+    through the client's disk cache. Failed edges are remembered in
+    store.failed. Returns the number of edges filled.
+    """
+    C = store.graph
+    edges = range(C.number_of_edges()) if path is None else [e for e, _ in store.path_edges(path)]
+    edges = [e for e in dict.fromkeys(edges) if store.needs_fetch(e)]
+    if not edges:
+        return 0
+    ends = [(C.pos[C.edge_u[e]], C.pos[C.edge_v[e]]) for e in edges]
+    replies = asyncio.run(gather_bounded(
+        client.directions, [([[u[1], u[0]], [v[1], v[0]]],) for u, v in ends], concurrency))
+    filled = 0
+    for e, reply in zip(edges, replies):
+        try:
+            if isinstance(reply, Exception):
+                raise reply
+            store.set_edge(e, decode_polyline(reply["routes"][0]["geometry"]))
+            store.failed.pop(e, None)
+            filled += 1
+        except Exception as exc:
+            store.failed[e] = time.monotonic()
+            print(f"ORS geometry fetch failed for edge {e}: {exc}")
+    return filled
+
+
+def fill_in_background(store, client, path=None, save_to=None):
+    """
+    Runs fill_from_ors on a daemon thread, one fill per store at a time, and
+    saves the store to `save_to` if anything was filled. Returns the thread,
+    or None if a fill is already running or nothing needs fetching.
+    """
+    C = store.graph
+    edges = range(C.number_of_edges()) if path is None else [e for e, _ in store.path_edges(path)]
+    if not any(store.needs_fetch(e) for e in edges):
+        return None
+    with store._lock:
+        if store._filling is not None and store._filling.is_alive():
+            return None
+
+        def run():
+            try:
+                if fill_from_ors(store, client, path) and save_to:
+                    store.save(save_to)
+            except Exception as exc:
+                print(f"Geometry fill failed: {exc}")
+
+        store._filling = threading.Thread(target=run, name="geometry-fill", daemon=True)
+        store._filling.start()
+        return store._filling
+
+
+_STORES = weakref.WeakKeyDictionary()
+
+
+def geometry_path(graph, directory=GEOMETRY_DIR):
+    # Keyed by topology only: road shapes stay valid when edge weights are refreshed
+    from backend.route_cache import topology_version
+    return os.path.join(directory, topology_version(graph) + ".npz")
+
+
+def get_geometry_store(G, directory=GEOMETRY_DIR):
+    """
+    EdgeGeometryStore for a graph, loaded from disk when one was saved for
+    the same road network and cached for the graph's lifetime.
+    """
+    from backend.traffic_model import get_traffic_engine
+    store = _STORES.get(G)
+    if store is None:
+        C = get_traffic_engine(G).graph
+        path = geometry_path(C, directory)
+        store = EdgeGeometryStore.load(C, path) if os.path.exists(path) else EdgeGeometryStore(C)
+        _STORES[G] = store
+    return store
@@ -0,0 +1,295 @@
+import weakref
+
+import numpy as np
+import networkx as nx
+
+# Edge attributes that get dedicated NumPy columns. Anything else on an edge
+# (e.g. 'congestion_level' written by predict_traffic) is kept as an object
+# column so conversion back to networkx stays lossless.
+ARRAY_EDGE_ATTRS = ("weight", "distance", "base_weight")
+
+
+class CSRGraph:
+    """
+    Compact array-backed road graph.
+
+    Nodes are integer ids 0..n-1 with a name <-> id index. Adjacency is stored
+    in compressed sparse row form (indptr / indices), and every arc points back
+    to its edge id so per-edge arrays (weight, distance, base_weight) are stored
+    once per road segment, not once per direction.
+    """
+
+    def __init__(self, names, pos, edge_u, edge_v, weight, distance, base_weight,
+                 directed=False, node_attrs=None, edge_attrs=None, graph_attrs=None, csr=None):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.pos = np.asarray(pos, dtype=np.float64).reshape(len(self.names), 2)
+        self.edge_u = np.asarray(edge_u, dtype=np.int32)
+        self.edge_v = np.asarray(edge_v, dtype=np.int32)
+        self.weight = np.asarray(weight, dtype=np.float64)
+        self.distance = np.asarray(distance, dtype=np.float64)
+        self.base_weight = np.asarray(base_weight, dtype=np.float64)
+        self.directed = directed
+        self.node_attrs = node_attrs or {}
+        self.edge_attrs = edge_attrs or {}
+        self.graph_attrs = graph_attrs or {}
+        if csr is not None:
+            # Prebuilt (indptr, indices, arc_edge), e.g. memory-mapped from the import cache
+            self.indptr, self.indices, self.arc_edge = csr
+        else:
+            self._build_csr()
+
+    def _build_csr(self):
+        n = len(self.names)
+        m = len(self.edge_u)
+        edge_ids = np.arange(m, dtype=np.int32)
+        if self.directed:
+            tails, heads, arc_edge = self.edge_u, self.edge_v, edge_ids
+        else:
+            tails = np.concatenate([self.edge_u, self.edge_v])
+            heads = np.concatenate([self.edge_v, self.edge_u])
+            arc_edge = np.concatenate([edge_ids, edge_ids])
+
+        # Stable sort keeps insertion order of neighbours within each row
+        order = np.argsort(tails, kind="stable")
+        self.indices = heads[order].astype(np.int32)
+        self.arc_edge = arc_edge[order].astype(np.int32)
+        counts = np.bincount(tails, minlength=n)
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_networkx(cls, G):
+        """
+        Builds a CSRGraph from a networkx graph such as create_city_graph() output.
+        """
+        names = list(G.nodes())
+        index = {name: i for i, name in enumerate(names)}
+        n, m = len(names), G.number_of_edges()
+
+        pos = np.full((n, 2), np.nan)
+        node_attrs = {}
+        for i, (name, data) in enumerate(G.nodes(data=True)):
+            if "pos" in data:
+                pos[i] = data["pos"]
+            for key, val in data.items():
+                if key != "pos":
+                    node_attrs.setdefault(key, [None] * n)[i] = val
+
+        edge_u = np.empty(m, dtype=np.int32)
+        edge_v = np.empty(m, dtype=np.int32)
+        cols = {key: np.full(m, np.nan) for key in ARRAY_EDGE_ATTRS}
+        edge_attrs = {}
+        for e, (u, v, data) in enumerate(G.edges(data=True)):
+            edge_u[e] = index[u]
+            edge_v[e] = index[v]
+            for key, val in data.items():
+                if key in cols:
+                    cols[key][e] = val
+                else:
+                    edge_attrs.setdefault(key, [None] * m)[e] = val
+
+        return cls(names, pos, edge_u, edge_v, cols["weight"], cols["distance"], cols["base_weight"],
+                   directed=G.is_directed(), node_attrs=node_attrs, edge_attrs=edge_attrs,
+                   graph_attrs=dict(G.graph))
+
+    def to_networkx(self, weight=None):
+        """
+        Rebuilds the equivalent networkx graph. An optional per-edge weight
+        array replaces the stored 'weight' column.
+        """
+        G = nx.DiGraph() if self.directed else nx.Graph()
+        G.graph.update(self.graph_attrs)
+        for i, name in enumerate(self.names):
+            data = {key: vals[i] for key, vals in self.node_attrs.items() if vals[i] is not None}
+            if not np.isnan(self.pos[i, 0]):
+                data["pos"] = tuple(self.pos[i].tolist())
+            G.add_node(name, **data)
+
+        weights = self.weight if weight is None else np.asarray(weight, dtype=np.float64)
+        columns = {"weight": weights, "distance": self.distance, "base_weight": self.base_weight}
+        for e in range(self.number_of_edges()):
+            data = {key: col[e].item() for key, col in columns.items() if not np.isnan(col[e])}
+            for key, vals in self.edge_attrs.items():
+                if vals[e] is not None:
+                    data[key] = vals[e]
+            G.add_edge(self.names[self.edge_u[e]], self.names[self.edge_v[e]], **data)
+        return G
+
+    def with_weights(self, weight):
+        """
+        Returns a graph sharing this topology with a different weight column.
+        """
+        H = object.__new__(CSRGraph)
+        H.__dict__.update(self.__dict__)
+        H.weight = np.asarray(weight, dtype=np.float64)
+        return H
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def number_of_nodes(self):
+        return len(self.names)
+
+    def number_of_edges(self):
+        return len(self.edge_u)
+
+    def node_id(self, name):
+        return self.index[name]
+
+    def node_name(self, node_id):
+        return self.names[node_id]
+
+    def neighbors(self, node_id):
+        """
+        Returns (neighbour ids, edge ids) for a node as array views.
+        """
+        start, end = self.indptr[node_id], self.indptr[node_id + 1]
+        return self.indices[start:end], self.arc_edge[start:end]
+
+    def edge_id(self, u, v):
+        """
+        Edge id between two node ids, or -1 if they are not adjacent.
+        """
+        nbrs, eids = self.neighbors(u)
+        hit = np.nonzero(nbrs == v)[0]
+        return int(eids[hit[0]]) if len(hit) else -1
+
+    def arc_weights(self, weight=None):
+        """
+        Per-arc weights aligned with `indices`, for tight search loops.
+        """
+        weights = self.weight if weight is None else weight
+        return weights[self.arc_edge]
+
+    def path_cost(self, path, weight=None):
+        """
+        Sums (weight, distance) along a path given as node names.
+        """
+        weights = self.weight if weight is None else weight
+        ids = [self.index[n] for n in path]
+        eids = [self.edge_id(u, v) for u, v in zip(ids[:-1], ids[1:])]
+        return float(weights[eids].sum()), float(self.distance[eids].sum())
+
+    def edge_lookup(self):
+        """
+        {(u name, v name): edge id} in both directions for undirected graphs,
+        built once so name-keyed solvers can price edges from weight arrays.
+        """
+        lookup = self.__dict__.get("_edge_lookup")
+        if lookup is None:
+            names = self.names
+            lookup = {}
+            for e, (u, v) in enumerate(zip(self.edge_u.tolist(), self.edge_v.tolist())):
+                lookup[(names[u], names[v])] = e
+                if not self.directed:
+                    lookup[(names[v], names[u])] = e
+            self._edge_lookup = lookup
+        return lookup
+
+    @property
+    def nbytes(self):
+        arrays = (self.pos, self.edge_u, self.edge_v, self.weight, self.distance,
+                  self.base_weight, self.indptr, self.indices, self.arc_edge)
+        return sum(a.nbytes for a in arrays)
+
+
+class WeightOverlay:
+    """
+    A per-edge weight array laid over a shared topology.
+
+    Overlays for different emergency types or minutes share one CSRGraph (and
+    the networkx graph it came from), so each costs one float per edge instead
+    of a full graph copy. Solvers accept an overlay wherever they take a graph.
+    """
+
+    def __init__(self, graph, weight, nx_graph=None):
+        self.graph = graph
+        self.weight = np.asarray(weight, dtype=np.float64)
+        # Weak reference: overlays are cached alongside the graph they describe
+        self._nx_ref = weakref.ref(nx_graph) if nx_graph is not None else None
+        self._weight_list = None
+        self._min_pace = None
+
+    @property
+    def nx_graph(self):
+        """
+        Networkx topology to search on: the source graph if it is still alive,
+        otherwise a one-off rebuild from the CSR arrays.
+        """
+        G = self._nx_ref() if self._nx_ref is not None else None
+        if G is None:
+            G = self.graph.to_networkx()
+            self._nx_ref = weakref.ref(G)
+            self._nx_keepalive = G
+        return G
+
+    def weight_fn(self):
+        """
+        networkx-style weight callable reading this overlay's array.
+        """
+        if self._weight_list is None:
+            self._weight_list = self.weight.tolist()
+        lookup, weights = self.graph.edge_lookup(), self._weight_list
+        fn = lambda u, v, data: weights[lookup[(u, v)]]
+        fn.overlay = self  # lets heuristics read array-level facts such as min_pace()
+        return fn
+
+    def min_pace(self):
+        """
+        Fastest weight per km over edges with a distance, computed once from
+        the arrays (0.0 if no edge has a distance).
+        """
+        if self._min_pace is None:
+            dist = self.graph.distance
+            mask = dist > 0
+            self._min_pace = float((self.weight[mask] / dist[mask]).min()) if mask.any() else 0.0
+        return self._min_pace
+
+    def edge_attrs(self):
+        """
+        Extra per-edge attributes written by to_networkx(); subclasses extend it.
+        """
+        return {"weight": self.weight.tolist()}
+
+    def to_networkx(self):
+        """
+        Materialises a standalone networkx copy with this overlay's weights.
+        """
+        H = self.nx_graph.copy()
+        lookup = self.graph.edge_lookup()
+        attrs = self.edge_attrs()
+        for u, v, data in H.edges(data=True):
+            e = lookup[(u, v)]
+            for key, vals in attrs.items():
+                data[key] = vals[e]
+        return H
+
+    def to_csr(self):
+        return self.graph.with_weights(self.weight)
+
+    @property
+    def nbytes(self):
+        return self.weight.nbytes
+
+
+def ensure_networkx(G):
+    """
+    Lets solvers accept either graph type while they migrate to CSRGraph.
+    """
+    if isinstance(G, (CSRGraph, WeightOverlay)):
+        return G.to_networkx()
+    return G
+
+
+def resolve_weighted(G, weight='weight'):
+    """
+    (networkx graph, weight spec) for a solver input. Overlays are searched on
+    their shared topology with a weight callable instead of being copied.
+    """
+    if isinstance(G, WeightOverlay):
+        return G.nx_graph, G.weight_fn()
+    return ensure_networkx(G), weight
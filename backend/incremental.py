@@ -0,0 +1,287 @@
+"""
+Incremental re-routing for missions that are already underway.
+
+Each live mission keeps a D* Lite search (Koenig & Likhachev) rooted at its
+destination. When predict_traffic moves to a new minute only the edges whose
+congestion status (or, for raw weight arrays, weight) changed are fed back
+in, and the search repairs the part of the shortest-path tree they affect
+instead of starting over. As the vehicle
+advances the start node moves and the key modifier km keeps old queue
+entries valid, so nothing is rebuilt for that either.
+"""
+import heapq
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.graph_engine import CSRGraph, WeightOverlay
+from backend.geodesy import EARTH_RADIUS_KM, distance_km
+
+INF = float("inf")
+
+
+def _haversine(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(h), math.sqrt(1 - h))
+
+
+class DStarLite:
+    """
+    D* Lite over an undirected CSRGraph between node ids.
+
+    pace (minutes per km) scales the straight-line heuristic; it must not
+    exceed the pace of any weight the search will ever see, so pass one
+    derived from a lower bound on future weights (0 disables the heuristic).
+    """
+
+    def __init__(self, graph, weights, start, goal, pace=0.0):
+        if graph.directed:
+            raise ValueError("DStarLite supports undirected road graphs only")
+        self.graph = graph
+        self.indptr = graph.indptr.tolist()
+        self.indices = graph.indices.tolist()
+        self.arc_edge = graph.arc_edge.tolist()
+        self.pos = graph.pos.tolist()
+        self.weights = np.array(weights, dtype=np.float64)
+        self._w = self.weights.tolist()
+        self.pace = pace
+        self.start, self.goal = start, goal
+        self._last = start
+        self.km = 0.0
+        self._set_heuristic()
+        self.g, self.rhs = {}, {goal: 0.0}
+        self._queued = {}
+        self._heap = []
+        self.expanded = 0
+        self._push(goal)
+        self.compute()
+
+    def _h(self, a, b):
+        if not self.pace:
+            return 0.0
+        pa, pb = self.pos[a], self.pos[b]
+        if pa[0] != pa[0] or pb[0] != pb[0]:  # NaN position
+            return 0.0
+        return _haversine(pa, pb) * self.pace
+
+    def _set_heuristic(self):
+        # h(start, s) for every node in one vectorized pass per start position
+        h = distance_km(self.graph.pos, self.graph.pos[self.start]) * self.pace
+        self._h_start = np.nan_to_num(h).tolist()
+
+    def _key(self, s):
+        m = min(self.g.get(s, INF), self.rhs.get(s, INF))
+        return (m + self._h_start[s] + self.km, m)
+
+    def _push(self, s):
+        key = self._key(s)
+        self._queued[s] = key
+        heapq.heappush(self._heap, (key, s))
+
+    def _top(self):
+        heap = self._heap
+        while heap and self._queued.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)  # stale entry
+        return heap[0] if heap else ((INF, INF), None)
+
+    def _update_vertex(self, u):
+        if u != self.goal:
+            best = INF
+            w, g = self._w, self.g
+            for k in range(self.indptr[u], self.indptr[u + 1]):
+                c = w[self.arc_edge[k]] + g.get(self.indices[k], INF)
+                if c < best:
+                    best = c
+            self.rhs[u] = best
+        if self.g.get(u, INF) != self.rhs.get(u, INF):
+            self._push(u)
+        else:
+            self._queued.pop(u, None)
+
+    def compute(self):
+        """
+        Repairs g-values until the start node is locally consistent.
+        Returns the number of vertex expansions this call.
+        """
+        before = self.expanded
+        while True:
+            k_old, u = self._top()
+            start_key = self._key(self.start)
+            if u is None or (k_old >= start_key and self.rhs.get(self.start, INF) <= self.g.get(self.start, INF)):
+                break
+            self.expanded += 1
+            k_new = self._key(u)
+            if k_old < k_new:
+                self._push(u)
+                continue
+            del self._queued[u]
+            heapq.heappop(self._heap)
+            nbrs = self.indices[self.indptr[u]:self.indptr[u + 1]]
+            if self.g.get(u, INF) > self.rhs.get(u, INF):
+                self.g[u] = self.rhs[u]
+                for s in nbrs:
+                    self._update_vertex(s)
+            else:
+                self.g[u] = INF
+                for s in nbrs + [u]:
+                    self._update_vertex(s)
+        return self.expanded - before
+
+    def move_to(self, node):
+        """
+        The vehicle reached `node`; later repairs search from there.
+        """
+        if node != self.start:
+            self.km += self._h(self._last, node)
+            self._last = self.start = node
+            self._set_heuristic()
+
+    def update_weights(self, weights, tolerance=0.0, edges=None):
+        """
+        Applies a new per-edge weight array and repairs only what changed.
+        Edges that moved by at most `tolerance` (relative) keep their old
+        weight, so the route stays within that factor of optimal while small
+        fluctuations cost nothing. If `edges` (edge ids) is given only those
+        edges are considered. Returns (changed edge count, vertex expansions).
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        if edges is None:
+            changed = np.nonzero(np.abs(weights - self.weights) > tolerance * self.weights)[0]
+        else:
+            edges = np.asarray(edges, dtype=np.int64)
+            old = self.weights[edges]
+            changed = edges[np.abs(weights[edges] - old) > tolerance * old]
+        if not len(changed):
+            return 0, 0
+        self.weights[changed] = weights[changed]
+        for e, w in zip(changed.tolist(), weights[changed].tolist()):
+            self._w[e] = w
+        C = self.graph
+        touched = set(C.edge_u[changed].tolist()) | set(C.edge_v[changed].tolist())
+        for u in touched:
+            self._update_vertex(u)
+        return len(changed), self.compute()
+
+    @property
+    def cost(self):
+        # The start may stay overconsistent (g > rhs); rhs is its true distance
+        return self.rhs.get(self.start, INF)
+
+    def path(self):
+        """
+        Current best path (node ids) from the start to the goal, or None.
+        """
+        if self.cost == INF:
+            return None
+        path, u, w, g = [self.start], self.start, self._w, self.g
+        while u != self.goal:
+            best, nxt = INF, None
+            for k in range(self.indptr[u], self.indptr[u + 1]):
+                c = w[self.arc_edge[k]] + g.get(self.indices[k], INF)
+                if c < best:
+                    best, nxt = c, self.indices[k]
+            if nxt is None or len(path) > len(self.indptr):
+                return None
+            path.append(nxt)
+            u = nxt
+        return path
+
+
+class MissionRouter:
+    """
+    Keeps one D* Lite search per active mission on a city graph.
+
+    Feed it each new traffic overlay (or weight array) with reroute(); missions
+    whose edges did not change cost a vectorized diff and nothing else. The
+    traffic model re-noises every edge each minute, so for TrafficPrediction
+    overlays only edges whose congestion status (Low / Medium / High) changed
+    are re-planned by default (by_status); the route is then optimal for the
+    weights last seen at each edge's status change, and its eta is priced on
+    the latest overlay. Plain weight arrays are diffed with `tolerance`
+    (relative) instead. Each search holds O(n) arrays, so at most
+    `max_missions` are kept; the least recently routed one is dropped first.
+    """
+
+    MAX_MISSIONS = 16
+
+    def __init__(self, graph, pace=0.0, tolerance=0.0, max_missions=MAX_MISSIONS, by_status=True):
+        if isinstance(graph, WeightOverlay):
+            graph = graph.graph
+        self.graph = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+        self.pace = pace
+        self.tolerance = tolerance
+        self.max_missions = max_missions
+        self.by_status = by_status
+        self.missions = OrderedDict()
+        # mission id -> (latest weights, congestion status codes the search was planned on)
+        self._latest = {}
+
+    @staticmethod
+    def pace_for(graph, lower_bound):
+        """
+        Heuristic pace (min per km) that stays admissible for any weights >= lower_bound.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pace = np.where(graph.distance > 0, np.asarray(lower_bound) / graph.distance, np.inf)
+        return float(pace.min()) if np.isfinite(pace).any() else 0.0
+
+    def _weights(self, weights):
+        return weights.weight if isinstance(weights, WeightOverlay) else weights
+
+    def _status(self, weights):
+        return getattr(weights, "status_code", None) if self.by_status else None
+
+    def start(self, mission_id, source, target, weights):
+        C = self.graph
+        self.missions[mission_id] = DStarLite(C, self._weights(weights), C.node_id(source), C.node_id(target),
+                                              self.pace)
+        self._latest[mission_id] = (self._weights(weights), self._status(weights))
+        self.missions.move_to_end(mission_id)
+        while len(self.missions) > self.max_missions:
+            dropped, _ = self.missions.popitem(last=False)
+            self._latest.pop(dropped, None)
+        return self.route(mission_id)
+
+    def reroute(self, mission_id, weights, position=None):
+        """
+        Moves the mission to `position` (node name) if given, applies the new
+        weights and returns the repaired route.
+        """
+        search = self.missions[mission_id]
+        self.missions.move_to_end(mission_id)
+        if position is not None:
+            search.move_to(self.graph.node_id(position))
+        status, (_, planned) = self._status(weights), self._latest[mission_id]
+        edges = np.flatnonzero(status != planned) if status is not None and planned is not None else None
+        search.update_weights(self._weights(weights), self.tolerance, edges)
+        self._latest[mission_id] = (self._weights(weights), status)
+        return self.route(mission_id)
+
+    def reroute_all(self, weights):
+        return {mid: self.reroute(mid, weights) for mid in list(self.missions)}
+
+    def end(self, mission_id):
+        self.missions.pop(mission_id, None)
+        self._latest.pop(mission_id, None)
+
+    def route(self, mission_id):
+        """
+        Result dict in the same shape as solve_classical, or None if unreachable.
+        """
+        search = self.missions[mission_id]
+        path = search.path()
+        if path is None:
+            return None
+        C = self.graph
+        eids = [C.edge_id(u, v) for u, v in zip(path[:-1], path[1:])]
+        weights = np.asarray(self._latest[mission_id][0])
+        return {
+            "path": [C.node_name(i) for i in path],
+            "eta": round(float(weights[eids].sum()), 2),
+            "distance": round(float(C.distance[eids].sum()), 2),
+            "method": "Classical (Incremental)",
+            "algorithm": "dstar_lite",
+            "nodes_settled": search.expanded
+        }
@@ -1,6 +1,10 @@
 import requests
 import time
 import random
+import numpy as np
+from backend.geodesy import distance_km
+from backend.matrix_routing import travel_time_matrix
+from backend.ors_client import get_ors_client, decode_polyline, ORS_BASE_URL
 
 class LocationServices:
     """
@@ -9,11 +13,15 @@ class LocationServices:
     - Geocoding, Routing, Traffic, EV Stations, Matrix Routing.
     """
     
-    def __init__(self):
+    def __init__(self, ors_key=None, base_url=ORS_BASE_URL):
         # ---------------------------------------------------------
         # 🔑 API KEY CONFIGURATION
         # ---------------------------------------------------------
+        self.base_url = base_url
         self.ors_key = ""
+        if ors_key is not None:
+            self.ors_key = ors_key
+            return
         try:
             import streamlit as st
             # We look for 'ORS_KEY' now
@@ -30,13 +38,10 @@ class LocationServices:
         """
         if not self.ors_key or "YOUR_ORS_KEY" in self.ors_key:
             return None
-            
-        import openrouteservice
-        client = openrouteservice.Client(key=self.ors_key)
-        
+
         try:
-            # Pelias Geocoding Search
-            res = client.pelias_search(text=query, size=1)
+            # Pelias Geocoding Search (pooled, cached, rate limited)
+            res = self.client.geocode(query, size=1)
             if res and 'features' in res and len(res['features']) > 0:
                 feat = res['features'][0]
                 lon, lat = feat['geometry']['coordinates'] # ORS uses [lon, lat]
@@ -54,20 +59,13 @@ class LocationServices:
         """
         if len(self.ors_key) < 10:
             return self._simulate_traffic_data(u_pos, v_pos)
-            
-        import openrouteservice
-        # Decode polyline
-        from shapely import wkt
-        from openrouteservice.convert import decode_polyline
-        
-        client = openrouteservice.Client(key=self.ors_key)
-        
+
         # ORS expects [[lon, lat], [lon, lat]]
         coords = [[u_pos[1], u_pos[0]], [v_pos[1], v_pos[0]]]
         
         try:
             # profile='driving-car'
-            routes = client.directions(coordinates=coords, profile='driving-car', format='json')
+            routes = self.client.directions(coords, profile='driving-car')
             
             if routes and 'routes' in routes and len(routes['routes']) > 0:
                 route = routes['routes'][0]
@@ -77,10 +75,7 @@ class LocationServices:
                 dur_min = summary['duration'] / 60.0
                 
                 # Decode geometry for mapping
-                geometry_encoded = route['geometry']
-                decoded_coords = decode_polyline(geometry_encoded)
-                # decoded_coords is usually {'coordinates': [[lon, lat], ...], 'type': 'LineString'}
-                path_points = [(p[1], p[0]) for p in decoded_coords['coordinates']] # Convert to [(lat, lon)]
+                path_points = decode_polyline(route['geometry']) # [(lat, lon)]
                 
                 # Infer congestion
                 avg_speed = dist_km / (dur_min / 60.0) if dur_min > 0 else 50
@@ -109,20 +104,18 @@ class LocationServices:
                  sim_time, sim_dist, sim_cong = res
             return sim_time, sim_dist, sim_cong, None
 
+    @property
+    def client(self):
+        """
+        Shared pooled ORS client for this key (one per process).
+        """
+        return get_ors_client(self.ors_key, self.base_url)
+
     def _simulate_traffic_data(self, p1, p2, live_mode=False):
         """
         Internal fallback ensuring the app works without keys.
         """
-        import math
-        # Haversine
-        R = 6371
-        lat1, lon1 = p1
-        lat2, lon2 = p2
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        dist_km = R * c
+        dist_km = float(distance_km(p1, p2))
         
         # Base speed 40 km/h -> 1.5 min per km
         base_time = dist_km * 1.5
@@ -142,11 +135,25 @@ class LocationServices:
         """
         Checks if vehicle is within a circular geofence.
         """
-        # Calculate distance
-        # unpack 4 values (time, dist, status, geom)
-        _, dist_km, _, _ = self._simulate_traffic_data(vehicle_pos, fence_center)
+        dist_km = round(float(distance_km(vehicle_pos, fence_center)), 2)
         return dist_km <= radius_km, dist_km
 
+    def check_geofences(self, positions, fence_center, radius_km=2.0):
+        """
+        Vectorized geofence check for a whole fleet.
+        Returns (inside bool array, distance_km array) aligned with positions.
+        """
+        dists = np.round(distance_km(np.asarray(positions, dtype=float).reshape(-1, 2), fence_center), 2)
+        return dists <= radius_km, dists
+
+    def dispatch_matrix(self, assets, targets, graph, ch=None):
+        """
+        Matrix Routing: ETA (minutes) from every tracked asset to every target.
+        assets: track_assets() output; targets: node names or (lat, lon) points.
+        """
+        sources = [(a['lat'], a['lon']) for a in assets]
+        return travel_time_matrix(sources, targets, graph, ch=ch)
+
     def track_assets(self):
         """
         Simulates tracking multiple assets (Assets API).
@@ -0,0 +1,150 @@
+"""
+Many-to-many travel-time matrices for fleet dispatch.
+
+Two strategies, both over the array-backed CSRGraph:
+
+- With a ContractionHierarchy: bucket-based many-to-many. One backward
+  upward search per target fills per-node buckets, then one forward upward
+  search per source meets them; the bucket scan is a single NumPy min.
+- Without one: a one-to-many Dijkstra per unique source node that stops as
+  soon as every target node is settled.
+
+Points can be graph node names or raw (lat, lon) pairs; raw points are
+snapped to the nearest node and pay a straight-line access leg at the same
+40 km/h used by LocationServices' simulation fallback.
+"""
+import heapq
+
+import numpy as np
+
+from backend.graph_engine import CSRGraph, WeightOverlay
+from backend.spatial_index import get_spatial_index
+
+ACCESS_MIN_PER_KM = 1.5
+
+
+def snap_points(C, points, index=None):
+    """
+    Maps node names or (lat, lon) points to (node ids, access minutes).
+    """
+    ids = np.empty(len(points), dtype=np.int64)
+    access = np.zeros(len(points))
+    raw = []
+    for i, p in enumerate(points):
+        try:
+            known = p in C.index
+        except TypeError:  # lists are unhashable, so they can only be coordinates
+            known = False
+        if known:
+            ids[i] = C.node_id(p)
+        else:
+            raw.append(i)
+    if raw:
+        index = index or get_spatial_index(C)
+        for i in raw:
+            ids[i], dist = index.nearest_node_id(*points[i])
+            access[i] = dist * ACCESS_MIN_PER_KM
+    return ids, access
+
+
+def _one_to_many(indptr, indices, arc_w, source, targets):
+    """
+    Dijkstra from source over plain-list CSR arrays; stops once all targets settle.
+    """
+    remaining = set(targets)
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    done = set()
+    while heap and remaining:
+        d, u = heapq.heappop(heap)
+        if u in done:
+            continue
+        done.add(u)
+        remaining.discard(u)
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            nd = d + arc_w[k]
+            if nd < dist.get(v, float("inf")):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return dist
+
+
+def _matrix_dijkstra(C, src_ids, tgt_ids, weight):
+    indptr, indices = C.indptr.tolist(), C.indices.tolist()
+    arc_w = C.arc_weights(weight).tolist()
+    targets = set(tgt_ids.tolist())
+    rows = {}
+    for s in set(src_ids.tolist()):
+        dist = _one_to_many(indptr, indices, arc_w, s, targets)
+        rows[s] = np.array([dist.get(t, np.inf) for t in tgt_ids.tolist()])
+    return np.vstack([rows[s] for s in src_ids.tolist()]) if len(src_ids) else np.zeros((0, len(tgt_ids)))
+
+
+def _matrix_buckets(ch, src_ids, tgt_ids, chunk_cells=4_000_000):
+    """
+    Buckets are stored densely: one column per node touched by any backward
+    search, so combining a source with all targets is a broadcast min.
+    """
+    backward = [ch.upward_search(t)[0] for t in tgt_ids.tolist()]
+    columns = {}
+    for dist in backward:
+        for v in dist:
+            columns.setdefault(v, len(columns))
+    B = np.full((len(tgt_ids), len(columns)), np.inf)
+    for j, dist in enumerate(backward):
+        B[j, [columns[v] for v in dist]] = list(dist.values())
+
+    F = np.full((len(src_ids), len(columns)), np.inf)
+    for i, s in enumerate(src_ids.tolist()):
+        hits = [(columns[v], d) for v, d in ch.upward_search(s)[0].items() if v in columns]
+        if hits:
+            cols, vals = zip(*hits)
+            F[i, list(cols)] = vals
+
+    M = np.empty((len(src_ids), len(tgt_ids)))
+    step = max(1, chunk_cells // max(1, B.size))
+    for lo in range(0, len(src_ids), step):
+        M[lo:lo + step] = (F[lo:lo + step, None, :] + B[None, :, :]).min(axis=2, initial=np.inf)
+    return M
+
+
+def travel_time_matrix(sources, targets, graph, ch=None, weight=None):
+    """
+    ETA matrix (minutes) of shape (len(sources), len(targets)).
+
+    graph  : networkx graph, CSRGraph or WeightOverlay (e.g. a TrafficPrediction)
+    ch     : optional ContractionHierarchy over the same topology
+    weight : optional per-edge weight array overriding the graph's weights
+    Unreachable pairs are np.inf.
+    """
+    if isinstance(graph, WeightOverlay):
+        weight = graph.weight if weight is None else weight
+        graph = graph.graph
+    if ch is not None:
+        C = ch.graph
+        if weight is not None:
+            ch.customize(weight)
+        else:
+            ch.customize_for(graph)
+    else:
+        C = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+
+    # Index the caller's graph object so it is reused across calls
+    index = get_spatial_index(ch.graph if ch is not None else graph)
+    src_ids, src_access = snap_points(C, list(sources), index)
+    tgt_ids, tgt_access = snap_points(C, list(targets), index)
+    if ch is not None:
+        M = _matrix_buckets(ch, src_ids, tgt_ids)
+    else:
+        M = _matrix_dijkstra(C, src_ids, tgt_ids, weight)
+    return M + src_access[:, None] + tgt_access[None, :]
+
+
+def assign_nearest_units(matrix):
+    """
+    For each target column, the index of the fastest source and its ETA.
+    """
+    matrix = np.asarray(matrix)
+    best = np.argmin(matrix, axis=0)
+    return best, matrix[best, np.arange(matrix.shape[1])]
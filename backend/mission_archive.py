@@ -0,0 +1,239 @@
+"""
+Retention and monthly partitioning for mission history.
+
+The hot `missions` table only keeps recent rows. Older rows are moved into
+one SQLite file per calendar month (data/archive/missions_YYYY_MM.db) with
+the same schema; the month's `route_traces` rows move with them, so the
+trace table is bounded by the same retention window. Both files run in WAL
+mode, where a commit spanning ATTACHed databases is not atomic, so each month
+is moved in two transactions: the rows of both tables are copied into the
+partition and committed first, then deleted from the hot tables. A crash
+in between leaves a row in both places (query_missions de-duplicates by id
+and a retry is idempotent), never in neither.
+Partitions that stop receiving rows are compacted: VACUUM + ANALYZE,
+rollback journal instead of WAL, and marked sealed with PRAGMA user_version.
+
+query_missions() answers a time-range query by opening only the partitions
+whose month overlaps the range, plus the hot table, and returns NumPy
+columns like the rest of the analytics API. Hourly rollups are history-wide
+and are not touched by archiving.
+
+Retention is a maintenance job, not part of serving a page: it copies,
+deletes and VACUUMs, and takes the same write lock as the mission writer.
+Schedule it (e.g. nightly cron) with
+
+    python -m backend.mission_archive [--hot-days 30] [--compact-after-days 62]
+"""
+import argparse
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from backend.database import (MissionHistory, RouteTrace, create_tuned_engine, cursor_columns, fetch_columns,
+                              init_db)
+
+ARCHIVE_DIR = os.path.join("data", "archive")
+HOT_DAYS = 30
+COMPACT_AFTER_DAYS = 62
+# Matches SQLAlchemy's SQLite DateTime storage, so string comparison is chronological
+TS_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+# Tables moved per month; both are keyed by id and timestamped
+ARCHIVED_TABLES = ("missions", "route_traces")
+QUERY_COLUMNS = ("id", "timestamp", "city", "emergency_type", "classical_eta", "quantum_eta",
+                 "time_saved", "distance_km", "qubits_used", "status")
+
+
+def _month_start(ts):
+    return datetime(ts.year, ts.month, 1)
+
+
+def _next_month(ts):
+    return datetime(ts.year + (ts.month == 12), ts.month % 12 + 1, 1)
+
+
+def months_between(start, end):
+    """
+    First day of every month overlapping [start, end).
+    """
+    months, month = [], _month_start(start)
+    while month < end:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def partition_path(month, directory=ARCHIVE_DIR):
+    return os.path.join(directory, f"missions_{month.year:04d}_{month.month:02d}.db")
+
+
+def partitions_for(start, end, directory=ARCHIVE_DIR):
+    """
+    Existing partition files a query over [start, end) has to read.
+    """
+    return [p for p in (partition_path(m, directory) for m in months_between(start, end)) if os.path.exists(p)]
+
+
+def _ensure_partition(path):
+    # checkfirst: partitions written before traces were archived gain the table
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    eng = create_tuned_engine(f"sqlite:///{path}")
+    for table in (MissionHistory.__table__, RouteTrace.__table__):
+        table.create(eng, checkfirst=True)
+    eng.dispose()
+
+
+def _hot_bind(bind):
+    if bind is None:
+        from backend.database import engine
+        init_db()
+        return engine
+    return bind
+
+
+def archive_missions(cutoff, bind=None, directory=ARCHIVE_DIR):
+    """
+    Moves hot missions and route traces older than `cutoff` into their
+    monthly partitions. Returns {partition path: missions moved}.
+    """
+    bind = _hot_bind(bind)
+    cutoff_s = cutoff.strftime(TS_FORMAT)
+    raw = bind.raw_connection()
+    moved = {}
+    try:
+        conn = raw.driver_connection
+        months = [row[0] for row in conn.execute(
+            "SELECT substr(timestamp, 1, 7) AS ym FROM missions WHERE timestamp < ? "
+            "UNION SELECT substr(timestamp, 1, 7) FROM route_traces WHERE timestamp < ? ORDER BY ym",
+            (cutoff_s, cutoff_s))]
+        conn.commit()
+        for ym in months:
+            month = datetime.strptime(ym, "%Y-%m")
+            lo = month.strftime(TS_FORMAT)
+            hi = min(_next_month(month), cutoff).strftime(TS_FORMAT)
+            path = partition_path(month, directory)
+            _ensure_partition(path)
+            conn.execute("ATTACH DATABASE ? AS part", (path,))
+            try:
+                # 1. copy and commit into the partition; INSERT OR IGNORE keeps a retry idempotent
+                for table in ARCHIVED_TABLES:
+                    conn.execute(f"INSERT OR IGNORE INTO part.{table} SELECT * FROM main.{table} "
+                                 "WHERE timestamp >= ? AND timestamp < ?", (lo, hi))
+                conn.execute("PRAGMA part.user_version = 0")  # open again if it was sealed
+                conn.commit()
+                # 2. only then drop the hot copies of rows the partition now holds
+                deleted = {}
+                for table in ARCHIVED_TABLES:
+                    deleted[table] = conn.execute(f"DELETE FROM main.{table} WHERE timestamp >= ? AND timestamp < ? "
+                                                  f"AND id IN (SELECT id FROM part.{table})", (lo, hi)).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.execute("DETACH DATABASE part")
+            moved[path] = deleted["missions"]
+    finally:
+        raw.close()
+    return moved
+
+
+def compact_partitions(before, directory=ARCHIVE_DIR):
+    """
+    Seals partitions for months that ended before `before`. Returns their paths.
+    """
+    if not os.path.isdir(directory):
+        return []
+    sealed = []
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith("missions_") and name.endswith(".db")):
+            continue
+        month = datetime.strptime(name[len("missions_"):-3], "%Y_%m")
+        if _next_month(month) > before:
+            continue
+        path = os.path.join(directory, name)
+        conn = sqlite3.connect(path)
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] == 1:
+                continue
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.execute("VACUUM")
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA user_version = 1")
+            conn.commit()
+            sealed.append(path)
+        finally:
+            conn.close()
+    return sealed
+
+
+def query_missions(start, end, columns=QUERY_COLUMNS, bind=None, directory=ARCHIVE_DIR):
+    """
+    Missions with start <= timestamp < end from the hot table and the
+    partitions overlapping the range, as NumPy columns sorted by time.
+    columns must be missions table columns (ValueError otherwise).
+    """
+    bad = set(columns) - set(MissionHistory.__table__.columns.keys())
+    if bad:
+        raise ValueError(f"Unknown mission columns {sorted(bad)}")
+    bind = _hot_bind(bind)
+    if "timestamp" not in columns:
+        columns = tuple(columns) + ("timestamp",)
+    if "id" not in columns:
+        columns = tuple(columns) + ("id",)
+    sql = f"SELECT {', '.join(columns)} FROM missions WHERE timestamp >= ? AND timestamp < ?"
+    params = (start.strftime(TS_FORMAT), end.strftime(TS_FORMAT))
+
+    parts = [fetch_columns(sql, params, bind)]
+    for path in partitions_for(start, end, directory):
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            parts.append(cursor_columns(conn, sql, params))
+        finally:
+            conn.close()
+    parts = [p for p in parts if len(p["id"])]
+    if not parts:
+        return {c: np.empty(0) for c in columns}
+    cols = {c: np.concatenate([p[c] for p in parts]) for c in columns}
+    # A row can briefly exist in both places if archiving was interrupted
+    _, first = np.unique(cols["id"], return_index=True)
+    order = first[np.argsort(cols["timestamp"][first], kind="stable")]
+    cols = {c: v[order] for c, v in cols.items()}
+    cols["timestamp"] = cols["timestamp"].astype("datetime64[us]")
+    return cols
+
+
+class RetentionPolicy:
+    """
+    Keeps `hot_days` of missions in the hot table, archives the rest by month
+    and seals partitions once they are `compact_after_days` old.
+    """
+
+    def __init__(self, hot_days=HOT_DAYS, compact_after_days=COMPACT_AFTER_DAYS, directory=ARCHIVE_DIR):
+        self.hot_days = hot_days
+        self.compact_after_days = compact_after_days
+        self.directory = directory
+
+    def apply(self, now=None, bind=None):
+        now = now or datetime.utcnow()
+        moved = archive_missions(now - timedelta(days=self.hot_days), bind, self.directory)
+        sealed = compact_partitions(now - timedelta(days=self.compact_after_days), self.directory)
+        return {"archived": moved, "compacted": sealed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old missions into monthly partitions.")
+    parser.add_argument("--hot-days", type=int, default=HOT_DAYS)
+    parser.add_argument("--compact-after-days", type=int, default=COMPACT_AFTER_DAYS)
+    parser.add_argument("--directory", default=ARCHIVE_DIR)
+    args = parser.parse_args()
+    result = RetentionPolicy(args.hot_days, args.compact_after_days, args.directory).apply()
+    for path, n in sorted(result["archived"].items()):
+        print(f"archived {n:6d} missions -> {path}")
+    for path in result["compacted"]:
+        print(f"sealed {path}")
+
+
+if __name__ == "__main__":
+    main()
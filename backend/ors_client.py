@@ -0,0 +1,230 @@
+"""
+Pooled OpenRouteService HTTP client with an on-disk response cache and a
+token-bucket rate limiter.
+
+One client per (key, base URL) is shared by the whole process, so every call
+reuses the same keep-alive connection pool instead of paying connection and
+TLS setup each time. Directions and geocoding responses are cached in a small
+SQLite file keyed by rounded coordinates or normalised query text; cache hits
+never touch the network or the rate limiter.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+ORS_BASE_URL = "https://api.openrouteservice.org"
+CACHE_PATH = os.path.join("data", "ors_cache.sqlite")
+CACHE_TTL_S = 24 * 3600
+# 5 decimals is ~1 m: clicks on the same spot share a cache entry
+COORD_DECIMALS = 5
+# Free ORS plan: 40 directions requests per minute
+RATE_PER_S = 40 / 60
+BURST = 5
+
+
+def decode_polyline(encoded, precision=5):
+    """
+    Google encoded polyline -> [(lat, lon), ...]. ORS returns directions
+    geometry in this format unless asked for GeoJSON.
+    """
+    coords, index, lat, lon = [], 0, 0, 0
+    factor = 10 ** precision
+    while index < len(encoded):
+        for is_lon in (False, True):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            delta = ~(result >> 1) if result & 1 else result >> 1
+            if is_lon:
+                lon += delta
+            else:
+                lat += delta
+        coords.append((lat / factor, lon / factor))
+    return coords
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, at most `capacity` banked.
+    """
+
+    def __init__(self, rate=RATE_PER_S, capacity=BURST, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """
+        Blocks until `tokens` are available; returns the time spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+
+
+class ResponseCache:
+    """
+    SQLite-backed JSON response cache with a TTL.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL_S, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, created REAL, body TEXT)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind, payload):
+        return kind + ":" + hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT created, body FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or self.clock() - row[0] > self.ttl:
+            return None
+        return json.loads(row[1])
+
+    def put(self, key, body):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                               (key, self.clock(), json.dumps(body)))
+            self._conn.commit()
+
+    def purge(self):
+        """
+        Deletes expired entries; returns how many were removed.
+        """
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM responses WHERE created < ?", (self.clock() - self.ttl,))
+            self._conn.commit()
+        return cur.rowcount
+
+    def close(self):
+        self._conn.close()
+
+
+class OrsClient:
+    """
+    Minimal ORS client over one pooled requests.Session.
+    """
+
+    def __init__(self, key, base_url=ORS_BASE_URL, cache=None, limiter=None, timeout=10, pool_size=8):
+        self.key = key
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache if cache is not None else ResponseCache()
+        self.limiter = limiter if limiter is not None else TokenBucket()
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Authorization": key, "Accept": "application/json"})
+        self.network_calls = 0
+        self.cache_hits = 0
+
+    def _cached(self, kind, payload, fetch):
+        key = ResponseCache.make_key(kind, payload)
+        body = self.cache.get(key)
+        if body is not None:
+            self.cache_hits += 1
+            return body
+        self.limiter.acquire()
+        self.network_calls += 1
+        body = fetch()
+        self.cache.put(key, body)
+        return body
+
+    def _post(self, path, payload):
+        resp = self.session.post(self.base_url + path, json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def directions(self, coordinates, profile="driving-car"):
+        """
+        Directions JSON for [[lon, lat], ...] coordinates.
+        """
+        coords = [[round(float(lon), COORD_DECIMALS), round(float(lat), COORD_DECIMALS)] for lon, lat in coordinates]
+        payload = {"coordinates": coords}
+        return self._cached("directions/" + profile, payload,
+                            lambda: self._post(f"/v2/directions/{profile}/json", payload))
+
+    def matrix(self, locations, sources, destinations, profile="driving-car"):
+        """
+        Matrix JSON (durations in s, distances in m) between [[lon, lat], ...]
+        locations, selected by index lists.
+        """
+        locs = [[round(float(lon), COORD_DECIMALS), round(float(lat), COORD_DECIMALS)] for lon, lat in locations]
+        payload = {"locations": locs, "sources": list(sources), "destinations": list(destinations),
+                   "metrics": ["duration", "distance"], "units": "m"}
+        return self._cached("matrix/" + profile, payload, lambda: self._post(f"/v2/matrix/{profile}", payload))
+
+    def geocode(self, text, size=1):
+        """
+        Pelias search GeoJSON for a free-text query.
+        """
+        params = {"text": " ".join(text.split()), "size": size}
+
+        def fetch():
+            resp = self.session.get(self.base_url + "/geocode/search", params=dict(params, api_key=self.key),
+                                    timeout=self.timeout)
+            resp.raise_for_status()
+            return resp.json()
+        return self._cached("geocode", dict(params, text=params["text"].lower()), fetch)
+
+    def close(self):
+        self.session.close()
+
+
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_ors_client(key, base_url=ORS_BASE_URL, **kwargs):
+    """
+    Process-wide OrsClient for an API key and endpoint.
+    """
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get((key, base_url))
+        if client is None:
+            client = _CLIENTS[(key, base_url)] = OrsClient(key, base_url, **kwargs)
+        return client
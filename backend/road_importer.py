@@ -0,0 +1,372 @@
+"""
+Bulk road-network importer.
+
+Reads a local OSM extract (.osm / .osm.pbf), a GeoJSON road layer or a pair
+of node/edge CSV files, and writes a compact on-disk graph artifact:
+
+    data/graph_cache/<city>/
+        meta.json        header (format version, source hash, sizes, attrs)
+        names.json       node names, in node-id order
+        *.npy            CSR + per-edge arrays, loaded with mmap_mode='r'
+
+Subsequent loads memory-map the arrays instead of re-parsing the source.
+The artifact is rebuilt whenever the source file's SHA-256 changes.
+"""
+import csv
+import hashlib
+import json
+import os
+import shutil
+import time
+import xml.etree.ElementTree as ET
+from array import array
+
+import numpy as np
+
+from backend.geodesy import edge_geometry
+from backend.graph_engine import CSRGraph
+
+CACHE_VERSION = 2  # 2: weight / distance stored unrounded
+DEFAULT_CACHE_DIR = os.path.join("data", "graph_cache")
+
+# Free-flow speeds (km/h) used to turn segment length into travel minutes
+HIGHWAY_SPEEDS = {
+    "motorway": 80, "trunk": 65, "primary": 50, "secondary": 40,
+    "tertiary": 35, "unclassified": 30, "residential": 25, "service": 15,
+    "motorway_link": 50, "trunk_link": 40, "primary_link": 35,
+    "secondary_link": 30, "tertiary_link": 25, "living_street": 10,
+}
+DEFAULT_SPEED = 30
+
+ARRAY_FILES = ("pos", "edge_u", "edge_v", "weight", "distance", "base_weight",
+               "indptr", "indices", "arc_edge")
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _speed_for(tags):
+    maxspeed = str(tags.get("maxspeed", "")).split()[0] if tags.get("maxspeed") else ""
+    if maxspeed.isdigit():
+        return float(maxspeed)
+    return float(HIGHWAY_SPEEDS.get(tags.get("highway"), DEFAULT_SPEED))
+
+
+class _NetworkBuilder:
+    """
+    Accumulates nodes and edges in typed arrays while a source is streamed.
+    """
+
+    def __init__(self):
+        self.key_index = {}
+        self.names = []
+        self.lat = array("d")
+        self.lon = array("d")
+        self.u = array("i")
+        self.v = array("i")
+        self.speed = array("d")
+        self.weight = array("d")  # NaN -> derive from distance and speed
+
+    def add_node(self, key, lat, lon, name=None):
+        if key in self.key_index:
+            return self.key_index[key]
+        idx = len(self.names)
+        self.key_index[key] = idx
+        self.names.append(name if name is not None else str(key))
+        self.lat.append(float(lat))
+        self.lon.append(float(lon))
+        return idx
+
+    def add_edge(self, a, b, speed=DEFAULT_SPEED, weight=float("nan")):
+        if a == b:
+            return
+        self.u.append(a)
+        self.v.append(b)
+        self.speed.append(speed)
+        self.weight.append(weight)
+
+    def build(self):
+        n = len(self.names)
+        pos = np.column_stack([np.frombuffer(self.lat), np.frombuffer(self.lon)]) if n else np.zeros((0, 2))
+        u = np.frombuffer(self.u, dtype=np.int32)
+        v = np.frombuffer(self.v, dtype=np.int32)
+        dist, _ = edge_geometry(pos, u, v)
+        weight = np.frombuffer(self.weight).copy()
+        derived = np.isnan(weight)
+        weight[derived] = dist[derived] / np.frombuffer(self.speed)[derived] * 60.0
+
+        # Collapse parallel segments, keeping the fastest one
+        lo, hi = np.minimum(u, v), np.maximum(u, v)
+        order = np.lexsort((weight, hi, lo))
+        key = lo[order].astype(np.int64) * n + hi[order]
+        keep = order[np.concatenate([[True], key[1:] != key[:-1]])] if len(key) else order
+        keep.sort()
+
+        # Stored unrounded: rounding to 0.01 would turn short OSM segments into zero-cost edges
+        weight = weight[keep]
+        return CSRGraph(self.names, pos, u[keep], v[keep], weight, dist[keep], weight.copy())
+
+
+# ----------------------------------------------------------------------
+# Source parsers
+# ----------------------------------------------------------------------
+def _iter_osm_xml(path):
+    """
+    Streams an .osm XML extract with iterparse, clearing elements as it goes.
+    Yields ("node", id, (lat, lon)) and ("way", tags, refs).
+    """
+    tags, refs = {}, []
+    root = None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if root is None:
+            root = elem
+        if event == "start":
+            continue
+        if elem.tag == "tag":
+            tags[elem.get("k")] = elem.get("v")
+        elif elem.tag == "nd":
+            refs.append(elem.get("ref"))
+        elif elem.tag in ("node", "way", "relation"):
+            if elem.tag == "node":
+                yield "node", elem.get("id"), (float(elem.get("lat")), float(elem.get("lon")))
+            elif elem.tag == "way":
+                yield "way", tags, refs
+            tags, refs = {}, []
+            # Drop parsed children so memory stays bounded by the coordinate table
+            root.clear()
+
+
+def _parse_osm_xml(path, builder):
+    """
+    Two passes over the file: the first collects the node ids referenced by
+    highway ways, the second keeps coordinates for those nodes only (extracts
+    are mostly building / landuse nodes) and adds the ways. Nodes precede
+    ways in OSM files, so coordinates are known when a way arrives.
+    """
+    needed = set()
+    for kind, tags, refs in _iter_osm_xml(path):
+        if kind == "way" and "highway" in tags:
+            needed.update(refs)
+    coords = {}
+    for kind, a, b in _iter_osm_xml(path):
+        if kind == "node":
+            if a in needed:
+                coords[a] = b
+        elif kind == "way":
+            _add_way(builder, a, [(r, *coords[r]) for r in b if r in coords])
+
+
+def _add_way(builder, tags, nodes):
+    """
+    nodes: (ref, lat, lon) of the way's nodes, in order.
+    """
+    if "highway" not in tags:
+        return
+    ids = [builder.add_node(r, lat, lon) for r, lat, lon in nodes]
+    speed = _speed_for(tags)
+    for a, b in zip(ids[:-1], ids[1:]):
+        builder.add_edge(a, b, speed)
+
+
+def _parse_osm_pbf(path, builder):
+    try:
+        import osmium
+    except ImportError:
+        raise ImportError("Reading .osm.pbf files needs pyosmium: pip install osmium")
+
+    class Handler(osmium.SimpleHandler):
+        def way(self, w):
+            tags = dict((t.k, t.v) for t in w.tags)
+            if "highway" in tags:
+                _add_way(builder, tags, [(str(nd.ref), nd.location.lat, nd.location.lon)
+                                         for nd in w.nodes if nd.location.valid()])
+
+    # locations=True: osmium keeps node locations in its own compact index
+    # instead of a Python dict of every node in the extract
+    Handler().apply_file(path, locations=True)
+
+
+def _iter_geojson_features(path):
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+    with open(path, "rb") as f:
+        if ijson is not None:
+            yield from ijson.items(f, "features.item", use_float=True)
+        else:
+            yield from json.load(f).get("features", [])
+
+
+def _parse_geojson(path, builder):
+    """
+    LineString / MultiLineString features become chains of edges. Vertices are
+    matched across features by coordinates rounded to ~10 cm.
+    """
+    for feat in _iter_geojson_features(path):
+        geom = feat.get("geometry") or {}
+        props = feat.get("properties") or {}
+        if geom.get("type") == "LineString":
+            lines = [geom["coordinates"]]
+        elif geom.get("type") == "MultiLineString":
+            lines = geom["coordinates"]
+        else:
+            continue
+        speed = _speed_for(props)
+        for line in lines:
+            ids = []
+            for lon, lat in (c[:2] for c in line):
+                key = (round(lat, 6), round(lon, 6))
+                ids.append(builder.add_node(key, lat, lon, name=f"{key[0]},{key[1]}"))
+            for a, b in zip(ids[:-1], ids[1:]):
+                builder.add_edge(a, b, speed)
+
+
+def _parse_csv(nodes_path, edges_path, builder):
+    """
+    nodes.csv: id,lat,lon[,name]    edges.csv: source,target[,weight][,speed]
+    """
+    with open(nodes_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            builder.add_node(row["id"], row["lat"], row["lon"], name=row.get("name") or row["id"])
+    with open(edges_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            weight = float(row["weight"]) if row.get("weight") else float("nan")
+            speed = float(row["speed"]) if row.get("speed") else DEFAULT_SPEED
+            builder.add_edge(builder.key_index[row["source"]], builder.key_index[row["target"]], speed, weight)
+
+
+def _detect_format(path):
+    lower = path.lower()
+    if lower.endswith(".osm.pbf") or lower.endswith(".pbf"):
+        return "pbf"
+    if lower.endswith(".osm") or lower.endswith(".xml"):
+        return "osm"
+    if lower.endswith(".geojson") or lower.endswith(".json"):
+        return "geojson"
+    if lower.endswith(".csv"):
+        return "csv"
+    raise ValueError(f"Unknown road network format: {path}")
+
+
+# ----------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------
+def _city_dir(city, cache_dir):
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in city)
+    return os.path.join(cache_dir, safe)
+
+
+def save_graph_cache(C, city, meta, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Writes a CSRGraph as .npy arrays plus a JSON header. Writes go to a temp
+    directory that is swapped in at the end so readers never see a partial cache.
+    """
+    target = _city_dir(city, cache_dir)
+    tmp = target + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name in ARRAY_FILES:
+        np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(getattr(C, name)))
+    with open(os.path.join(tmp, "names.json"), "w", encoding="utf-8") as f:
+        json.dump(C.names, f)
+    header = dict(meta, version=CACHE_VERSION, city=city, created=time.time(),
+                  nodes=C.number_of_nodes(), edges=C.number_of_edges())
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(header, f, indent=2)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return target
+
+
+def _read_cache(city, cache_dir):
+    path = _city_dir(city, cache_dir)
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None, None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != CACHE_VERSION:
+        return None, meta
+    arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in ARRAY_FILES}
+    with open(os.path.join(path, "names.json"), encoding="utf-8") as f:
+        names = json.load(f)
+    C = CSRGraph(names, arrays["pos"], arrays["edge_u"], arrays["edge_v"], arrays["weight"],
+                 arrays["distance"], arrays["base_weight"], graph_attrs={"city": city},
+                 csr=(arrays["indptr"], arrays["indices"], arrays["arc_edge"]))
+    return C, meta
+
+
+def _source_hash(path, edges_path=None):
+    sha = file_sha256(path)
+    if edges_path:
+        sha = hashlib.sha256((sha + file_sha256(edges_path)).encode()).hexdigest()
+    return sha
+
+
+def _source_stats(path, edges_path=None):
+    return [[os.stat(p).st_size, os.stat(p).st_mtime] for p in (path, edges_path) if p]
+
+
+def _source_changed(meta):
+    """
+    Cheap stat check first; only re-hash when a size or mtime moved.
+    """
+    src, edges_src = meta.get("source"), meta.get("edges_source")
+    if not src or not all(os.path.exists(p) for p in (src, edges_src) if p):
+        return False
+    if _source_stats(src, edges_src) == meta.get("stats"):
+        return False
+    return _source_hash(src, edges_src) != meta.get("sha256")
+
+
+def import_road_network(path, city, fmt=None, edges_path=None, cache_dir=DEFAULT_CACHE_DIR, force=False):
+    """
+    Imports a road network for `city` and returns it as a memory-mapped CSRGraph.
+    Reuses the existing artifact when the source hash is unchanged.
+    """
+    fmt = fmt or _detect_format(path)
+    sha = _source_hash(path, edges_path)
+    if not force:
+        C, meta = _read_cache(city, cache_dir)
+        if C is not None and meta.get("sha256") == sha:
+            return C
+
+    builder = _NetworkBuilder()
+    if fmt == "osm":
+        _parse_osm_xml(path, builder)
+    elif fmt == "pbf":
+        _parse_osm_pbf(path, builder)
+    elif fmt == "geojson":
+        _parse_geojson(path, builder)
+    elif fmt == "csv":
+        if not edges_path:
+            raise ValueError("CSV import needs both a nodes file and an edges file")
+        _parse_csv(path, edges_path, builder)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    meta = {"source": os.path.abspath(path), "edges_source": os.path.abspath(edges_path) if edges_path else None,
+            "format": fmt, "sha256": sha, "stats": _source_stats(path, edges_path)}
+    save_graph_cache(builder.build(), city, meta, cache_dir)
+    C, _ = _read_cache(city, cache_dir)
+    return C
+
+
+def load_cached_graph(city, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Returns the cached CSRGraph for a city, re-importing if its source changed.
+    None when the city was never imported.
+    """
+    C, meta = _read_cache(city, cache_dir)
+    if meta is None:
+        return None
+    if C is None or _source_changed(meta):
+        return import_road_network(meta["source"], city, fmt=meta["format"],
+                                   edges_path=meta.get("edges_source"), cache_dir=cache_dir, force=True)
+    return C
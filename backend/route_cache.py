@@ -0,0 +1,173 @@
+"""
+In-process route result cache.
+
+Traffic predictions are deterministic within a minute (the overlay seed is the
+minute plus any offset), so a route solved on one overlay stays valid until
+the minute rolls over. Results are keyed by the topology's content version,
+city, emergency type, traffic seed, endpoints and solver options; entries are
+dropped as soon as the wall-clock minute changes and the least recently used
+ones are evicted beyond `maxsize`.
+"""
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+from backend.graph_engine import CSRGraph, WeightOverlay
+from backend.classical_solver import solve_classical
+from backend.traffic_model import current_minute
+
+_VERSIONS = weakref.WeakKeyDictionary()
+_TOPOLOGIES = weakref.WeakKeyDictionary()
+
+
+def graph_version(graph):
+    """
+    Short content hash of a CSRGraph's topology and base arrays, computed once
+    per graph. Two loads of the same road network share a version.
+    """
+    if isinstance(graph, WeightOverlay):
+        graph = graph.graph
+    version = _VERSIONS.get(graph)
+    if version is None:
+        h = hashlib.blake2b(digest_size=8)
+        h.update(repr(graph.names).encode())
+        for arr in (graph.edge_u, graph.edge_v, graph.distance, graph.base_weight):
+            h.update(arr.tobytes())
+        version = _VERSIONS[graph] = h.hexdigest()
+    return version
+
+
+def topology_version(graph):
+    """
+    Short content hash of a CSRGraph's node names, positions and edge
+    endpoints only. Unlike graph_version it survives weight refreshes, so it
+    keys data tied to node / edge ids rather than to costs.
+    """
+    if isinstance(graph, WeightOverlay):
+        graph = graph.graph
+    version = _TOPOLOGIES.get(graph)
+    if version is None:
+        h = hashlib.blake2b(digest_size=8)
+        h.update(repr(graph.names).encode())
+        for arr in (graph.edge_u, graph.edge_v, graph.pos):
+            h.update(arr.tobytes())
+        version = _TOPOLOGIES[graph] = h.hexdigest()
+    return version
+
+
+def route_key(graph, source, target, solver, **options):
+    """
+    Cache key for a solve on a weight overlay, or None for inputs that cannot be
+    keyed safely (plain networkx graphs may be edited in place).
+    """
+    if isinstance(graph, WeightOverlay):
+        C = graph.graph
+    elif isinstance(graph, CSRGraph):
+        C = graph
+    else:
+        return None
+    seed = getattr(graph, "seed", None)
+    if seed is None:
+        # Overlay not tied to a traffic minute: key by its weights instead
+        seed = hashlib.blake2b(graph.weight.tobytes(), digest_size=8).hexdigest()
+    return (graph_version(C), C.graph_attrs.get("city"), getattr(graph, "emergency_type", None), seed,
+            source, target, solver, tuple(sorted(options.items())))
+
+
+class RouteCache:
+    """
+    LRU of solve results that expires wholesale when the traffic minute rolls over.
+    """
+
+    def __init__(self, maxsize=512, clock=current_minute):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._bucket = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def _roll(self):
+        bucket = self.clock()
+        if bucket != self._bucket:
+            self.expirations += len(self._entries)
+            self._entries.clear()
+            self._bucket = bucket
+
+    def get(self, key):
+        """
+        Cached result (a shallow copy) or None. A None key always misses.
+        """
+        with self._lock:
+            self._roll()
+            result = self._entries.get(key) if key is not None else None
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(result)
+
+    def put(self, key, result):
+        if key is None or not result:
+            return
+        with self._lock:
+            self._roll()
+            self._entries[key] = dict(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def fill_from(self, future, key):
+        """
+        Stores a concurrent.futures result once it completes, so answers that
+        miss their deadline still serve later repeats in the same minute.
+        """
+        def _done(f):
+            if not f.cancelled() and f.exception() is None:
+                self.put(key, f.result())
+        future.add_done_callback(_done)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries), "hits": self.hits, "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions, "expirations": self.expirations,
+        }
+
+
+ROUTE_CACHE = RouteCache()
+
+
+def cached_solve_classical(G, source, target, algorithm="dijkstra", ch=None, cache=ROUTE_CACHE):
+    """
+    solve_classical through the route cache.
+    """
+    key = route_key(G, source, target, "classical", algorithm=algorithm)
+    return cache.get_or_compute(key, lambda: solve_classical(G, source, target, algorithm, ch=ch))
+
+
+def cached_qaoa_solve(G, source, target, cache=ROUTE_CACHE, **options):
+    """
+    QAOASolver(G, source, target, **options).solve() through the route cache.
+    """
+    from quantum.qaoa_solver import QAOASolver
+    key = route_key(G, source, target, "qaoa", **options)
+    return cache.get_or_compute(key, lambda: QAOASolver(G, source, target, **options).solve())
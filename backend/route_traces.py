@@ -0,0 +1,227 @@
+"""
+Compact storage of dispatched routes for edge-usage analysis.
+
+Missions only record their endpoints; the routes themselves are kept here as
+one row per solver per mission in `route_traces`, linked to the mission by
+(city, timestamp) and stamped with the topology version the node ids refer
+to (route_cache.topology_version, which weight refreshes do not change).
+
+A path is stored as CSR node ids, delta-encoded (first id absolute), zigzag
+mapped to unsigned and written as LEB128 varints: neighbouring nodes usually
+have nearby ids, so most hops cost one or two bytes instead of a name string.
+The predicted weight of every traversed edge at dispatch time is stored next
+to it as a float32 array, so a trace can be re-priced or compared later
+without replaying the traffic model.
+
+decode_traces() turns any number of stored blobs into flat NumPy arrays in
+one vectorised pass (no per-route Python loop), and edge_usage() counts how
+often each edge was dispatched.
+"""
+from datetime import datetime
+
+import numpy as np
+
+from backend import database
+from backend.database import RouteTrace, fetch_columns, get_mission_writer, init_db, write_missions, _where
+from backend.route_cache import topology_version
+
+MAX_VARINT_BYTES = 10  # 64 bits / 7 bits per byte
+# Matches SQLAlchemy's SQLite DateTime storage, so string comparison is chronological
+TS_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _zigzag(values):
+    v = np.asarray(values, dtype=np.int64)
+    return ((v << 1) ^ (v >> 63)).view(np.uint64)
+
+
+def _unzigzag(values):
+    v = np.asarray(values, dtype=np.uint64)
+    return (v >> np.uint64(1)).astype(np.int64) ^ -(v & np.uint64(1)).astype(np.int64)
+
+
+def encode_varints(values):
+    """
+    Unsigned integers -> LEB128 bytes (7 bits per byte, high bit = more follows).
+    """
+    v = np.asarray(values, dtype=np.uint64)
+    if not len(v):
+        return b""
+    shifts = np.arange(MAX_VARINT_BYTES, dtype=np.uint64) * np.uint64(7)
+    groups = (v[:, None] >> shifts) & np.uint64(0x7F)
+    n_bytes = MAX_VARINT_BYTES - np.argmax((groups != 0)[:, ::-1], axis=1)
+    n_bytes[v == 0] = 1
+    used = np.arange(MAX_VARINT_BYTES) < n_bytes[:, None]
+    more = np.arange(MAX_VARINT_BYTES) < (n_bytes - 1)[:, None]
+    out = (groups | (more.astype(np.uint64) << np.uint64(7))).astype(np.uint8)
+    return out[used].tobytes()
+
+
+def decode_varints(data):
+    """
+    LEB128 bytes -> uint64 array.
+    """
+    b = np.frombuffer(data, dtype=np.uint8)
+    if not len(b):
+        return np.zeros(0, dtype=np.uint64)
+    last = b < 0x80
+    starts = np.concatenate([[0], np.flatnonzero(last)[:-1] + 1])
+    value_of = np.cumsum(last) - last  # index of the value each byte belongs to
+    k = np.arange(len(b)) - starts[value_of]
+    parts = (b & 0x7F).astype(np.uint64) << (k.astype(np.uint64) * np.uint64(7))
+    # The 7-bit groups do not overlap, so summing them is the same as OR-ing
+    return np.add.reduceat(parts, starts)
+
+
+def encode_path(node_ids):
+    """
+    Node id sequence -> zigzag-delta varint blob.
+    """
+    ids = np.asarray(node_ids, dtype=np.int64)
+    if len(ids) > 1:
+        ids = np.concatenate([ids[:1], np.diff(ids)])
+    return encode_varints(_zigzag(ids))
+
+
+def decode_path(blob):
+    return np.cumsum(_unzigzag(decode_varints(blob)))
+
+
+def encode_weights(weights):
+    return np.asarray(weights, dtype=np.float32).tobytes()
+
+
+def decode_weights(blob):
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def edge_ids(graph, u, v):
+    """
+    Edge ids for arrays of node id pairs, -1 where the nodes are not adjacent.
+    Uses a sorted key index built once per graph, so thousands of hops are
+    resolved with one searchsorted.
+    """
+    u, v = np.asarray(u, dtype=np.int64), np.asarray(v, dtype=np.int64)
+    n = graph.number_of_nodes()
+    index = graph.__dict__.get("_edge_key_index")
+    if index is None:
+        eu, ev = graph.edge_u.astype(np.int64), graph.edge_v.astype(np.int64)
+        if not graph.directed:
+            eu, ev = np.minimum(eu, ev), np.maximum(eu, ev)
+        keys = eu * n + ev
+        order = np.argsort(keys, kind="stable")
+        index = (keys[order], order)
+        graph._edge_key_index = index
+    keys, order = index
+    if not graph.directed:
+        u, v = np.minimum(u, v), np.maximum(u, v)
+    q = u * n + v
+    if not len(keys):
+        return np.full(len(q), -1, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(keys, q), len(keys) - 1)
+    return np.where(keys[pos] == q, order[pos], -1)
+
+
+def trace_row(overlay, path, solver, city, e_type, timestamp=None):
+    """
+    route_traces row for a path of node names solved on `overlay` (a
+    WeightOverlay / TrafficPrediction, whose weights are the predictions at
+    dispatch time).
+    """
+    C = overlay.graph
+    ids = np.array([C.node_id(name) for name in path], dtype=np.int64)
+    eids = edge_ids(C, ids[:-1], ids[1:])
+    weights = np.where(eids >= 0, np.asarray(overlay.weight)[np.maximum(eids, 0)], np.nan)
+    return {
+        "timestamp": timestamp or datetime.utcnow(),
+        "city": city,
+        "emergency_type": e_type,
+        "solver": solver,
+        "graph_version": topology_version(C),
+        "n_nodes": len(ids),
+        "path": encode_path(ids),
+        "weights": encode_weights(weights),
+    }
+
+
+def log_route_trace(overlay, path, solver, city, e_type, timestamp=None, sync=False):
+    """
+    Records the route a solver dispatched. Goes through the mission writer
+    (same batches and transactions as log_mission) unless sync=True.
+    """
+    if not path:
+        return
+    row = trace_row(overlay, path, solver, city, e_type, timestamp)
+    if sync:
+        try:
+            init_db()
+            write_missions([row], table=RouteTrace.__table__)
+        except Exception as e:
+            print(f"DB Error: {e}")
+        return
+    get_mission_writer().submit(row, table=RouteTrace.__table__)
+
+
+def decode_traces(path_blobs, weight_blobs=None):
+    """
+    Bulk decode of stored traces. Returns (nodes, offsets) - trace i is
+    nodes[offsets[i]:offsets[i + 1]] - plus (weights, weight_offsets) when
+    weight blobs are given.
+    """
+    path_blobs = list(path_blobs)
+    lengths = np.array([len(b) for b in path_blobs], dtype=np.int64)
+    raw = np.frombuffer(b"".join(path_blobs), dtype=np.uint8)
+    # Values per trace = terminator bytes per blob
+    last = raw < 0x80
+    byte_offsets = np.concatenate([[0], np.cumsum(lengths)])
+    term_cum = np.concatenate([[0], np.cumsum(last)])
+    counts = term_cum[byte_offsets[1:]] - term_cum[byte_offsets[:-1]]
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    deltas = _unzigzag(decode_varints(raw))
+    # Segmented cumsum: the first delta of each trace is absolute
+    total = np.concatenate([[0], np.cumsum(deltas)])
+    nodes = total[1:] - np.repeat(total[offsets[:-1]], counts)
+    if weight_blobs is None:
+        return nodes, offsets
+    weight_blobs = list(weight_blobs)
+    weights = np.frombuffer(b"".join(weight_blobs), dtype=np.float32)
+    weight_offsets = np.concatenate([[0], np.cumsum([len(b) // 4 for b in weight_blobs])]).astype(np.int64)
+    return nodes, offsets, weights, weight_offsets
+
+
+def load_traces(graph_version=None, city=None, solver=None, since=None, until=None, bind=None):
+    """
+    Stored traces as columns (id, timestamp, city, emergency_type, solver,
+    graph_version, path, weights), oldest first. path / weights are object
+    arrays of blobs, ready for decode_traces.
+    """
+    if bind is None:
+        if database._WRITER is not None:
+            database._WRITER.flush()
+        init_db()
+    where, params = _where([("graph_version", "=", graph_version), ("city", "=", city), ("solver", "=", solver),
+                            ("timestamp", ">=", since and since.strftime(TS_FORMAT)),
+                            ("timestamp", "<", until and until.strftime(TS_FORMAT))])
+    sql = ("SELECT id, timestamp, city, emergency_type, solver, graph_version, path, weights "
+           f"FROM route_traces{where} ORDER BY timestamp, id")
+    cols = fetch_columns(sql, params, bind)
+    if len(cols["id"]):
+        cols["timestamp"] = cols["timestamp"].astype("datetime64[us]")
+    return cols
+
+
+def edge_usage(graph, nodes, offsets):
+    """
+    How many times each edge of `graph` appears in the decoded traces.
+    Hops between non-adjacent nodes (e.g. a trace from another graph
+    version) are ignored.
+    """
+    m = graph.number_of_edges()
+    if len(nodes) < 2:
+        return np.zeros(m, dtype=np.int64)
+    hop = np.ones(len(nodes) - 1, dtype=bool)
+    inner = offsets[(offsets > 0) & (offsets < len(nodes))]
+    hop[inner - 1] = False  # last node of one trace -> first node of the next
+    eids = edge_ids(graph, nodes[:-1][hop], nodes[1:][hop])
+    return np.bincount(eids[eids >= 0], minlength=m)
@@ -0,0 +1,237 @@
+"""
+Background solver service so Streamlit reruns never block on a solve.
+
+Classical and QAOA solves run in a ProcessPoolExecutor and are tracked by job
+id. Graph topology is published once per graph into a SharedMemory block
+(CSR arrays plus a one-off pickled name table); each job then only ships the
+per-edge weight array of its traffic overlay, and workers attach to the block
+and keep the rebuilt graph for later jobs. solve() answers classically right
+away and swaps in the quantum result if it lands before the deadline.
+"""
+import atexit
+import itertools
+import pickle
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from backend.graph_engine import CSRGraph, WeightOverlay
+from backend.classical_solver import solve_classical
+
+SHARED_FIELDS = ("pos", "edge_u", "edge_v", "weight", "distance", "base_weight", "indptr", "indices", "arc_edge")
+QUANTUM_DEADLINE_S = 2.0
+
+
+class SharedGraph:
+    """
+    One SharedMemory block holding a CSRGraph's arrays. `handle` is the small
+    picklable description workers use to attach.
+    """
+
+    def __init__(self, graph):
+        arrays = [np.ascontiguousarray(getattr(graph, f)) for f in SHARED_FIELDS]
+        meta = pickle.dumps({"names": graph.names, "node_attrs": graph.node_attrs,
+                             "graph_attrs": graph.graph_attrs})
+        layout, offset = [], 0
+        for field, arr in zip(SHARED_FIELDS, arrays):
+            offset = (offset + 7) // 8 * 8
+            layout.append((field, offset, arr.dtype.str, arr.shape))
+            offset += arr.nbytes
+        self.shm = SharedMemory(create=True, size=max(1, offset + len(meta)))
+        for (_, off, _, _), arr in zip(layout, arrays):
+            self.shm.buf[off:off + arr.nbytes] = arr.tobytes()
+        self.shm.buf[offset:offset + len(meta)] = meta
+        self.handle = {"name": self.shm.name, "layout": layout, "meta": (offset, len(meta)),
+                       "directed": graph.directed}
+        self._finalizer = weakref.finalize(self, SharedGraph._release, self.shm)
+
+    @staticmethod
+    def _release(shm):
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        self._finalizer()
+
+
+# ----------------------------------------------------------------------
+# Worker side
+# ----------------------------------------------------------------------
+_ATTACHED = OrderedDict()
+MAX_ATTACHED = 8
+
+
+def attach_graph(handle):
+    """
+    (CSRGraph, networkx topology) for a shared handle; views straight into
+    the shared block, built once per worker process.
+    """
+    name = handle["name"]
+    if name in _ATTACHED:
+        _ATTACHED.move_to_end(name)
+        return _ATTACHED[name][1:]
+    shm = SharedMemory(name=name)
+    arrays = {field: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=off)
+              for field, off, dtype, shape in handle["layout"]}
+    start, length = handle["meta"]
+    meta = pickle.loads(bytes(shm.buf[start:start + length]))
+    C = CSRGraph(meta["names"], arrays["pos"], arrays["edge_u"], arrays["edge_v"], arrays["weight"],
+                 arrays["distance"], arrays["base_weight"], directed=handle["directed"],
+                 node_attrs=meta["node_attrs"], graph_attrs=meta["graph_attrs"],
+                 csr=(arrays["indptr"], arrays["indices"], arrays["arc_edge"]))
+    _ATTACHED[name] = (shm, C, C.to_networkx())
+    while len(_ATTACHED) > MAX_ATTACHED:
+        old_shm, _, _ = _ATTACHED.popitem(last=False)[1]
+        old_shm.close()
+    return _ATTACHED[name][1:]
+
+
+def run_job(kind, handle, weights, source, target, options):
+    """
+    Executes one solve in a worker process.
+    """
+    C, G = attach_graph(handle)
+    overlay = WeightOverlay(C, C.weight if weights is None else weights, nx_graph=G)
+    if kind == "classical":
+        return solve_classical(overlay, source, target, **options)
+    from quantum.qaoa_solver import QAOASolver
+    return QAOASolver(overlay, source, target, **options).solve()
+
+
+# ----------------------------------------------------------------------
+# Service
+# ----------------------------------------------------------------------
+class SolverService:
+    """
+    Job-id based front end to a process pool of classical and QAOA solvers.
+    """
+
+    def __init__(self, max_workers=2, start_method="spawn"):
+        # spawn: forking a process that runs Streamlit's threads is unsafe
+        self.executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context(start_method))
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._csr = weakref.WeakKeyDictionary()
+        self._shared = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _topology(self, graph):
+        """
+        (CSRGraph, weights or None) for a networkx graph, CSRGraph or WeightOverlay.
+        """
+        if isinstance(graph, WeightOverlay):
+            return graph.graph, graph.weight
+        if isinstance(graph, CSRGraph):
+            return graph, graph.weight
+        # Snapshot of the networkx graph, retaken when its weights were refreshed
+        # in place (refresh_edge_weights bumps graph.graph["weights_version"])
+        version = graph.graph.get("weights_version", 0)
+        cached = self._csr.get(graph)
+        if cached is not None and cached[0] == version:
+            return cached[1], None
+        C = CSRGraph.from_networkx(graph)
+        self._csr[graph] = (version, C)
+        if cached is not None:
+            with self._lock:
+                stale = self._shared.pop(cached[1], None)
+            if stale is not None:
+                stale.close()
+        return C, None
+
+    def share(self, graph):
+        """
+        Shared-memory handle for a graph's topology, published once per graph.
+        """
+        C, _ = self._topology(graph)
+        with self._lock:
+            shared = self._shared.get(C)
+            if shared is None:
+                shared = self._shared[C] = SharedGraph(C)
+        return shared.handle
+
+    def submit(self, kind, graph, source, target, **options):
+        C, weights = self._topology(graph)
+        handle = self.share(C)
+        future = self.executor.submit(run_job, kind, handle, weights, source, target, options)
+        job_id = f"{kind}-{next(self._ids)}"
+        self._jobs[job_id] = future
+        return job_id
+
+    def submit_classical(self, graph, source, target, algorithm="dijkstra"):
+        return self.submit("classical", graph, source, target, algorithm=algorithm)
+
+    def submit_quantum(self, graph, source, target, **options):
+        return self.submit("quantum", graph, source, target, **options)
+
+    def status(self, job_id):
+        future = self._jobs.get(job_id)
+        if future is None:
+            return "unknown"
+        if future.cancelled():
+            return "cancelled"
+        if future.running():
+            return "running"
+        if not future.done():
+            return "pending"
+        return "failed" if future.exception() is not None else "done"
+
+    def done(self, job_id):
+        return self.status(job_id) in ("done", "failed", "cancelled")
+
+    def future(self, job_id):
+        return self._jobs[job_id]
+
+    def result(self, job_id, timeout=None):
+        """
+        Job result; raises concurrent.futures.TimeoutError if it is not ready
+        within `timeout` seconds (the job keeps running).
+        """
+        return self._jobs[job_id].result(timeout=timeout)
+
+    def forget(self, job_id):
+        future = self._jobs.pop(job_id, None)
+        if future is not None:
+            future.cancel()
+
+    def solve(self, graph, source, target, deadline=QUANTUM_DEADLINE_S, algorithm="dijkstra", **quantum_options):
+        """
+        Classical answer now, quantum answer if it arrives within `deadline`
+        seconds. Returns (classical, quantum or None, quantum job id).
+        """
+        job_id = self.submit_quantum(graph, source, target, **quantum_options)
+        classical = solve_classical(graph, source, target, algorithm)
+        try:
+            quantum = self.result(job_id, timeout=deadline)
+        except TimeoutError:
+            quantum = None
+        return classical, quantum, job_id
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        for shared in list(self._shared.values()):
+            shared.close()
+        self._shared.clear()
+
+
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_solver_service(max_workers=2):
+    """
+    Process-wide SolverService, created on first use and shut down at exit.
+    """
+    global _SERVICE
+    with _SERVICE_LOCK:
+        if _SERVICE is None:
+            _SERVICE = SolverService(max_workers=max_workers)
+            atexit.register(_SERVICE.shutdown, False)
+        return _SERVICE
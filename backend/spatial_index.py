@@ -0,0 +1,197 @@
+"""
+Spatial index over graph node positions for snapping map clicks to the road graph.
+
+Coordinates are projected to a local equirectangular plane (km), which is
+accurate to well under a metre at city scale, and indexed with a KD-tree:
+scipy's cKDTree when scipy is installed, otherwise the array-based KDTree
+below. Either way lookups are O(log n). Reported distances are haversine km.
+
+Indexes are cached per graph object, so a graph is indexed once and reused
+across Streamlit reruns for as long as the graph lives.
+"""
+import weakref
+
+import numpy as np
+
+from backend.geodesy import distance_km
+from backend.graph_engine import CSRGraph
+
+try:
+    from scipy.spatial import cKDTree
+except Exception:
+    cKDTree = None
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON = 111.320
+
+
+class KDTree:
+    """
+    Minimal 2-D KD-tree stored in flat arrays (no per-node Python objects).
+    """
+
+    def __init__(self, points, leafsize=16):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.perm = np.arange(len(self.points))
+        self.leafsize = leafsize
+        # Per tree node: [start, end) into perm, split dim / value, children (-1 = leaf)
+        self.start, self.end, self.dim, self.split, self.left, self.right = [], [], [], [], [], []
+        if len(self.points):
+            self._build()
+
+    def _new_node(self, start, end):
+        for arr, val in ((self.start, start), (self.end, end), (self.dim, -1),
+                         (self.split, 0.0), (self.left, -1), (self.right, -1)):
+            arr.append(val)
+        return len(self.start) - 1
+
+    def _build(self):
+        stack = [self._new_node(0, len(self.points))]
+        while stack:
+            node = stack.pop()
+            start, end = self.start[node], self.end[node]
+            if end - start <= self.leafsize:
+                continue
+            idx = self.perm[start:end]
+            pts = self.points[idx]
+            dim = int(np.argmax(pts.max(axis=0) - pts.min(axis=0)))
+            mid = (end - start) // 2
+            part = np.argpartition(pts[:, dim], mid)
+            self.perm[start:end] = idx[part]
+            self.dim[node] = dim
+            self.split[node] = float(self.points[self.perm[start + mid], dim])
+            self.left[node] = self._new_node(start, start + mid)
+            self.right[node] = self._new_node(start + mid, end)
+            stack.extend((self.left[node], self.right[node]))
+
+    def query(self, q):
+        """
+        Nearest point to q. Returns (distance, index).
+        """
+        q = np.asarray(q, dtype=np.float64)
+        best_d2, best_i = np.inf, -1
+        stack = [(0, 0.0)] if self.start else []
+        while stack:
+            node, plane_d2 = stack.pop()
+            if plane_d2 >= best_d2:
+                continue
+            if self.left[node] == -1:
+                idx = self.perm[self.start[node]:self.end[node]]
+                d2 = ((self.points[idx] - q) ** 2).sum(axis=1)
+                k = int(np.argmin(d2))
+                if d2[k] < best_d2:
+                    best_d2, best_i = float(d2[k]), int(idx[k])
+                continue
+            diff = q[self.dim[node]] - self.split[node]
+            near, far = (self.left[node], self.right[node]) if diff < 0 else (self.right[node], self.left[node])
+            stack.append((far, diff * diff))
+            stack.append((near, 0.0))
+        return np.sqrt(best_d2), best_i
+
+    def query_ball_point(self, q, r):
+        """
+        Indices of all points within distance r of q.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        out = []
+        stack = [0] if self.start else []
+        while stack:
+            node = stack.pop()
+            if self.left[node] == -1:
+                idx = self.perm[self.start[node]:self.end[node]]
+                d2 = ((self.points[idx] - q) ** 2).sum(axis=1)
+                out.extend(idx[d2 <= r * r].tolist())
+                continue
+            diff = q[self.dim[node]] - self.split[node]
+            if diff < 0 or diff * diff <= r * r:
+                stack.append(self.left[node])
+            if diff >= 0 or diff * diff <= r * r:
+                stack.append(self.right[node])
+        return out
+
+
+def _make_tree(points):
+    return cKDTree(points) if cKDTree is not None else KDTree(points)
+
+
+class SpatialIndex:
+    """
+    Nearest-node and nearest-edge lookups for a road graph.
+    """
+
+    def __init__(self, graph):
+        C = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+        self.graph = C
+        valid = ~np.isnan(C.pos).any(axis=1)
+        self.node_ids = np.nonzero(valid)[0]
+        self.lat0 = float(np.mean(C.pos[valid, 0])) if valid.any() else 0.0
+        xy = self.project(C.pos)
+        self.node_tree = _make_tree(xy[self.node_ids])
+
+        # Edges are indexed by midpoint; a segment of half-length h whose
+        # midpoint is m from q is at least m - h away, which bounds the search.
+        ok = valid[C.edge_u] & valid[C.edge_v]
+        self.edge_ids = np.nonzero(ok)[0]
+        self.seg_a = xy[C.edge_u[self.edge_ids]]
+        self.seg_b = xy[C.edge_v[self.edge_ids]]
+        half = np.hypot(*(self.seg_b - self.seg_a).T) / 2
+        self.max_half = float(half.max()) if len(half) else 0.0
+        self.edge_tree = _make_tree((self.seg_a + self.seg_b) / 2) if len(self.edge_ids) else None
+
+    def project(self, latlon):
+        latlon = np.asarray(latlon, dtype=np.float64)
+        return np.stack([latlon[..., 1] * KM_PER_DEG_LON * np.cos(np.radians(self.lat0)),
+                         latlon[..., 0] * KM_PER_DEG_LAT], axis=-1)
+
+    def nearest_node_id(self, lat, lon):
+        """
+        Returns (node id, haversine distance km).
+        """
+        _, i = self.node_tree.query(self.project((lat, lon)))
+        node = int(self.node_ids[i])
+        return node, float(distance_km((lat, lon), self.graph.pos[node]))
+
+    def nearest_node(self, lat, lon):
+        """
+        Returns (node name, distance km) for the graph node closest to a point.
+        """
+        node, dist = self.nearest_node_id(lat, lon)
+        return self.graph.node_name(node), dist
+
+    def nearest_edge(self, lat, lon):
+        """
+        Closest road segment to a point.
+        Returns (u name, v name, fraction along u->v, snapped (lat, lon), distance km).
+        """
+        if self.edge_tree is None:
+            return None
+        q = self.project((lat, lon))
+        d_mid, _ = self.edge_tree.query(q)
+        cand = np.asarray(self.edge_tree.query_ball_point(q, d_mid + self.max_half), dtype=np.int64)
+
+        a, b = self.seg_a[cand], self.seg_b[cand]
+        ab = b - a
+        denom = (ab ** 2).sum(axis=1)
+        t = np.clip(np.divide(((q - a) * ab).sum(axis=1), denom, out=np.zeros(len(cand)), where=denom > 0), 0, 1)
+        proj = a + t[:, None] * ab
+        k = int(np.argmin(((proj - q) ** 2).sum(axis=1)))
+
+        C = self.graph
+        e = int(self.edge_ids[cand[k]])
+        u, v = int(C.edge_u[e]), int(C.edge_v[e])
+        snapped = tuple((C.pos[u] + t[k] * (C.pos[v] - C.pos[u])).tolist())
+        return C.node_name(u), C.node_name(v), float(t[k]), snapped, float(distance_km((lat, lon), snapped))
+
+
+_INDEX_CACHE = weakref.WeakKeyDictionary()
+
+
+def get_spatial_index(graph):
+    """
+    Spatial index for a graph, built on first use and cached for its lifetime.
+    """
+    index = _INDEX_CACHE.get(graph)
+    if index is None:
+        index = SpatialIndex(graph)
+        _INDEX_CACHE[graph] = index
+    return index
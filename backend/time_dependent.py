@@ -0,0 +1,193 @@
+"""
+Time-dependent routing over the 60-minute traffic forecast horizon.
+
+A static snapshot prices a 40-minute trip entirely on traffic at minute zero.
+Here every edge carries a piecewise-linear travel-time function with a
+breakpoint every BUCKET_MINUTES, sampled from the same TrafficEngine that
+backs predict_traffic (bucket k is predict_traffic at time_offset = k * 5).
+TD-Dijkstra / TD-A* then label nodes with arrival times, so each edge is
+priced at the moment it is actually entered.
+
+Profiles are built once per (emergency type, forecast minute) and cached
+next to the graph's traffic engine, so queries never re-sample traffic.
+"""
+import heapq
+import weakref
+from collections import OrderedDict
+from itertools import count
+
+import numpy as np
+
+from backend.geodesy import distance_km
+from backend.graph_engine import WeightOverlay
+from backend.traffic_model import current_minute, get_traffic_engine
+
+BUCKET_MINUTES = 5
+HORIZON_MINUTES = 60
+
+
+class TravelTimeProfile:
+    """
+    Per-edge piecewise-linear travel-time functions on a shared CSRGraph.
+
+    samples[k, e] is the predicted travel time of edge e when entered at
+    k * bucket minutes after the forecast minute. Beyond the horizon the last
+    breakpoint is held constant.
+    """
+
+    def __init__(self, graph, emergency_type, minute, samples, bucket=BUCKET_MINUTES):
+        self.graph = graph
+        self.emergency_type = emergency_type
+        self.minute = minute
+        self.bucket = bucket
+        self.samples = np.asarray(samples, dtype=np.float64)
+        # FIFO: leaving later never gets you there earlier. Waiting at the tail
+        # of an edge is always allowed, so cap each breakpoint by "wait, then go".
+        W = self.samples.copy()
+        for k in range(len(W) - 2, -1, -1):
+            np.minimum(W[k], W[k + 1] + bucket, out=W[k])
+        self.weights = W
+        self.lower = W.min(axis=0)
+        self._rows = W.T.tolist()  # plain floats for the query loop
+
+    @classmethod
+    def from_engine(cls, engine, emergency_type, minute=None, horizon=HORIZON_MINUTES, bucket=BUCKET_MINUTES):
+        minute = current_minute() if minute is None else minute
+        offsets = range(0, horizon + 1, bucket)
+        samples = np.vstack([np.round(engine.price(emergency_type, minute + t), 2) for t in offsets])
+        return cls(engine.graph, emergency_type, minute, samples, bucket)
+
+    @property
+    def horizon(self):
+        return (len(self.weights) - 1) * self.bucket
+
+    def travel_time(self, edge, t):
+        """
+        Travel time of one edge entered t minutes after the forecast minute.
+        """
+        row = self._rows[edge]
+        k = int(t // self.bucket) if t > 0 else 0
+        if k >= len(row) - 1:
+            return row[-1]
+        frac = (t - k * self.bucket) / self.bucket if t > 0 else 0.0
+        return row[k] + frac * (row[k + 1] - row[k])
+
+    def at(self, t):
+        """
+        Weights of every edge entered at time t, as a WeightOverlay.
+        """
+        k = min(max(t, 0.0) / self.bucket, len(self.weights) - 1)
+        lo = int(k)
+        hi = min(lo + 1, len(self.weights) - 1)
+        frac = k - lo
+        return WeightOverlay(self.graph, self.weights[lo] * (1 - frac) + self.weights[hi] * frac)
+
+    def path_eta(self, path, departure=0.0):
+        """
+        Arrival time offsets (minutes after departure) at each node of a path of names.
+        """
+        C = self.graph
+        t = float(departure)
+        arrivals = [0.0]
+        for u, v in zip(path[:-1], path[1:]):
+            t += self.travel_time(C.edge_id(C.node_id(u), C.node_id(v)), t)
+            arrivals.append(t - departure)
+        return arrivals
+
+    @property
+    def nbytes(self):
+        return self.samples.nbytes + self.weights.nbytes + self.lower.nbytes
+
+
+def td_shortest_path(profile, source, target, departure=0.0, heuristic=True):
+    """
+    TD-A* (TD-Dijkstra with heuristic=False) between node ids on a profile.
+    Labels are arrival times; returns (path ids, arrival time, nodes_settled)
+    or (None, inf, settled).
+    """
+    C = profile.graph
+    indptr, indices, arc_edge = C.indptr.tolist(), C.indices.tolist(), C.arc_edge.tolist()
+    if heuristic:
+        # Straight-line km at the fastest pace any edge reaches over the horizon
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pace = np.where(C.distance > 0, profile.lower / C.distance, np.inf)
+        pace = float(pace.min()) if len(pace) and np.isfinite(pace).any() else 0.0
+        h = np.nan_to_num(distance_km(C.pos, C.pos[target]) * pace).tolist()
+    else:
+        h = [0.0] * C.number_of_nodes()
+
+    travel_time = profile.travel_time
+    tie = count()
+    arrival = {source: float(departure)}
+    parent = {source: None}
+    settled = set()
+    heap = [(departure + h[source], next(tie), source)]
+    while heap:
+        _, _, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled.add(u)
+        if u == target:
+            path = [u]
+            while parent[path[-1]] is not None:
+                path.append(parent[path[-1]])
+            return path[::-1], arrival[u], len(settled)
+        t = arrival[u]
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            nt = t + travel_time(arc_edge[k], t)
+            if nt < arrival.get(v, np.inf):
+                arrival[v] = nt
+                parent[v] = u
+                heapq.heappush(heap, (nt + h[v], next(tie), v))
+    return None, np.inf, len(settled)
+
+
+_PROFILES = weakref.WeakKeyDictionary()
+MAX_PROFILES = 8
+
+
+def get_travel_time_profile(G, emergency_type="Ambulance", minute=None):
+    """
+    Travel-time profile for a graph, built once per (emergency type, forecast
+    minute) and reused by every query until the forecast refreshes.
+    """
+    engine = get_traffic_engine(G)
+    minute = current_minute() if minute is None else minute
+    cache = _PROFILES.setdefault(engine, OrderedDict())
+    key = (emergency_type, minute)
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    profile = cache[key] = TravelTimeProfile.from_engine(engine, emergency_type, minute)
+    while len(cache) > MAX_PROFILES:
+        cache.popitem(last=False)
+    return profile
+
+
+def solve_time_dependent(G, source, target, emergency_type="Ambulance", departure=0.0,
+                         minute=None, algorithm="astar"):
+    """
+    Time-dependent counterpart of solve_classical. departure is minutes after
+    the forecast minute; eta is the trip duration with every edge priced when
+    it is entered. algorithm: "astar" (TD-A*) or "dijkstra" (TD-Dijkstra).
+    """
+    if algorithm not in ("astar", "dijkstra"):
+        raise ValueError(f"Unknown algorithm '{algorithm}', expected 'astar' or 'dijkstra'")
+    profile = get_travel_time_profile(G, emergency_type, minute)
+    C = profile.graph
+    path, arrive, settled = td_shortest_path(profile, C.node_id(source), C.node_id(target),
+                                             departure, heuristic=algorithm == "astar")
+    if path is None:
+        return None
+    names = [C.node_name(i) for i in path]
+    total_dist = sum(float(C.distance[C.edge_id(u, v)]) for u, v in zip(path[:-1], path[1:]))
+    return {
+        "path": names,
+        "eta": round(arrive - departure, 2),
+        "distance": round(total_dist, 2),
+        "method": "Classical (Time-Dependent)",
+        "algorithm": "td_" + algorithm,
+        "nodes_settled": settled,
+        "arrivals": [round(a, 2) for a in profile.path_eta(names, departure)]
+    }
@@ -1,78 +1,190 @@
 import networkx as nx
+import numpy as np
 import random
 import time
 import math
+import weakref
+from collections import OrderedDict
+from backend.graph_engine import CSRGraph, WeightOverlay
 
-def predict_traffic(G: nx.Graph, emergency_type: str = "Ambulance", time_offset: int = 0):
+# Emergency Priority Weights (Lower is better/faster)
+# Ambulance: Fast, can run red lights (0.7x)
+# Fire: Large vehicle, needs wide roads, but priority (0.8x)
+# Police: Very fast (0.6x)
+# Logistics: Normal traffic (1.0x)
+# Organ Transport: Extreme priority (0.5x)
+PRIORITY_FACTORS = {
+    "Ambulance": 0.7,
+    "Fire Brigade": 0.8,
+    "Police Response": 0.6,
+    "Disaster Logistics": 0.9,
+    "Organ Transport": 0.5,
+    "Flood Rescue": 0.85,
+    "Custom": 1.0
+}
+
+# Roads touching these landmarks are structurally busier
+BUSY_HUBS = ("Benz Circle", "Bus Station")
+
+STATUS_LABELS = np.array(["Low", "Medium", "High"])
+
+def current_minute():
+    return int(time.time() / 60)
+
+class TrafficPrediction(WeightOverlay):
     """
-    Simulates AI traffic prediction with dynamic updates and emergency-specific logic.
+    Predicted per-edge state for one (emergency type, minute) as flat arrays
+    aligned with the engine's edge ids. It is a WeightOverlay, so solvers take
+    it directly; stats and a networkx copy are only materialised on request.
     """
-    H = G.copy()
-    
-    # Emergency Priority Weights (Lower is better/faster)
-    # Ambulance: Fast, can run red lights (0.7x)
-    # Fire: Large vehicle, needs wide roads, but priority (0.8x)
-    # Police: Very fast (0.6x)
-    # Logistics: Normal traffic (1.0x)
-    # Organ Transport: Extreme priority (0.5x)
-    priority_map = {
-        "Ambulance": 0.7,
-        "Fire Brigade": 0.8,
-        "Police Response": 0.6,
-        "Disaster Logistics": 0.9,
-        "Organ Transport": 0.5,
-        "Flood Rescue": 0.85,
-        "Custom": 1.0
-    }
-    factor = priority_map.get(emergency_type, 1.0)
-    
-    congestion_stats = {}
-    
-    # Dynamic Time-Based Seed (Changes every minute)
-    # This ensures "Live" feel but stability within the same minute
-    current_seed = int(time.time() / 60) 
-    random.seed(current_seed + time_offset)
 
-    for u, v, data in H.edges(data=True):
-        base_time = data['base_weight']
-        
-        # 1. Structural Congestion (Some roads are always busy)
-        # Assume roads connected to "Benz Circle" or "Bus Station" are busier
-        is_busy_hub = "Benz Circle" in (u, v) or "Bus Station" in (u, v)
-        hub_penalty = 1.5 if is_busy_hub else 1.0
-        
-        # 2. Random Live Fluctuation
-        # We use a noise function that evolves slowly over time
-        noise = random.uniform(0.8, 1.8)
-        
-        # 3. Emergency Specifics
-        # Fire trucks might struggle in narrow "Old City" areas (simulated by random penalty)
-        if emergency_type == "Fire Brigade" and random.random() > 0.8:
-            noise += 0.5 # Narrow road delay
-            
-        # Calculate final weight
-        predicted_weight = base_time * hub_penalty * noise * factor
-        
-        # Determine Status
-        ratio = predicted_weight / base_time
-        if ratio > 2.0:
-            status = "High"
-        elif ratio > 1.3:
-            status = "Medium"
-        else:
-            status = "Low"
-            
-        # Update Graph
-        H[u][v]['weight'] = round(predicted_weight, 2)
-        H[u][v]['congestion_level'] = status
-        
-        congestion_stats[(u, v)] = {
-            "base": base_time,
-            "predicted": round(predicted_weight, 2),
-            "status": status
+    def __init__(self, graph, emergency_type, seed, weight, ratio, nx_graph=None):
+        super().__init__(graph, weight, nx_graph)
+        self.emergency_type = emergency_type
+        self.seed = seed
+        self.ratio = ratio
+        # 0 = Low, 1 = Medium, 2 = High
+        self.status_code = (ratio > 1.3).astype(np.int8) + (ratio > 2.0)
+
+    @property
+    def status(self):
+        return STATUS_LABELS[self.status_code]
+
+    def status_counts(self):
+        counts = np.bincount(self.status_code, minlength=3)
+        return dict(zip(STATUS_LABELS.tolist(), counts.tolist()))
+
+    def mean_load_factor(self):
+        return float(self.ratio.mean()) if len(self.ratio) else 0.0
+
+    @property
+    def stats(self):
+        """
+        Legacy congestion_stats dict keyed by (u, v) landmark names.
+        """
+        C = self.graph
+        names = C.names
+        return {
+            (names[u], names[v]): {"base": b, "predicted": w, "status": st}
+            for u, v, b, w, st in zip(C.edge_u.tolist(), C.edge_v.tolist(), C.base_weight.tolist(),
+                                      self.weight.tolist(), self.status.tolist())
         }
-        
-    return H, congestion_stats
+
+    def edge_attrs(self):
+        return {"weight": self.weight.tolist(), "congestion_level": self.status.tolist()}
+
+    @property
+    def nbytes(self):
+        return self.weight.nbytes + self.ratio.nbytes + self.status_code.nbytes
+
+class TrafficEngine:
+    """
+    Vectorized traffic prediction for one road graph.
+
+    Every edge is priced in a single NumPy pass with a private
+    numpy.random.Generator seeded from (minute + time_offset), so results are
+    stable within a minute and the global `random` module is never reseeded.
+    Predictions are kept per (emergency type, seed) as overlays on one shared
+    topology, so memory grows by one weight array per active overlay.
+    """
+
+    MAX_OVERLAYS = 32
+
+    def __init__(self, graph):
+        C = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+        self.graph = C
+        self._source = weakref.ref(graph) if isinstance(graph, nx.Graph) else None
+        self._overlays = OrderedDict()
+        hub_ids = [C.index[h] for h in BUSY_HUBS if h in C.index]
+        is_hub = np.isin(C.edge_u, hub_ids) | np.isin(C.edge_v, hub_ids)
+        self.hub_penalty = np.where(is_hub, 1.5, 1.0)
+        self.base = np.asarray(C.base_weight, dtype=np.float64)
+
+    def price(self, emergency_type, seed):
+        """
+        Unrounded predicted weight of every edge for one seed, without caching.
+        """
+        rng = np.random.default_rng(seed)
+        m = len(self.base)
+        factor = PRIORITY_FACTORS.get(emergency_type, 1.0)
+
+        # Random live fluctuation
+        noise = rng.uniform(0.8, 1.8, m)
+        # Fire trucks might struggle in narrow "Old City" areas (simulated by random penalty)
+        if emergency_type == "Fire Brigade":
+            noise += 0.5 * (rng.random(m) > 0.8)
+
+        return self.base * self.hub_penalty * noise * factor
+
+    def lower_bound(self, emergency_type):
+        """
+        Per-edge weight no prediction for this emergency type can go below
+        (noise never drops under 0.8), rounded down like predicted weights.
+        """
+        factor = PRIORITY_FACTORS.get(emergency_type, 1.0)
+        return np.floor(self.base * self.hub_penalty * 0.8 * factor * 100) / 100
+
+    def predict(self, emergency_type="Ambulance", time_offset=0, minute=None):
+        seed = (current_minute() if minute is None else minute) + time_offset
+        key = (emergency_type, seed)
+        if key in self._overlays:
+            self._overlays.move_to_end(key)
+            return self._overlays[key]
+
+        predicted = self.price(emergency_type, seed)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(self.base > 0, predicted / self.base, 1.0)
+        pred = TrafficPrediction(self.graph, emergency_type, seed, np.round(predicted, 2), ratio,
+                                 nx_graph=self._source() if self._source is not None else None)
+        self._overlays[key] = pred
+        while len(self._overlays) > self.MAX_OVERLAYS:
+            self._overlays.popitem(last=False)
+        return pred
+
+    def overlays(self):
+        """
+        Active (emergency type, seed) -> TrafficPrediction overlays, oldest first.
+        """
+        return dict(self._overlays)
+
+_ENGINES = weakref.WeakKeyDictionary()
+
+def get_traffic_engine(G):
+    """
+    TrafficEngine for a graph, built once and cached for the graph's lifetime.
+    """
+    if isinstance(G, WeightOverlay):
+        G = G.nx_graph
+    engine = _ENGINES.get(G)
+    if engine is None:
+        engine = TrafficEngine(G)
+        _ENGINES[G] = engine
+    return engine
+
+def invalidate_traffic_engine(G):
+    """
+    Drops the cached engine (and with it its overlays, forecast profiles and
+    graph version) after G's base weights changed, so the next prediction
+    prices the new values.
+    """
+    _ENGINES.pop(G, None)
+
+def predict_traffic_weights(G, emergency_type: str = "Ambulance", time_offset: int = 0, minute=None):
+    """
+    Array-based prediction without copying the graph. Returns a TrafficPrediction
+    overlay that solve_classical, solve_alternatives, QAOASolver and
+    travel_time_matrix accept in place of a graph.
+    """
+    return get_traffic_engine(G).predict(emergency_type, time_offset, minute)
+
+def predict_traffic(G: nx.Graph, emergency_type: str = "Ambulance", time_offset: int = 0):
+    """
+    Simulates AI traffic prediction with dynamic updates and emergency-specific logic.
+    Returns (graph with predicted weights, congestion_stats) for existing callers;
+    new code should prefer predict_traffic_weights.
+    """
+    pred = predict_traffic_weights(G, emergency_type, time_offset)
+    return pred.to_networkx(), pred.stats
 
 def get_traffic_forecast(G, emergency_type):
     """
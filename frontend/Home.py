@@ -2,6 +2,8 @@ import streamlit as st
 import sys
 import os
 import time
+from datetime import datetime
+import numpy as np
 import pandas as pd
 import qrcode
 from io import BytesIO
@@ -27,11 +29,21 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Local backend modules (assumes these files exist and are importable)
 from backend.city_graph import create_city_graph
-from backend.traffic_model import predict_traffic
+from backend.traffic_model import predict_traffic_weights
 from backend.classical_solver import solve_classical
-from quantum.qaoa_solver import QAOASolver
+from backend.time_dependent import solve_time_dependent
+from backend.incremental import MissionRouter
+from backend.solver_service import get_solver_service, QUANTUM_DEADLINE_S, TimeoutError as SolveTimeout
+from backend.route_cache import ROUTE_CACHE, route_key
 from backend.location_services import LocationServices
-from backend.database import log_mission, get_recent_missions, MissionHistory
+from backend.database import log_mission, recent_mission_columns, mission_rollups
+from backend.route_traces import log_route_trace
+from backend.spatial_index import get_spatial_index
+from backend.geometry_store import get_geometry_store, fill_in_background, geometry_path
+
+# Clicks farther than this from any graph node fall back to ORS / straight lines
+MAX_SNAP_KM = 2.0
+MAP_ZOOM = 13
 
 # --------------------------------------------------------------------------
 # 🎨 UI CONFIGURATION
@@ -79,6 +91,8 @@ with st.sidebar:
     st.markdown(f"**🏙️ City:** {city}")
 
     emergency_type = st.selectbox("🚑 Type", ["Ambulance", "Fire", "Police", "Organ Transport"])
+    time_dependent = st.checkbox("⏱️ Time-Dependent ETA", value=False,
+                                 help="Price each road at the minute the vehicle reaches it, using the 60-minute forecast.")
 
     st.markdown("### 2. QUANTUM PARAMETERS")
     urgency = st.slider("⚡ Urgency Level", 0.0, 1.0, 0.8, help="Higher urgency forces shorter paths even if riskier.")
@@ -157,7 +171,7 @@ with tab1:
     else:
         start_center = (16.5, 80.6)
 
-    m = folium.Map(location=[start_center[0], start_center[1]], zoom_start=13, tiles='CartoDB dark_matter')
+    m = folium.Map(location=[start_center[0], start_center[1]], zoom_start=MAP_ZOOM, tiles='CartoDB dark_matter')
 
     # Interactive Map click mode
     if mode == "Interactive Map (Click)":
@@ -181,6 +195,7 @@ with tab1:
     circuit_diagram = ""
     c_geom = None
     q_geom = None
+    trace_overlay = None  # traffic prediction the routes were solved on
 
     if st.session_state.get('running', False) and source_coords and dest_coords:
         try:
@@ -195,61 +210,118 @@ with tab1:
 
                 with st.spinner("🔄 Quantum-Classical Hybrid Processing..."):
                     # 1. Update Traffic Model
-                    G_traffic, _ = predict_traffic(G, emergency_type)
-
-                    # 2. Classical Solver (Dijkstra)
-                    classical_raw = solve_classical(G_traffic, source_node, dest_node)
+                    G_traffic = predict_traffic_weights(G, emergency_type)
+                    trace_overlay = G_traffic
+
+                    # QAOA runs in the worker pool while the classical route is computed here
+                    solver_service = get_solver_service()
+                    stale_job = st.session_state.pop('pending_quantum_job', None)
+                    if stale_job:
+                        solver_service.forget(stale_job)
+                    # Repeats within the same traffic minute are served from the route cache
+                    quantum_key = route_key(G_traffic, source_node, dest_node, "qaoa")
+                    quantum_raw = ROUTE_CACHE.get(quantum_key)
+                    if quantum_raw is None:
+                        quantum_job = solver_service.submit_quantum(G_traffic, source_node, dest_node)
+                        ROUTE_CACHE.fill_from(solver_service.future(quantum_job), quantum_key)
+
+                    # 2. Classical Solver (Dijkstra, or TD-A* over the forecast horizon)
+                    classical_key = route_key(G_traffic, source_node, dest_node,
+                                              "time_dependent" if time_dependent else "classical")
+                    classical_raw = ROUTE_CACHE.get(classical_key)
+                    if classical_raw is None:
+                        if time_dependent:
+                            classical_raw = solve_time_dependent(G, source_node, dest_node, emergency_type)
+                        else:
+                            # Repeat runs of the same mission only repair what the new minute changed.
+                            # The router is rebuilt whenever the graph it searches is not this city's
+                            # (other pages load graphs without one, weight refreshes rebuild the engine).
+                            router = st.session_state.get('mission_router')
+                            if router is None or router.graph is not G_traffic.graph:
+                                router = MissionRouter(G_traffic.graph)
+                                st.session_state.mission_router = router
+                            mission_id = (source_node, dest_node, emergency_type)
+                            if mission_id in router.missions:
+                                classical_raw = router.reroute(mission_id, G_traffic)
+                            else:
+                                classical_raw = router.start(mission_id, source_node, dest_node, G_traffic)
+                        ROUTE_CACHE.put(classical_key, classical_raw)
                     c_eta = classical_raw.get('eta', 0)
                     c_dist = classical_raw.get('distance', classical_raw.get('dist', 0))
                     classical_path = classical_raw.get('path', [])
 
-                    # 3. QAOA Solver
-                    qaoa = QAOASolver(G_traffic, source_node, dest_node)
-                    quantum_raw = qaoa.solve()
-                    if not quantum_raw:
+                    # 3. QAOA Solver: use its answer if it lands before the deadline
+                    quantum_pending = False
+                    try:
+                        if quantum_raw is None:
+                            quantum_raw = solver_service.result(quantum_job, timeout=QUANTUM_DEADLINE_S)
+                            solver_service.forget(quantum_job)
+                    except SolveTimeout:
+                        # No quantum answer yet: only the classical route is shown and logged
+                        st.session_state.pending_quantum_job = quantum_job
+                        st.info(f"⏳ QAOA still running (job {quantum_job}); showing the classical route.")
+                        quantum_pending = True
+                    if not quantum_pending and not quantum_raw:
                         st.error("Quantum solver failed to return a valid solution.")
                         st.session_state.running = False
                         st.stop()
 
-                    q_eta = quantum_raw.get('eta', 0)
-                    q_dist = quantum_raw.get('distance', quantum_raw.get('dist', 0))
-                    quantum_path = quantum_raw.get('path', [])
-                    qubits_used = quantum_raw.get('qubits', 0)
-                    circuit_diagram = quantum_raw.get('circuit_diagram', "N/A")
-
-                    # 4. Geometry - prefer ORS if available
-                    if len(loc_service.ors_key) > 10:
-                        try:
-                            res = loc_service.get_route_metrics(source_coords, dest_coords)
-                            if isinstance(res, (list, tuple)) and len(res) >= 4:
-                                _, _, _, c_geom = res
-                            else:
-                                # fallback to path node coords if ORS does not return geometry
-                                c_geom = [G.nodes[n]['pos'] for n in classical_path] if classical_path else None
-                        except Exception:
-                            c_geom = [G.nodes[n]['pos'] for n in classical_path] if classical_path else None
-
-                        # Quantum geometry: straight lines between quantum path nodes (visual cue)
-                        if quantum_path:
-                            q_geom = [G.nodes[n]['pos'] for n in quantum_path]
-                        else:
-                            q_geom = c_geom
+                    if quantum_pending:
+                        circuit_diagram = f"QAOA job {quantum_job} still running"
                     else:
-                        # Simulation / no ORS key: straight connecting node coords
-                        c_geom = [G.nodes[n]['pos'] for n in classical_path] if classical_path else [source_coords, dest_coords]
-                        q_geom = [G.nodes[n]['pos'] for n in quantum_path] if quantum_path else c_geom
+                        q_eta = quantum_raw.get('eta', 0)
+                        q_dist = quantum_raw.get('distance', quantum_raw.get('dist', 0))
+                        quantum_path = quantum_raw.get('path', [])
+                        qubits_used = quantum_raw.get('qubits', 0)
+                        circuit_diagram = quantum_raw.get('circuit_diagram', "N/A")
+
+                    # 4. Geometry - stitched from the offline edge store. Road shapes it has not
+                    #    seen yet are fetched in the background (and saved); until then those
+                    #    edges are drawn as straight segments
+                    geom_store = get_geometry_store(G)
+                    if classical_path and len(loc_service.ors_key) > 10 and not geom_store.covers(classical_path):
+                        fill_in_background(geom_store, loc_service.client, classical_path,
+                                           save_to=geometry_path(geom_store.graph))
+                    c_geom = (geom_store.route_geometry(classical_path, zoom=MAP_ZOOM)
+                              if classical_path else [source_coords, dest_coords])
 
                     classical_res = {'eta': round(c_eta, 2), 'dist': round(c_dist, 2), 'path': classical_path}
-                    quantum_res = {'eta': round(q_eta, 2), 'dist': round(q_dist, 2), 'qubits': qubits_used, 'path': quantum_path}
+                    if quantum_pending:
+                        quantum_res = {'eta': None, 'dist': None, 'qubits': 0, 'path': [], 'pending': True}
+                    else:
+                        # Quantum geometry: straight lines between quantum path nodes (visual cue)
+                        q_geom = [G.nodes[n]['pos'] for n in quantum_path] if quantum_path else c_geom
+                        quantum_res = {'eta': round(q_eta, 2), 'dist': round(q_dist, 2), 'qubits': qubits_used,
+                                       'path': quantum_path}
 
             # 🅱️ MODE: INTERACTIVE MAP (Direct ORS + Heuristics)
             else:
                 with st.spinner("🛰️ Establishing Satellite Uplink..."):
                     res = None
-                    try:
-                        res = loc_service.get_route_metrics(source_coords, dest_coords)
-                    except Exception:
-                        res = None
+                    click_path = []
+
+                    # Snap both clicks onto the city graph (index is built once per graph)
+                    spatial = get_spatial_index(G)
+                    s_snap, s_km = spatial.nearest_node(*source_coords)
+                    d_snap, d_km = spatial.nearest_node(*dest_coords)
+                    if max(s_km, d_km) <= MAX_SNAP_KM and s_snap != d_snap:
+                        G_traffic = predict_traffic_weights(G, emergency_type)
+                        graph_route = solve_classical(G_traffic, s_snap, d_snap)
+                        if graph_route:
+                            trace_overlay = G_traffic
+                            # Off-graph legs at the 40 km/h simulation pace
+                            click_path = graph_route['path']
+                            res = (graph_route['eta'] + (s_km + d_km) * 1.5,
+                                   graph_route['distance'] + s_km + d_km,
+                                   "Low",
+                                   [source_coords] + get_geometry_store(G).route_geometry(click_path, zoom=MAP_ZOOM)
+                                   + [dest_coords])
+
+                    if res is None:
+                        try:
+                            res = loc_service.get_route_metrics(source_coords, dest_coords)
+                        except Exception:
+                            res = None
 
                     if isinstance(res, (list, tuple)) and len(res) >= 4:
                         c_time, c_dist, c_cong, c_geom = res
@@ -274,7 +346,7 @@ with tab1:
 
                     q_geom = c_geom
 
-                    classical_res = {'eta': round(c_time, 2), 'dist': round(c_dist, 2), 'path': []}
+                    classical_res = {'eta': round(c_time, 2), 'dist': round(c_dist, 2), 'path': click_path}
                     quantum_res = {'eta': round(q_time, 2), 'dist': round(q_dist, 2), 'qubits': 12 + int(urgency * 10), 'path': []}
 
                     circuit_diagram = f"""
@@ -307,14 +379,25 @@ with tab1:
 
             # Ensure mission log gets safe params (use fallbacks if missing)
             try:
+                mission_time = datetime.utcnow()
                 log_mission(city=city,
-                            emergency_type=emergency_type,
-                            source=str(source_coords),
-                            dest=str(dest_coords),
-                            classical_eta=float(classical_res.get('eta', 0)),
-                            quantum_eta=float(quantum_res.get('eta', 0)),
-                            distance=float(classical_res.get('dist', 0)),
-                            qubits=int(quantum_res.get('qubits', 0)))
+                            e_type=emergency_type,
+                            src=str(source_coords),
+                            dst=str(dest_coords),
+                            c_eta=float(classical_res.get('eta', 0)),
+                            q_eta=None if quantum_res.get('pending') else float(quantum_res.get('eta', 0)),
+                            dist=float(classical_res.get('dist', 0)),
+                            qubits=int(quantum_res.get('qubits', 0)),
+                            timestamp=mission_time)
+                # Node-level traces of the routes, linked to the mission by (city, timestamp).
+                # A pending QAOA job has no route of its own, so it gets no quantum trace.
+                if trace_overlay is not None:
+                    traced = [("classical", classical_res)]
+                    if not quantum_res.get('pending'):
+                        traced.append(("quantum", quantum_res))
+                    for solver, solver_res in traced:
+                        log_route_trace(trace_overlay, solver_res.get('path'), solver, city, emergency_type,
+                                        timestamp=mission_time)
             except Exception:
                 # Non-fatal: continue without breaking the UI
                 pass
@@ -336,7 +419,10 @@ with tab1:
             delta_str = f"▼ {delta:.1f} min" if delta > 0 else f"▲ {abs(delta):.1f} min"
         except Exception:
             delta_str = ""
-        c2.metric("Quantum ETA", f"{quantum_res.get('eta',0)} min", delta=delta_str, delta_color="normal")
+        if quantum_res.get('pending'):
+            c2.metric("Quantum ETA", "⏳ pending")
+        else:
+            c2.metric("Quantum ETA", f"{quantum_res.get('eta',0)} min", delta=delta_str, delta_color="normal")
         c3.metric("Distance", f"{classical_res.get('dist',0)} km")
         c4.metric("QPU Load", f"{quantum_res.get('qubits',0)} Qubits")
 
@@ -411,21 +497,26 @@ with tab2:
     st.markdown("## 📚 MISSION ARCHIVE")
     st.markdown("Secure audit log of all quantum-enhanced emergency responses.")
 
-    history = get_recent_missions()
-    if history:
-        data = []
-        for h in history:
-            data.append({
-                "ID": h.id,
-                "Time": h.timestamp.strftime("%Y-%m-%d %H:%M"),
-                "City": h.city,
-                "Type": h.emergency_type,
-                "Saved (min)": f"{h.time_saved:.2f}",
-                "Quantum ETA": f"{h.quantum_eta:.2f}",
-                "Status": h.status
-            })
-        df = pd.DataFrame(data)
+    # Columnar reads: recent rows for the table, hourly rollups for the chart
+    history = recent_mission_columns()
+    if len(history["id"]):
+        df = pd.DataFrame({
+            "ID": history["id"],
+            "Time": pd.to_datetime(history["timestamp"]).strftime("%Y-%m-%d %H:%M"),
+            "City": history["city"],
+            "Type": history["emergency_type"],
+            "Saved (min)": np.round(history["time_saved"].astype(float), 2),
+            "Quantum ETA": np.round(history["quantum_eta"].astype(float), 2),
+            "Status": history["status"]
+        })
         st.dataframe(df, use_container_width=True)
-        st.bar_chart(df, x="Time", y="Saved (min)")
+
+        hourly = mission_rollups(city=city, by=("hour",))
+        if len(hourly["hour"]):
+            trend = pd.DataFrame({"Hour": hourly["hour"], "Missions": hourly["missions"],
+                                  "Mean Saved (min)": hourly["mean_time_saved"],
+                                  "Mean Quantum ETA": hourly["mean_quantum_eta"]}).set_index("Hour")
+            st.bar_chart(trend[["Mean Saved (min)"]])
+            st.line_chart(trend[["Missions"]])
     else:
         st.info("No missions logged in database yet.")
@@ -8,7 +8,7 @@ import plotly.express as px
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from backend.city_graph import create_city_graph
-from backend.traffic_model import predict_traffic, get_traffic_forecast
+from backend.traffic_model import predict_traffic_weights, get_traffic_forecast
 
 st.set_page_config(page_title="Traffic Dashboard", page_icon="📉", layout="wide")
 
@@ -24,13 +24,13 @@ G = st.session_state.graph
 if st.button("🔄 Refresh Live Data"):
     st.rerun()
 
-# Get Data
-G_traffic, stats = predict_traffic(G, "Custom") # Use generic type for overview
+# Get Data (array-based, no graph copy)
+pred = predict_traffic_weights(G, "Custom") # Use generic type for overview
 
 # 1. KPI Metrics
 total_roads = G.number_of_edges()
-congested_roads = sum(1 for d in stats.values() if d['status'] == 'High')
-avg_congestion = sum(d['predicted']/d['base'] for d in stats.values()) / total_roads
+congested_roads = pred.status_counts()['High']
+avg_congestion = pred.mean_load_factor()
 
 k1, k2, k3 = st.columns(3)
 with k1: st.metric("Active Hotspots", f"{congested_roads} / {total_roads}", delta="High Priority", delta_color="inverse")
@@ -47,16 +47,15 @@ st.line_chart(df_forecast.set_index('time'), height=300)
 
 # 3. Detailed Road Status
 st.subheader("🚦 Road Segment Status")
-rows = []
-for (u, v), data in stats.items():
-    rows.append({
-        "From": u, "To": v, 
-        "Status": data['status'], 
-        "Base Time": f"{data['base']} min",
-        "Current Time": f"{data['predicted']} min",
-        "Load Factor": round(data['predicted']/data['base'], 2)
-    })
-df_roads = pd.DataFrame(rows)
+C = pred.graph
+names = pd.Series(C.names)
+df_roads = pd.DataFrame({
+    "From": names[C.edge_u].values, "To": names[C.edge_v].values,
+    "Status": pred.status,
+    "Base Time": pd.Series(C.base_weight).astype(str) + " min",
+    "Current Time": pd.Series(pred.weight).astype(str) + " min",
+    "Load Factor": (pred.weight / C.base_weight).round(2)
+})
 
 # Color coding for dataframe
 def color_status(val):
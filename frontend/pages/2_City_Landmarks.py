@@ -7,7 +7,7 @@ import networkx as nx
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from backend.city_graph import create_city_graph
-from backend.traffic_model import predict_traffic
+from backend.traffic_model import predict_traffic_weights
 
 st.set_page_config(page_title="City Landmarks", page_icon="🏛️", layout="wide")
 
@@ -25,8 +25,9 @@ if 'current_city' not in st.session_state or st.session_state.current_city != se
 
 G = st.session_state.graph
 
-# Get current traffic for "Accessibility" score
-G_traffic, stats = predict_traffic(G, "Custom")
+# Get current traffic for "Accessibility" score (per-edge arrays, no graph copy)
+pred = predict_traffic_weights(G, "Custom")
+C = pred.graph
 
 # Layout
 col1, col2 = st.columns([1, 2])
@@ -44,19 +45,19 @@ with col2:
     degree = G.degree[selected_node]
     
     # Accessibility: Avg time of incoming edges
-    incoming_edges = G_traffic.edges(selected_node, data=True)
-    avg_time = sum(d['weight'] for u, v, d in incoming_edges) / len(incoming_edges) if incoming_edges else 0
+    nbr_ids, edge_ids = C.neighbors(C.node_id(selected_node))
+    avg_time = pred.weight[edge_ids].mean() if len(edge_ids) else 0
     
     m1, m2 = st.columns(2)
     with m1: st.metric("Connectivity", f"{degree} Roads")
     with m2: st.metric("Avg Access Time", f"{avg_time:.1f} min")
     
     st.markdown("#### Connected Roads Status")
-    for u, v, d in incoming_edges:
-        neighbor = v if u == selected_node else u
-        status = d.get('congestion_level', 'Low')
+    for nbr, e in zip(nbr_ids, edge_ids):
+        neighbor = C.node_name(nbr)
+        status = pred.status[e]
         icon = "🟢" if status == 'Low' else "🟠" if status == 'Medium' else "🔴"
-        st.write(f"{icon} **To/From {neighbor}**: {d['weight']} min ({status})")
+        st.write(f"{icon} **To/From {neighbor}**: {pred.weight[e]} min ({status})")
         
     st.markdown("---")
     if st.button(f"🚑 Navigate to {selected_node}"):
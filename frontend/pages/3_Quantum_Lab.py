@@ -41,20 +41,26 @@ with tab2:
     G = create_city_graph()
     solver = QAOASolver(G, "Benz Circle", "PVP Square")
     solver.calculate_qubits() # Prep candidates
-    solver.solve() # Generate circuit
+    result = solver.solve() # Generate circuit
     
-    st.markdown("**Generated Circuit Diagram (Cirq):**")
-    st.code(solver.circuit, language="text")
+    st.markdown("**Generated Circuit (QAOA, statevector simulated):**")
+    st.code(str(solver.circuit), language="text")
     
     st.markdown(f"**Qubits Used:** {len(solver.qubits)}")
     st.markdown(f"**Circuit Depth:** {len(solver.circuit)}")
+    if solver.reduction:
+        red = solver.reduction
+        st.markdown(f"**Problem Reduction:** {red['nodes']} nodes / {red['edges']} roads → "
+                    f"{red['reduced_nodes']} nodes / {red['reduced_edges']} super-edges "
+                    f"(A* ellipse slack {red['slack']:.0%}) → {red['qubits']} qubits")
+    st.markdown(f"**Selected Route:** {' → '.join(result['path'])} ({result['eta']} min)")
 
 with tab3:
     st.subheader("Backend Specifications")
     st.json({
-        "Backend": "Google Cirq Simulator",
+        "Backend": "NumPy Statevector Simulator",
         "Qubit Topology": "All-to-All Connectivity",
         "Gate Set": ["H", "Rz", "Rx", "CNOT", "Measure"],
         "Noise Model": "None (Ideal Simulation)",
-        "Shots": 100
+        "Shots": solver.shots
     })
@@ -9,6 +9,9 @@ from streamlit_folium import st_folium
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from backend.location_services import LocationServices
+from backend.city_graph import create_city_graph
+from backend.traffic_model import predict_traffic_weights
+from backend.matrix_routing import assign_nearest_units
 
 st.set_page_config(page_title="Asset Tracker", page_icon="🛰️", layout="wide")
 
@@ -72,9 +75,9 @@ with tab_map:
     ).add_to(m)
     
     # 3. Draw Assets
-    for asset in assets:
-        # Check Geofence Logic
-        is_inside, dist = loc.check_geofence((asset['lat'], asset['lon']), (fence_lat, fence_lon), fence_radius)
+    # Geofence check for the whole fleet in one vectorized call
+    fence_inside, fence_dist = loc.check_geofences([(a['lat'], a['lon']) for a in assets], (fence_lat, fence_lon), fence_radius)
+    for asset, is_inside, dist in zip(assets, fence_inside, fence_dist):
         
         # Icon Selection
         if asset['type'] == 'Ambulance': icon_name = 'ambulance'
@@ -111,8 +114,7 @@ with tab_map:
     with c_info:
         st.subheader("⚠️ Alert Feed")
         violations = []
-        for asset in assets:
-            inside, dist = loc.check_geofence((asset['lat'], asset['lon']), (fence_lat, fence_lon), fence_radius)
+        for asset, inside, dist in zip(assets, fence_inside, fence_dist):
             if not inside:
                 violations.append(asset)
                 st.error(f"🚨 **{asset['id']}**\nOUTSIDE ZONE (+{dist-fence_radius:.1f}km)")
@@ -187,6 +189,24 @@ with tab_comms:
         else:
              st.error("Connection Lost. Select a unit.")
 
+# Nearest-unit dispatch to every landmark, one matrix for the whole fleet
+with st.expander("⏱️ Dispatch ETA Matrix", expanded=False):
+    # Reuse the session graph so the per-graph traffic and matrix caches stay warm across reruns
+    if st.session_state.get('current_city') != "Vijayawada" or 'graph' not in st.session_state:
+        st.session_state.current_city = "Vijayawada"
+        st.session_state.graph = create_city_graph("Vijayawada")
+    G_city = st.session_state.graph
+    G_live = predict_traffic_weights(G_city, "Ambulance")
+    landmarks = list(G_city.nodes())
+    eta = loc.dispatch_matrix(assets, landmarks, G_live)
+    best_unit, best_eta = assign_nearest_units(eta)
+    st.dataframe(pd.DataFrame(eta.round(1), index=[a['id'] for a in assets], columns=landmarks), use_container_width=True)
+    st.dataframe(pd.DataFrame({
+        "Landmark": landmarks,
+        "Nearest Unit": [assets[i]['id'] for i in best_unit],
+        "ETA (min)": best_eta.round(1)
+    }), use_container_width=True, hide_index=True)
+
 # Quick Table View at bottom
 with st.expander("📋 Full Fleet Manifest", expanded=False):
      st.dataframe(df_assets, use_container_width=True, hide_index=True)
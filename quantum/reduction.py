@@ -0,0 +1,129 @@
+"""
+Problem-size reduction before quantum encoding.
+
+Qubit counts grow with the edges (or routes) handed to the encoder, so the
+road graph is shrunk with classical bounds first:
+
+1. A* ellipse: with D the optimal source -> dest time and slack s, a node can
+   only lie on a route within (1 + s) * D if lb(s, v) + lb(v, t) <= (1 + s) * D.
+   The straight-line lower bound prunes cheaply in one vectorized pass; exact
+   Dijkstra distances from both ends on what is left tighten it.
+2. Dead ends (degree 1) cannot be on a simple route and are dropped.
+3. Degree-2 chains are collapsed into single super-edges that remember the
+   road nodes they stand for, so a long road is one qubit, not many.
+
+Super-edges are oriented by distance from the source; every shortest route
+runs "away" from the source, so one qubit per super-edge suffices.
+"""
+import networkx as nx
+import numpy as np
+
+from backend.classical_solver import min_minutes_per_km, _weight_fn
+from backend.geodesy import distance_km
+
+
+class ReducedProblem:
+    """
+    Reduced graph plus what is needed to map its routes back to road nodes.
+    """
+
+    def __init__(self, graph, source, dest, dist_source, stats):
+        self.graph = graph
+        self.source = source
+        self.dest = dest
+        self.dist_source = dist_source
+        self.stats = stats
+
+    def arcs(self):
+        """
+        Super-edges oriented away from the source, as (u, v) pairs.
+        """
+        ds = self.dist_source
+        return [(u, v) if ds[u] <= ds[v] else (v, u) for u, v in self.graph.edges()]
+
+    def expand(self, path):
+        """
+        Road-node route for a route over the reduced graph.
+        """
+        if path is None:
+            return None
+        full = [path[0]]
+        for u, v in zip(path[:-1], path[1:]):
+            chain = self.graph[u][v]["chain"]
+            full.extend((chain if chain[0] == u else chain[::-1])[1:])
+        return full
+
+
+def _collapse(R, keep):
+    """
+    Drops dead ends and merges degree-2 nodes (other than `keep`) in place.
+    """
+    stack = [x for x in R if x not in keep and R.degree(x) <= 2]
+    while stack:
+        x = stack.pop()
+        if x not in R or x in keep:
+            continue
+        deg = R.degree(x)
+        if deg <= 1:
+            nbrs = list(R[x])
+            R.remove_node(x)
+            stack.extend(n for n in nbrs if n not in keep)
+            continue
+        if deg != 2:
+            continue
+        a, c = list(R[x])
+        e1, e2 = R[a][x], R[x][c]
+        p1 = e1["chain"] if e1["chain"][-1] == x else e1["chain"][::-1]
+        p2 = e2["chain"] if e2["chain"][0] == x else e2["chain"][::-1]
+        merged = {"weight": e1["weight"] + e2["weight"], "distance": e1["distance"] + e2["distance"],
+                  "chain": p1 + p2[1:]}
+        R.remove_node(x)
+        if not R.has_edge(a, c) or merged["weight"] < R[a][c]["weight"]:
+            R.add_edge(a, c, **merged)
+        stack.extend(n for n in (a, c) if n not in keep)
+    return R
+
+
+def reduce_problem(G, source, dest, weight='weight', slack=0.25):
+    """
+    Shrinks G around a source -> dest query. Returns a ReducedProblem, or
+    None when dest is unreachable.
+    """
+    wfn = _weight_fn(weight)
+    try:
+        best = nx.dijkstra_path_length(G, source, dest, weight=weight)
+    except nx.NetworkXNoPath:
+        return None
+    bound = (1 + slack) * best + 1e-9
+
+    # 1a. Straight-line ellipse, all nodes in one pass
+    nodes = list(G.nodes())
+    pos = np.array([G.nodes[n].get('pos', (np.nan, np.nan)) for n in nodes], dtype=np.float64)
+    pace = min_minutes_per_km(G, weight)
+    lb = (np.nan_to_num(distance_km(pos, pos[nodes.index(source)]))
+          + np.nan_to_num(distance_km(pos, pos[nodes.index(dest)]))) * pace
+    ellipse = [n for n, ok in zip(nodes, (lb <= bound).tolist()) if ok]
+
+    # 1b. Exact ellipse on what is left
+    H = G.subgraph(ellipse)
+    ds = nx.single_source_dijkstra_path_length(H, source, cutoff=bound, weight=weight)
+    dt = nx.single_source_dijkstra_path_length(H, dest, cutoff=bound, weight=weight)
+    inside = [n for n in ds if n in dt and ds[n] + dt[n] <= bound]
+
+    R = nx.Graph()
+    R.add_nodes_from(inside)
+    for u, v, data in G.subgraph(inside).edges(data=True):
+        R.add_edge(u, v, weight=float(wfn(u, v, data)), distance=float(data.get('distance', 0)), chain=[u, v])
+    exact_nodes, exact_edges = R.number_of_nodes(), R.number_of_edges()
+
+    # 2 + 3. Dead ends and degree-2 chains
+    _collapse(R, {source, dest})
+    dist_source = nx.single_source_dijkstra_path_length(R, source, weight='weight')
+
+    stats = {
+        "nodes": G.number_of_nodes(), "edges": G.number_of_edges(),
+        "ellipse_nodes": len(ellipse), "exact_nodes": exact_nodes, "exact_edges": exact_edges,
+        "reduced_nodes": R.number_of_nodes(), "reduced_edges": R.number_of_edges(),
+        "slack": slack,
+    }
+    return ReducedProblem(R, source, dest, dist_source, stats)
@@ -0,0 +1,143 @@
+import unittest
+import sys
+import os
+import io
+import contextlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.ors_client import OrsClient, ResponseCache, TokenBucket, get_ors_client
+from backend.bulk_metrics import matrix_batches, refresh_edge_weights
+from backend.city_graph import update_graph_weather_traffic
+from backend.graph_engine import CSRGraph
+from backend.location_services import LocationServices
+from backend.traffic_model import predict_traffic_weights
+from tests.test_routing import grid_city
+
+def fake_seconds(a, b):
+    # Deterministic stand-in for a routed duration between [lon, lat] points
+    return 1e5 * (abs(a[0] - b[0]) + abs(a[1] - b[1])) + 30
+
+class MockORS(BaseHTTPRequestHandler):
+    calls = {"matrix": 0, "directions": 0}
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with MockORS.lock:
+            MockORS.in_flight += 1
+            MockORS.peak = max(MockORS.peak, MockORS.in_flight)
+        time.sleep(0.01)
+        if self.path.startswith("/v2/matrix/"):
+            MockORS.calls["matrix"] += 1
+            locs = body["locations"]
+            durations = [[fake_seconds(locs[i], locs[j]) for j in body["destinations"]] for i in body["sources"]]
+            reply = {"durations": durations, "distances": [[d * 10 for d in row] for row in durations]}
+        else:
+            MockORS.calls["directions"] += 1
+            a, b = body["coordinates"]
+            seconds = fake_seconds(a, b)
+            reply = {"routes": [{"summary": {"duration": seconds, "distance": seconds * 10}, "geometry": ""}]}
+        with MockORS.lock:
+            MockORS.in_flight -= 1
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class TestBulkMetrics(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MockORS)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        MockORS.calls.update(matrix=0, directions=0)
+        MockORS.peak = 0
+        self.client = OrsClient("test-key-0123456789", self.base_url, cache=ResponseCache(":memory:"),
+                                limiter=TokenBucket(rate=1e6, capacity=1e6))
+        self.G = grid_city(8)
+
+    def expected_minutes(self, G):
+        return {(u, v): round(fake_seconds(G.nodes[u]['pos'][::-1], G.nodes[v]['pos'][::-1]) / 60, 2)
+                for u, v in G.edges()}
+
+    def test_matrix_batches_cover_every_edge_once(self):
+        C = CSRGraph.from_networkx(self.G)
+        batches = matrix_batches(C, max_locations=12)
+        edges = sorted(e for batch, _, _ in batches for e in batch)
+        self.assertEqual(edges, list(range(C.number_of_edges())))
+        for batch, src, dst in batches:
+            self.assertLessEqual(len(src) + len(dst), 12)
+            self.assertTrue(set(C.edge_u[batch].tolist()) <= set(src))
+            self.assertTrue(set(C.edge_v[batch].tolist()) <= set(dst))
+
+    def test_matrix_refresh(self):
+        before = predict_traffic_weights(self.G, "Ambulance", minute=42)
+        updated = refresh_edge_weights(self.G, self.client, max_locations=20)
+        self.assertEqual(updated, (self.G.number_of_edges(), 0))
+        self.assertLess(MockORS.calls["matrix"], self.G.number_of_edges() / 4)
+        for (u, v), w in self.expected_minutes(self.G).items():
+            self.assertAlmostEqual(self.G[u][v]['weight'], w, places=2)
+            self.assertAlmostEqual(self.G[u][v]['base_weight'], w, places=2)
+        # Predictions are re-priced from the live times
+        after = predict_traffic_weights(self.G, "Ambulance", minute=42)
+        self.assertIsNot(after, before)
+        C = after.graph
+        u, v = C.names[C.edge_u[0]], C.names[C.edge_v[0]]
+        self.assertAlmostEqual(C.base_weight[0], self.expected_minutes(self.G)[(u, v)], places=2)
+
+    def test_directions_refresh_bounded_concurrency(self):
+        updated = refresh_edge_weights(self.G, self.client, mode="directions", concurrency=4)
+        self.assertEqual(updated, (self.G.number_of_edges(), 0))
+        self.assertEqual(MockORS.calls["directions"], self.G.number_of_edges())
+        self.assertLessEqual(MockORS.peak, 4)
+        self.assertGreater(MockORS.peak, 1)
+        u, v = next(iter(self.G.edges()))
+        self.assertAlmostEqual(self.G[u][v]['weight'], self.expected_minutes(self.G)[(u, v)], places=2)
+
+    def test_failures_are_reported_and_counted(self):
+        class DownClient:
+            def matrix(self, *args):
+                raise ConnectionError("ORS down")
+            directions = matrix
+
+        weights = dict(((u, v), w) for u, v, w in self.G.edges(data='weight'))
+        for mode in ("matrix", "directions"):
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                updated = refresh_edge_weights(self.G, DownClient(), mode=mode)
+            self.assertEqual(updated, (0, self.G.number_of_edges()))
+            self.assertIn(f"ORS {mode}", out.getvalue())
+        self.assertEqual(dict(((u, v), w) for u, v, w in self.G.edges(data='weight')), weights)
+        self.assertNotIn("weights_version", self.G.graph)
+
+    def test_update_graph_weather_traffic(self):
+        self.assertEqual(update_graph_weather_traffic(self.G), (0, 0))
+        get_ors_client("bulk-key-0123456789", self.base_url, cache=ResponseCache(":memory:"),
+                       limiter=TokenBucket(rate=1e6, capacity=1e6))
+        loc = LocationServices(ors_key="bulk-key-0123456789", base_url=self.base_url)
+        self.assertEqual(update_graph_weather_traffic(self.G, loc), (self.G.number_of_edges(), 0))
+        self.assertEqual(self.G.graph["weights_version"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
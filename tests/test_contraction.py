@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import random
+
+import networkx as nx
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.city_graph import create_city_graph
+from backend.traffic_model import predict_traffic
+from backend.classical_solver import solve_classical
+from backend.contraction import ContractionHierarchy
+from backend.graph_engine import CSRGraph
+from tests.test_routing import grid_city
+
+class TestContractionHierarchy(unittest.TestCase):
+
+    def setUp(self):
+        self.G = grid_city(10)
+        self.ch = ContractionHierarchy(self.G)
+
+    def _check_queries(self, G, ch, trials=30):
+        rng = random.Random(3)
+        nodes = list(G.nodes())
+        for _ in range(trials):
+            s, t = rng.sample(nodes, 2)
+            path, cost, _ = ch.shortest_path(s, t)
+            self.assertAlmostEqual(cost, nx.dijkstra_path_length(G, s, t, weight='weight'), places=6)
+            self.assertEqual((path[0], path[-1]), (s, t))
+            # Unpacked path must use real edges and add up to the reported cost
+            self.assertAlmostEqual(nx.path_weight(G, path, 'weight'), cost, places=6)
+
+    def test_queries_match_dijkstra(self):
+        self._check_queries(self.G, self.ch)
+
+    def test_recustomization_keeps_ordering(self):
+        rank = self.ch.rank.copy()
+        rng = np.random.default_rng(5)
+        C = CSRGraph.from_networkx(self.G)
+        new_w = np.round(C.weight * rng.uniform(0.5, 3.0, size=len(C.weight)), 3)
+        self.ch.customize(new_w)
+        np.testing.assert_array_equal(self.ch.rank, rank)
+        self._check_queries(C.to_networkx(weight=new_w), self.ch)
+
+    def test_in_place_weight_edits_are_picked_up(self):
+        G = grid_city(6)
+        ch = ContractionHierarchy(G)
+        s, t = (0, 0), (5, 5)
+        path, _, _ = ch.customize_for(G).shortest_path(s, t)
+        # Jam the first hop of the route on the same graph object
+        G[path[0]][path[1]]['weight'] *= 50
+        path2, cost, _ = ch.customize_for(G).shortest_path(s, t)
+        self.assertAlmostEqual(cost, nx.dijkstra_path_length(G, s, t, weight='weight'), places=6)
+        self.assertNotEqual(path2[1], path[1])
+
+    def test_solve_classical_ch_mode(self):
+        G = create_city_graph()
+        ch = ContractionHierarchy(G)
+        for e_type in ("Ambulance", "Police Response"):
+            H, _ = predict_traffic(G, e_type)
+            res = solve_classical(H, "Bhavani Island", "Airport (Gannavaram)", algorithm="ch", ch=ch)
+            expected = solve_classical(H, "Bhavani Island", "Airport (Gannavaram)")
+            self.assertEqual(res["eta"], expected["eta"])
+            self.assertEqual(res["algorithm"], "ch")
+
+    def test_unreachable(self):
+        G = grid_city(3)
+        G.add_node("island", pos=(16.0, 80.0))
+        path, cost, _ = ContractionHierarchy(G).shortest_path((0, 0), "island")
+        self.assertIsNone(path)
+        self.assertEqual(cost, float("inf"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+
+from sqlalchemy import create_engine, func, select, text
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+
+import numpy as np
+
+from backend.database import (Base, MissionHistory, MissionWriter, _mission_row, create_tuned_engine,
+                              migrate, MIGRATIONS, write_missions, mission_rollups, recent_mission_columns)
+from backend.db_benchmark import run_benchmark
+
+class TestMissionWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'history.db')}")
+        Base.metadata.create_all(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def count(self):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(MissionHistory)).scalar()
+
+    def row(self, i):
+        return _mission_row("Vijayawada", "Ambulance", f"src{i}", f"dst{i}", 12.0, 10.5, 4.2, 9)
+
+    def test_rows_are_batched(self):
+        writer = MissionWriter(bind=self.engine, batch_size=10, flush_ms=100)
+        for i in range(25):
+            self.assertTrue(writer.submit(self.row(i)))
+        writer.flush()
+        self.assertEqual(self.count(), 25)
+        stats = writer.stats()
+        self.assertEqual(stats["rows_written"], 25)
+        self.assertLessEqual(stats["batches"], 5)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertGreater(stats["mean_flush_ms"], 0)
+        writer.close()
+
+    def test_close_flushes_pending_rows(self):
+        writer = MissionWriter(bind=self.engine, batch_size=1000, flush_ms=60000)
+        for i in range(5):
+            writer.submit(self.row(i))
+        writer.close()
+        self.assertEqual(self.count(), 5)
+        with self.engine.connect() as conn:
+            saved = conn.execute(select(MissionHistory.time_saved)).scalars().all()
+        self.assertEqual(saved, [1.5] * 5)
+
+    def test_synchronous_fallback(self):
+        writer = MissionWriter(bind=self.engine)
+        writer.close()
+        self.assertFalse(writer.submit(self.row(0)))
+        self.assertEqual(self.count(), 1)
+        self.assertEqual(writer.stats()["sync_writes"], 1)
+
+    def test_rows_submitted_during_close_are_kept(self):
+        writer = MissionWriter(bind=self.engine, batch_size=10, flush_ms=5)
+        go = threading.Event()
+
+        def producer(k):
+            go.wait()
+            for i in range(50):
+                writer.submit(self.row(k * 100 + i))
+
+        threads = [threading.Thread(target=producer, args=(k,)) for k in range(4)]
+        for t in threads:
+            t.start()
+        go.set()
+        writer.close()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.count(), 200)
+        self.assertEqual(writer.queue.qsize(), 0)
+
+class TestSchemaTuning(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'history.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def indexes(self, eng):
+        with eng.connect() as conn:
+            return {row[1] for row in conn.execute(text("PRAGMA index_list(missions)"))}
+
+    def test_pragmas_applied_on_connect(self):
+        eng = create_tuned_engine(f"sqlite:///{self.path}")
+        with eng.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)  # NORMAL
+            self.assertEqual(conn.execute(text("PRAGMA cache_size")).scalar(), -65536)
+        eng.dispose()
+
+    def test_migration_upgrades_existing_database(self):
+        # A database from before the indexes existed
+        old = create_engine(f"sqlite:///{self.path}")
+        with old.begin() as conn:
+            conn.execute(text("CREATE TABLE missions (id INTEGER PRIMARY KEY, timestamp DATETIME, city VARCHAR, "
+                              "emergency_type VARCHAR, source VARCHAR, destination VARCHAR, classical_eta FLOAT, "
+                              "quantum_eta FLOAT, time_saved FLOAT, distance_km FLOAT, qubits_used INTEGER, "
+                              "status VARCHAR)"))
+        old.dispose()
+        eng = create_tuned_engine(f"sqlite:///{self.path}")
+        self.assertEqual(migrate(eng), len(MIGRATIONS))
+        self.assertTrue({"ix_missions_city_timestamp", "ix_missions_type_timestamp"} <= self.indexes(eng))
+        with eng.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA user_version")).scalar(), len(MIGRATIONS))
+            plan = " ".join(str(r) for r in conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM missions WHERE city = 'X' ORDER BY timestamp DESC")))
+        self.assertIn("ix_missions_city_timestamp", plan)
+        # Re-running is a no-op
+        self.assertEqual(migrate(eng), len(MIGRATIONS))
+        eng.dispose()
+
+    def test_benchmark_runs(self):
+        res = run_benchmark(self.path, tuned=True, readers=2, seconds=0.3, rows=200)
+        self.assertEqual(res["journal_mode"], "wal")
+        self.assertGreater(res["reads_per_s"], 0)
+        self.assertGreater(res["writes_per_s"], 0)
+        self.assertEqual(res["errors"], 0)
+
+class TestRollups(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_tuned_engine(f"sqlite:///{os.path.join(self.tmp.name, 'history.db')}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def rows(self, n, hour, city="Vijayawada", e_type="Ambulance"):
+        out = []
+        for i in range(n):
+            row = _mission_row(city, e_type, "s", "d", 10.0 + i, 8.0 + i, 3.0, 8)
+            row["timestamp"] = datetime(2026, 10, 16, hour, i)
+            out.append(row)
+        return out
+
+    def test_backfill_and_incremental_updates(self):
+        migrate(self.engine)
+        # Rows written before the trigger existed are picked up by the backfill
+        with self.engine.begin() as conn:
+            conn.execute(text("DROP TRIGGER trg_missions_rollup"))
+            conn.execute(text("PRAGMA user_version=1"))
+        write_missions(self.rows(3, 9), self.engine)
+        migrate(self.engine)
+        write_missions(self.rows(2, 9) + self.rows(4, 10) + self.rows(1, 10, city="Hyderabad"), self.engine)
+
+        cols = mission_rollups(city="Vijayawada", bind=self.engine)
+        self.assertEqual(cols["hour"].dtype, np.dtype("datetime64[h]"))
+        np.testing.assert_array_equal(cols["missions"], [5, 4])
+        self.assertEqual(str(cols["hour"][0]), "2026-10-16T09")
+        # Hour 9: saved 2.0 each; quantum ETAs 8, 9, 10 then 8, 9
+        np.testing.assert_allclose(cols["mean_time_saved"], [2.0, 2.0])
+        np.testing.assert_allclose(cols["mean_quantum_eta"][0], (8 + 9 + 10 + 8 + 9) / 5)
+
+        totals = mission_rollups(by=("city",), since=datetime(2026, 10, 16, 10), bind=self.engine)
+        self.assertEqual(totals["city"].tolist(), ["Hyderabad", "Vijayawada"])
+        self.assertEqual(totals["missions"].tolist(), [1, 4])
+        with self.assertRaises(ValueError):
+            mission_rollups(by=("city", "1); DROP TABLE missions; --"), bind=self.engine)
+
+    def test_pending_quantum_missions_skip_rollups(self):
+        migrate(self.engine)
+        pending = _mission_row("Vijayawada", "Ambulance", "s", "d", 12.0, None, 3.0, 0, datetime(2026, 10, 16, 9, 30))
+        self.assertEqual(pending["status"], "QUANTUM_PENDING")
+        self.assertIsNone(pending["time_saved"])
+        write_missions(self.rows(2, 9) + [pending], self.engine)
+        cols = mission_rollups(bind=self.engine)
+        self.assertEqual(cols["missions"].tolist(), [2])
+        np.testing.assert_allclose(cols["mean_quantum_eta"], [8.5])
+        recent = recent_mission_columns(bind=self.engine)
+        self.assertEqual(recent["status"][0], "QUANTUM_PENDING")
+        self.assertIsNone(recent["quantum_eta"][0])
+
+    def test_recent_columns(self):
+        migrate(self.engine)
+        write_missions(self.rows(4, 9), self.engine)
+        cols = recent_mission_columns(limit=3, bind=self.engine)
+        self.assertEqual(cols["id"].tolist(), [4, 3, 2])
+        self.assertEqual(cols["timestamp"].dtype, np.dtype("datetime64[us]"))
+        empty = recent_mission_columns(city="Nowhere", bind=self.engine)
+        self.assertEqual(len(empty["id"]), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import sys
+import os
+import math
+
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.geodesy import haversine_km, bearing_deg, distance_matrix_km
+from backend.city_graph import create_city_graph
+from backend.location_services import LocationServices
+
+def scalar_haversine(lat1, lon1, lat2, lon2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
+    return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+class TestGeodesy(unittest.TestCase):
+
+    def test_matches_scalar_formula(self):
+        rng = np.random.default_rng(0)
+        pts = rng.uniform([16.0, 80.0, 16.0, 80.0], [17.0, 81.0, 17.0, 81.0], size=(50, 4))
+        vec = haversine_km(pts[:, 0], pts[:, 1], pts[:, 2], pts[:, 3])
+        for row, d in zip(pts, vec):
+            self.assertAlmostEqual(d, scalar_haversine(*row), places=9)
+
+    def test_bearing_cardinal(self):
+        self.assertAlmostEqual(float(bearing_deg(16.5, 80.6, 16.6, 80.6)), 0.0, places=6)
+        self.assertAlmostEqual(float(bearing_deg(16.5, 80.6, 16.5, 80.7)), 90.0, delta=0.1)
+
+    def test_matrix_shape(self):
+        self.assertEqual(distance_matrix_km([(16.5, 80.6)] * 3, [(16.5, 80.7)] * 4).shape, (3, 4))
+
+    def test_city_graph_distances(self):
+        G = create_city_graph()
+        for u, v, d in G.edges(data='distance'):
+            expected = round(scalar_haversine(*G.nodes[u]['pos'], *G.nodes[v]['pos']), 2)
+            self.assertEqual(d, expected)
+
+    def test_geofences_match_single_checks(self):
+        loc = LocationServices()
+        points = [(16.50, 80.65), (16.53, 80.70), (16.49, 80.62)]
+        inside, dists = loc.check_geofences(points, (16.5003, 80.6534), 3.0)
+        for p, ok, d in zip(points, inside, dists):
+            self.assertEqual((bool(ok), float(d)), loc.check_geofence(p, (16.5003, 80.6534), 3.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.graph_engine import CSRGraph
+from backend.classical_solver import solve_classical
+from backend.geometry_store import (EdgeGeometryStore, encode_points, decode_points, simplify,
+                                    zoom_tolerance_m, fill_from_ors, fill_in_background, get_geometry_store,
+                                    geometry_path, RETRY_FAILED_S)
+from tests.test_routing import grid_city
+
+def wiggle(a, b, k=20, amp=2e-4):
+    # A curved road between two points
+    t = np.linspace(0, 1, k)[:, None]
+    pts = np.asarray(a) * (1 - t) + np.asarray(b) * t
+    pts[:, 1] += amp * np.sin(np.pi * t[:, 0])
+    return pts
+
+def encode_polyline(points, precision=5):
+    # Inverse of backend.ors_client.decode_polyline
+    out, prev = [], (0, 0)
+    for lat, lon in points:
+        cur = (round(lat * 10 ** precision), round(lon * 10 ** precision))
+        for d in (cur[0] - prev[0], cur[1] - prev[1]):
+            v = ~(d << 1) if d < 0 else d << 1
+            while v >= 0x20:
+                out.append(chr((0x20 | (v & 0x1f)) + 63))
+                v >>= 5
+            out.append(chr(v + 63))
+        prev = cur
+    return "".join(out)
+
+class FakeClient:
+    """
+    ORS stand-in whose directions follow a curved road between the two points.
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def directions(self, coordinates):
+        self.calls += 1
+        (lon_a, lat_a), (lon_b, lat_b) = coordinates
+        return {"routes": [{"geometry": encode_polyline(wiggle((lat_a, lon_a), (lat_b, lon_b)))}]}
+
+class FailingClient(FakeClient):
+    def directions(self, coordinates):
+        self.calls += 1
+        raise ConnectionError("ORS unreachable")
+
+class TestGeometryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.G = grid_city(6)
+        self.C = CSRGraph.from_networkx(self.G)
+        self.store = EdgeGeometryStore(self.C)
+
+    def test_delta_round_trip(self):
+        pts = wiggle((16.50, 80.60), (16.51, 80.62))
+        enc = encode_points(pts)
+        self.assertEqual(enc.dtype, np.int32)
+        # Steps after the first point are small
+        self.assertLess(np.abs(enc[1:]).max(), 2000)
+        np.testing.assert_allclose(decode_points(enc), pts, atol=1e-6)
+
+    def test_route_concatenates_oriented_segments(self):
+        route = solve_classical(self.G, (0, 0), (5, 5))["path"]
+        for u, v in zip(route[:-1], route[1:]):
+            e = self.C.edge_id(self.C.node_id(u), self.C.node_id(v))
+            # Store half the shapes backwards; the store re-orients them
+            pts = wiggle(self.G.nodes[u]['pos'], self.G.nodes[v]['pos'])
+            self.store.set_edge(e, pts if e % 2 else pts[::-1])
+        self.assertTrue(self.store.covers(route))
+        geom = self.store.route_geometry(route)
+        self.assertEqual(len(geom), 19 * (len(route) - 1) + 1)
+        np.testing.assert_allclose(geom[0], self.G.nodes[route[0]]['pos'], atol=1e-6)
+        np.testing.assert_allclose(geom[-1], self.G.nodes[route[-1]]['pos'], atol=1e-6)
+        # Consecutive points never jump across the map
+        steps = np.abs(np.diff(np.array(geom), axis=0)).max()
+        self.assertLess(steps, 0.01)
+
+    def test_missing_edges_fall_back_to_straight_lines(self):
+        route = [(0, 0), (0, 1), (0, 2)]
+        self.assertFalse(self.store.covers(route))
+        geom = self.store.route_geometry(route)
+        self.assertEqual(geom, [tuple(self.G.nodes[n]['pos']) for n in route])
+
+    def test_simplify_by_zoom(self):
+        pts = wiggle((16.50, 80.60), (16.52, 80.64), k=400, amp=1e-3)
+        fine = simplify(pts, zoom_tolerance_m(18, 16.5))
+        coarse = simplify(pts, zoom_tolerance_m(10, 16.5))
+        self.assertLess(len(coarse), len(fine))
+        self.assertLessEqual(len(fine), len(pts))
+        np.testing.assert_array_equal(coarse[[0, -1]], pts[[0, -1]])
+        # A straight line collapses to its endpoints
+        line = np.linspace([16.5, 80.6], [16.6, 80.7], 50)
+        self.assertEqual(len(simplify(line, 1.0)), 2)
+
+    def test_shapes_must_run_along_the_edge(self):
+        e = 0
+        u, v = self.C.pos[self.C.edge_u[e]], self.C.pos[self.C.edge_v[e]]
+        with self.assertRaises(ValueError):
+            self.store.set_edge(e, [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)])
+        with self.assertRaises(ValueError):
+            self.store.set_edge(e, wiggle(u, u + 0.01))
+        self.assertFalse(self.store.has_edge(e))
+        self.store.set_edge(e, wiggle(u, v))
+        self.assertTrue(self.store.has_edge(e))
+
+    def test_save_load_and_fill(self):
+        client = FakeClient()
+        route = [(0, 0), (0, 1), (1, 1)]
+        self.assertEqual(fill_from_ors(self.store, client, route), 2)
+        self.assertEqual(fill_from_ors(self.store, client, route), 0)
+        self.assertEqual(client.calls, 2)
+        np.testing.assert_allclose(self.store.route_geometry(route)[0], self.G.nodes[route[0]]['pos'], atol=1e-4)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "geom.npz")
+            self.store.save(path)
+            loaded = EdgeGeometryStore.load(self.C, path)
+            self.assertTrue(loaded.covers(route))
+            self.assertEqual(loaded.route_geometry(route), self.store.route_geometry(route))
+
+    def test_failed_edges_are_not_retried_every_dispatch(self):
+        client = FailingClient()
+        route = [(0, 0), (0, 1), (1, 1)]
+        self.assertEqual(fill_from_ors(self.store, client, route), 0)
+        self.assertEqual(fill_from_ors(self.store, client, route), 0)
+        self.assertEqual(client.calls, 2)
+        self.assertEqual(len(self.store.failed), 2)
+        self.assertIsNone(fill_in_background(self.store, client, route))
+        # After the back-off the edges are tried again
+        e = next(iter(self.store.failed))
+        self.assertTrue(self.store.needs_fetch(e, now=self.store.failed[e] + RETRY_FAILED_S + 1))
+
+    def test_background_fill_saves_the_store(self):
+        route = [(0, 0), (0, 1), (1, 1), (1, 2)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "geom.npz")
+            thread = fill_in_background(self.store, FakeClient(), route, save_to=path)
+            # Straight segments are drawn while the fill runs
+            self.assertGreaterEqual(len(self.store.route_geometry(route)), len(route))
+            thread.join(5)
+            self.assertTrue(self.store.covers(route))
+            self.assertTrue(EdgeGeometryStore.load(self.C, path).covers(route))
+            self.assertIsNone(fill_in_background(self.store, FakeClient(), route))
+
+    def test_path_survives_weight_refresh(self):
+        refreshed = CSRGraph(self.C.names, self.C.pos, self.C.edge_u, self.C.edge_v, self.C.weight * 2,
+                             self.C.distance, self.C.base_weight * 2)
+        self.assertEqual(geometry_path(refreshed), geometry_path(self.C))
+        moved = CSRGraph(self.C.names, self.C.pos + 0.001, self.C.edge_u, self.C.edge_v, self.C.weight,
+                         self.C.distance, self.C.base_weight)
+        self.assertNotEqual(geometry_path(moved), geometry_path(self.C))
+
+    def test_get_geometry_store_is_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIs(get_geometry_store(self.G, tmp), get_geometry_store(self.G, tmp))
+
+if __name__ == '__main__':
+    unittest.main()
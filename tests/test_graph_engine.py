@@ -0,0 +1,46 @@
+import unittest
+import sys
+import os
+import networkx as nx
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.city_graph import create_city_graph
+from backend.graph_engine import CSRGraph
+from backend.traffic_model import predict_traffic
+from backend.classical_solver import solve_classical
+
+class TestCSRGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.G = create_city_graph("Vijayawada")
+        self.C = CSRGraph.from_networkx(self.G)
+
+    def test_shape(self):
+        self.assertEqual(self.C.number_of_nodes(), self.G.number_of_nodes())
+        self.assertEqual(self.C.number_of_edges(), self.G.number_of_edges())
+        self.assertEqual(len(self.C.indices), 2 * self.G.number_of_edges())
+        self.assertEqual(self.C.indptr[-1], len(self.C.indices))
+
+    def test_neighbors_match_networkx(self):
+        for name in self.G.nodes():
+            nbrs, eids = self.C.neighbors(self.C.node_id(name))
+            self.assertEqual({self.C.node_name(i) for i in nbrs}, set(self.G.neighbors(name)))
+            for j, e in zip(nbrs, eids):
+                self.assertEqual(self.C.weight[e], self.G[name][self.C.node_name(j)]['weight'])
+
+    def test_round_trip_is_lossless(self):
+        H, _ = predict_traffic(self.G, "Ambulance")
+        back = CSRGraph.from_networkx(H).to_networkx()
+        self.assertTrue(nx.utils.nodes_equal(back.nodes(data=True), H.nodes(data=True)))
+        self.assertTrue(nx.utils.edges_equal(back.edges(data=True), H.edges(data=True)))
+
+    def test_solvers_accept_csr(self):
+        res = solve_classical(self.C, "Benz Circle", "Bhavani Island")
+        expected = solve_classical(self.G, "Benz Circle", "Bhavani Island")
+        self.assertEqual(res["path"], expected["path"])
+        self.assertEqual(self.C.path_cost(res["path"])[0], expected["eta"])
+
+if __name__ == '__main__':
+    unittest.main()
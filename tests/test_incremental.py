@@ -0,0 +1,111 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.traffic_model import predict_traffic_weights, get_traffic_engine, TrafficPrediction
+from backend.classical_solver import solve_classical
+from backend.incremental import MissionRouter
+from tests.test_routing import grid_city
+
+class TestIncrementalRerouting(unittest.TestCase):
+
+    def setUp(self):
+        self.G = grid_city(15)
+        self.names = list(self.G.nodes())
+        engine = get_traffic_engine(self.G)
+        self.pace = MissionRouter.pace_for(engine.graph, engine.lower_bound("Ambulance"))
+        # Exact repairs: every weight change is applied, so routes match full queries
+        self.router = MissionRouter(self.G, pace=self.pace, by_status=False)
+
+    def assertMatchesStatic(self, route, pred, source, target):
+        static = solve_classical(pred, source, target)
+        self.assertAlmostEqual(route["eta"], static["eta"], places=2)
+        self.assertEqual(route["path"][0], source)
+        self.assertEqual(route["path"][-1], target)
+
+    def test_repairs_match_full_queries(self):
+        s, t = self.names[0], self.names[-1]
+        pred = predict_traffic_weights(self.G, "Ambulance", minute=10)
+        self.assertMatchesStatic(self.router.start("m1", s, t, pred), pred, s, t)
+        for minute in (11, 12, 13):
+            pred = predict_traffic_weights(self.G, "Ambulance", minute=minute)
+            self.assertMatchesStatic(self.router.reroute("m1", pred), pred, s, t)
+
+    def test_missions_are_bounded(self):
+        router = MissionRouter(self.G, max_missions=3)
+        pred = predict_traffic_weights(self.G, "Ambulance", minute=10)
+        for k in range(3):
+            router.start(f"m{k}", self.names[k], self.names[-1], pred)
+        router.reroute("m0", pred)  # m0 is now the most recently used
+        router.start("m3", self.names[3], self.names[-1], pred)
+        self.assertEqual(list(router.missions), ["m2", "m0", "m3"])
+
+    def test_local_change_is_cheap(self):
+        s, t = self.names[3], self.names[-5]
+        pred = predict_traffic_weights(self.G, "Ambulance", minute=20)
+        route = self.router.start("m1", s, t, pred)
+        full = self.router.missions["m1"].expanded
+        # Jam one edge on the current route
+        weights = pred.weight.copy()
+        C = self.router.graph
+        e = C.edge_id(C.node_id(route["path"][2]), C.node_id(route["path"][3]))
+        weights[e] *= 10
+        search = self.router.missions["m1"]
+        changed, repaired = search.update_weights(weights)
+        self.assertEqual(changed, 1)
+        self.assertLess(repaired, full)
+        static = solve_classical(C.with_weights(weights), s, t)
+        self.assertAlmostEqual(self.router.reroute("m1", weights)["eta"], static["eta"], places=2)
+        self.assertEqual(search.update_weights(weights), (0, 0))
+
+    def test_tolerance_ignores_jitter(self):
+        s, t = self.names[0], self.names[-1]
+        pred = predict_traffic_weights(self.G, "Ambulance", minute=40)
+        self.router.start("m1", s, t, pred)
+        search = self.router.missions["m1"]
+        self.assertEqual(search.update_weights(pred.weight * 1.05, tolerance=0.1), (0, 0))
+        changed, _ = search.update_weights(pred.weight * 1.2, tolerance=0.1)
+        self.assertEqual(changed, len(pred.weight))
+
+    def test_status_changes_bound_the_repair(self):
+        router = MissionRouter(self.G, pace=self.pace)
+        s, t = self.names[3], self.names[-5]
+        pred = predict_traffic_weights(self.G, "Custom", minute=60)
+        route = router.start("m1", s, t, pred)
+        search = router.missions["m1"]
+        full = search.expanded
+        # Next minute: every edge is re-noised but only one on the route changes status
+        C = router.graph
+        e = C.edge_id(C.node_id(route["path"][2]), C.node_id(route["path"][3]))
+        rng = np.random.default_rng(0)
+        ratio = pred.ratio.copy()
+        ratio[e] = 2.5
+        weight = pred.weight * rng.uniform(0.95, 1.05, len(pred.weight))
+        weight[e] = pred.weight[e] * 10
+        jammed = TrafficPrediction(C, "Custom", pred.seed + 1, weight, ratio)
+        before = search.expanded
+        route = router.reroute("m1", jammed)
+        np.testing.assert_array_equal(np.flatnonzero(search.weights != pred.weight), [e])
+        self.assertLess(search.expanded - before, full)
+        # Planned around the jam, priced on the latest weights
+        eids = [C.edge_id(C.node_id(u), C.node_id(v)) for u, v in zip(route["path"][:-1], route["path"][1:])]
+        self.assertNotIn(e, eids)
+        self.assertAlmostEqual(route["eta"], float(weight[eids].sum()), places=2)
+
+    def test_moving_vehicle(self):
+        s, t = self.names[0], self.names[-1]
+        pred = predict_traffic_weights(self.G, "Ambulance", minute=30)
+        route = self.router.start("m1", s, t, pred)
+        here = route["path"][4]
+        pred = predict_traffic_weights(self.G, "Ambulance", minute=31)
+        self.assertMatchesStatic(self.router.reroute("m1", pred, position=here), pred, here, t)
+        self.router.end("m1")
+        self.assertEqual(self.router.missions, {})
+
+if __name__ == '__main__':
+    unittest.main()
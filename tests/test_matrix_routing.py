@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+import random
+
+import networkx as nx
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.contraction import ContractionHierarchy
+from backend.location_services import LocationServices
+from backend.matrix_routing import travel_time_matrix, assign_nearest_units
+from backend.city_graph import create_city_graph
+from tests.test_routing import grid_city
+
+class TestTravelTimeMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.G = grid_city(10)
+        rng = random.Random(11)
+        nodes = list(self.G.nodes())
+        self.sources = rng.sample(nodes, 6)
+        self.targets = rng.sample(nodes, 5)
+        self.expected = np.array([[nx.dijkstra_path_length(self.G, s, t, weight='weight') for t in self.targets]
+                                  for s in self.sources])
+
+    def test_dijkstra_strategy(self):
+        M = travel_time_matrix(self.sources, self.targets, self.G)
+        np.testing.assert_allclose(M, self.expected)
+
+    def test_bucket_strategy(self):
+        M = travel_time_matrix(self.sources, self.targets, self.G, ch=ContractionHierarchy(self.G))
+        np.testing.assert_allclose(M, self.expected)
+
+    def test_coordinates_snap_with_access_leg(self):
+        G = create_city_graph()
+        near_benz = (16.5010, 80.6540)
+        M = travel_time_matrix([near_benz], ["Benz Circle", "PVP Square"], G)
+        self.assertGreater(M[0, 0], 0)
+        self.assertLess(M[0, 0], 1.0)
+        self.assertAlmostEqual(M[0, 1] - M[0, 0], G["Benz Circle"]["PVP Square"]["weight"])
+
+    def test_fleet_dispatch(self):
+        loc = LocationServices()
+        assets = loc.track_assets()
+        G = create_city_graph()
+        M = loc.dispatch_matrix(assets, list(G.nodes()), G)
+        self.assertEqual(M.shape, (len(assets), G.number_of_nodes()))
+        best, eta = assign_nearest_units(M)
+        np.testing.assert_array_equal(eta, M.min(axis=0))
+
+if __name__ == '__main__':
+    unittest.main()
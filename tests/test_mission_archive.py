@@ -0,0 +1,138 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+from sqlalchemy import text
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.database import (RouteTrace, create_tuned_engine, migrate, write_missions, _mission_row,
+                              mission_rollups)
+from backend import mission_archive
+from backend.mission_archive import (RetentionPolicy, archive_missions, compact_partitions, query_missions,
+                                     partitions_for)
+
+class TestMissionArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.tmp.name, "archive")
+        self.engine = create_tuned_engine(f"sqlite:///{os.path.join(self.tmp.name, 'history.db')}")
+        migrate(self.engine)
+        rows, self.times = [], []
+        # One mission every 3 days from mid-June to mid-October
+        t = datetime(2026, 6, 15, 8)
+        while t < datetime(2026, 10, 15):
+            row = _mission_row("Vijayawada", "Ambulance", "s", "d", 12.0, 10.0, 4.0, 8)
+            row["timestamp"] = t
+            rows.append(row)
+            self.times.append(t)
+            t += timedelta(days=3)
+        write_missions(rows, self.engine)
+        # One route trace per mission, linked by timestamp
+        traces = [{"timestamp": t, "city": "Vijayawada", "emergency_type": "Ambulance", "solver": "classical",
+                   "graph_version": "v", "n_nodes": 2, "path": b"\x00\x02", "weights": b"\x00" * 4}
+                  for t in self.times]
+        write_missions(traces, self.engine, table=RouteTrace.__table__)
+        self.total = len(rows)
+        self.now = datetime(2026, 10, 16)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def expected(self, start, end):
+        return sum(start <= t < end for t in self.times)
+
+    def hot_count(self, table="missions"):
+        with self.engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+    def archived_count(self, table="missions"):
+        total = 0
+        for name in os.listdir(self.archive):
+            if not name.endswith(".db"):
+                continue  # WAL / shared-memory side files
+            part = mission_archive.sqlite3.connect(os.path.join(self.archive, name))
+            total += part.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            part.close()
+        return total
+
+    def test_policy_archives_by_month_and_compacts(self):
+        result = RetentionPolicy(hot_days=30, compact_after_days=62, directory=self.archive).apply(
+            self.now, self.engine)
+        moved = result["archived"]
+        self.assertEqual(sorted(os.path.basename(p) for p in moved),
+                         ["missions_2026_06.db", "missions_2026_07.db", "missions_2026_08.db",
+                          "missions_2026_09.db"])
+        self.assertEqual(self.hot_count() + sum(moved.values()), self.total)
+        # Nothing in the hot table is older than 30 days
+        self.assertEqual(self.hot_count(), self.expected(self.now - timedelta(days=30), self.now))
+        start = datetime(2026, 9, 10)
+        cols = query_missions(start, self.now, bind=self.engine, directory=self.archive)
+        self.assertEqual(len(cols["id"]), self.expected(start, self.now))
+        # Months that ended more than 62 days ago are sealed
+        self.assertEqual(sorted(os.path.basename(p) for p in result["compacted"]),
+                         ["missions_2026_06.db", "missions_2026_07.db"])
+        self.assertEqual(compact_partitions(self.now - timedelta(days=62), self.archive), [])
+        # Rollups still cover the whole history
+        self.assertEqual(int(mission_rollups(by=(), bind=self.engine)["missions"][0]), self.total)
+        # Route traces follow their missions into the same partitions
+        self.assertEqual(self.hot_count("route_traces"), self.hot_count())
+        self.assertEqual(self.archived_count("route_traces"), sum(moved.values()))
+        # Re-running moves nothing
+        self.assertEqual(archive_missions(self.now - timedelta(days=30), self.engine, self.archive), {})
+
+    def test_interrupted_move_is_retried_safely(self):
+        # State after a crash between the partition commit and the hot delete
+        june, july = datetime(2026, 6, 1), datetime(2026, 7, 1)
+        path = mission_archive.partition_path(june, self.archive)
+        mission_archive._ensure_partition(path)
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT * FROM missions WHERE timestamp < '2026-07'")).fetchall()
+        part = mission_archive.sqlite3.connect(path)
+        part.executemany(f"INSERT INTO missions VALUES ({', '.join('?' * len(rows[0]))})", rows)
+        part.commit()
+        part.close()
+        cols = query_missions(june, july, bind=self.engine, directory=self.archive)
+        self.assertEqual(len(cols["id"]), self.expected(june, july))
+
+        moved = archive_missions(july, self.engine, self.archive)
+        self.assertEqual(moved[path], self.expected(june, july))
+        part = mission_archive.sqlite3.connect(path)
+        self.assertEqual(part.execute("SELECT COUNT(*) FROM missions").fetchone()[0], self.expected(june, july))
+        part.close()
+        self.assertEqual(self.hot_count(), self.total - self.expected(june, july))
+
+    def test_query_fans_out_to_overlapping_partitions_only(self):
+        before = query_missions(datetime(2026, 1, 1), self.now, bind=self.engine, directory=self.archive)
+        RetentionPolicy(directory=self.archive).apply(self.now, self.engine)
+        after = query_missions(datetime(2026, 1, 1), self.now, bind=self.engine, directory=self.archive)
+        np.testing.assert_array_equal(after["id"], before["id"])
+        np.testing.assert_array_equal(after["timestamp"], before["timestamp"])
+        self.assertTrue(np.all(np.diff(after["timestamp"].astype(np.int64)) > 0))
+
+        start, end = datetime(2026, 7, 10), datetime(2026, 8, 5)
+        self.assertEqual([os.path.basename(p) for p in partitions_for(start, end, self.archive)],
+                         ["missions_2026_07.db", "missions_2026_08.db"])
+        opened = []
+        real_connect = mission_archive.sqlite3.connect
+        with mock.patch.object(mission_archive.sqlite3, "connect",
+                               side_effect=lambda p, **kw: opened.append(p) or real_connect(p, **kw)):
+            cols = query_missions(start, end, columns=("id", "time_saved"), bind=self.engine,
+                                  directory=self.archive)
+        self.assertEqual(len(opened), 2)
+        self.assertTrue(np.all(cols["timestamp"] >= np.datetime64(start)))
+        self.assertTrue(np.all(cols["timestamp"] < np.datetime64(end)))
+        self.assertEqual(len(cols["id"]), self.expected(start, end))
+        with self.assertRaises(ValueError):
+            query_missions(start, end, columns=("id", "1 FROM missions; --"), bind=self.engine,
+                           directory=self.archive)
+
+if __name__ == '__main__':
+    unittest.main()
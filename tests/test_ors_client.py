@@ -0,0 +1,113 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.ors_client import ResponseCache, TokenBucket, decode_polyline, get_ors_client
+from backend.location_services import LocationServices
+
+# "_p~iF~ps|U_ulLnnqC_mqNvxq`@" is the reference polyline from Google's docs
+POLYLINE = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+class StubORS(BaseHTTPRequestHandler):
+    requests = []
+
+    def _reply(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        StubORS.requests.append((self.path, json.loads(self.rfile.read(length))))
+        self._reply({"routes": [{"summary": {"distance": 6000.0, "duration": 600.0}, "geometry": POLYLINE}]})
+
+    def do_GET(self):
+        StubORS.requests.append((self.path, None))
+        self._reply({"features": [{"geometry": {"coordinates": [80.648, 16.506]},
+                                   "properties": {"label": "Benz Circle, Vijayawada"}}]})
+
+    def log_message(self, *args):
+        pass
+
+class TestOrsClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("127.0.0.1", 0), StubORS)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.key = "test-key-0123456789"
+        cls.client = get_ors_client(cls.key, cls.base_url,
+                                    cache=ResponseCache(os.path.join(cls.tmp.name, "ors.sqlite")),
+                                    limiter=TokenBucket(rate=1000, capacity=1000))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.client.cache.close()
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        StubORS.requests.clear()
+
+    def test_decode_polyline(self):
+        self.assertEqual(decode_polyline(POLYLINE), [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)])
+
+    def test_route_metrics_hit_network_once(self):
+        loc = LocationServices(ors_key=self.key, base_url=self.base_url)
+        self.assertIs(loc.client, self.client)
+        first = loc.get_route_metrics((16.5062, 80.6480), (16.5180, 80.6200))
+        self.assertEqual(first[:3], (10.0, 6.0, "Low"))
+        self.assertEqual(first[3][0], (38.5, -120.2))
+        # Same trip (within rounding) is answered from the cache
+        second = loc.get_route_metrics((16.5062000001, 80.6480), (16.5180, 80.6200))
+        self.assertEqual(second, first)
+        self.assertEqual(len(StubORS.requests), 1)
+        path, body = StubORS.requests[0]
+        self.assertEqual(path, "/v2/directions/driving-car/json")
+        self.assertEqual(body["coordinates"][0], [80.648, 16.5062])
+
+    def test_geocode_cached_by_normalised_text(self):
+        loc = LocationServices(ors_key=self.key, base_url=self.base_url)
+        self.assertEqual(loc.search_place("Benz  Circle"), (16.506, 80.648, "Benz Circle, Vijayawada"))
+        self.assertEqual(loc.search_place("benz circle"), (16.506, 80.648, "Benz Circle, Vijayawada"))
+        self.assertEqual(len(StubORS.requests), 1)
+        self.assertIn("api_key=", StubORS.requests[0][0])
+
+    def test_cache_ttl(self):
+        now = [0.0]
+        cache = ResponseCache(":memory:", ttl=60, clock=lambda: now[0])
+        cache.put("k", {"a": 1})
+        self.assertEqual(cache.get("k"), {"a": 1})
+        now[0] = 61.0
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.purge(), 1)
+
+    def test_token_bucket(self):
+        now, slept = [0.0], []
+
+        def sleep(dt):
+            slept.append(dt)
+            now[0] += dt
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertFalse(bucket.try_acquire())
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        now[0] += 1.0
+        self.assertTrue(bucket.try_acquire())
+
+if __name__ == '__main__':
+    unittest.main()
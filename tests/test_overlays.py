@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.city_graph import create_city_graph
+from backend.traffic_model import predict_traffic, predict_traffic_weights, get_traffic_engine
+from backend.classical_solver import solve_classical, solve_alternatives, min_minutes_per_km
+from backend.contraction import ContractionHierarchy
+from backend.matrix_routing import travel_time_matrix
+from quantum.qaoa_solver import QAOASolver
+from tests.test_routing import grid_city
+
+class TestWeightOverlays(unittest.TestCase):
+
+    def setUp(self):
+        self.G = create_city_graph()
+
+    def test_overlays_share_topology(self):
+        engine = get_traffic_engine(self.G)
+        amb = predict_traffic_weights(self.G, "Ambulance", minute=77)
+        fire = predict_traffic_weights(self.G, "Fire Brigade", minute=77)
+        self.assertIs(amb.graph, fire.graph)
+        self.assertIs(amb.graph, engine.graph)
+        self.assertIs(amb.nx_graph, self.G)
+        self.assertEqual(amb.nbytes, 8 * len(amb.weight) + 8 * len(amb.ratio) + len(amb.status_code))
+        self.assertIn(("Ambulance", 77), engine.overlays())
+
+    def test_solvers_match_materialised_copy(self):
+        pred = predict_traffic_weights(self.G, "Police Response")
+        G_traffic, _ = predict_traffic(self.G, "Police Response")
+        for algorithm in ("dijkstra", "astar", "bidirectional"):
+            a = solve_classical(pred, "Benz Circle", "PVP Square", algorithm)
+            b = solve_classical(G_traffic, "Benz Circle", "PVP Square", algorithm)
+            self.assertEqual(a["path"], b["path"])
+            self.assertEqual(a["eta"], b["eta"])
+        alt = solve_alternatives(pred, "Benz Circle", "PVP Square", k=2)
+        self.assertEqual([r["path"] for r in alt],
+                         [r["path"] for r in solve_alternatives(G_traffic, "Benz Circle", "PVP Square", k=2)])
+        q = QAOASolver(pred, "Benz Circle", "PVP Square").solve()
+        self.assertEqual(q["path"][0], "Benz Circle")
+
+    def test_pace_is_cached_per_overlay(self):
+        pred = predict_traffic_weights(self.G, "Ambulance", minute=5)
+        G_traffic = pred.to_networkx()
+        wfn = pred.weight_fn()
+        self.assertAlmostEqual(min_minutes_per_km(self.G, wfn), min_minutes_per_km(G_traffic))
+        with mock.patch.object(self.G, "edges", side_effect=AssertionError("edge scan")):
+            self.assertEqual(min_minutes_per_km(self.G, wfn), pred.min_pace())
+
+    def test_ch_and_matrix_accept_overlays(self):
+        G = grid_city(8)
+        ch = ContractionHierarchy(G)
+        pred = predict_traffic_weights(G, "Ambulance", minute=3)
+        G_traffic = pred.to_networkx()
+        names = list(G.nodes())
+        for s, t in ((names[0], names[-1]), (names[5], names[40])):
+            self.assertAlmostEqual(solve_classical(pred, s, t, "ch", ch=ch)["eta"],
+                                   solve_classical(G_traffic, s, t)["eta"])
+        M = travel_time_matrix(names[:4], names[-4:], pred)
+        np.testing.assert_allclose(M, travel_time_matrix(names[:4], names[-4:], G_traffic))
+        np.testing.assert_allclose(travel_time_matrix(names[:4], names[-4:], pred, ch=ch), M)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import unittest
+import sys
+import os
+from functools import reduce
+from unittest import mock
+
+import networkx as nx
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.city_graph import create_city_graph
+from backend.traffic_model import predict_traffic_weights
+from backend.classical_solver import solve_classical
+from quantum.statevector import qubo_diagonal, apply_mixer, qaoa_state, uniform_state, qaoa_batch, expectation
+from quantum.qaoa_solver import QAOASolver, ParameterCache
+from quantum.reduction import reduce_problem
+from tests.test_routing import grid_city
+
+class TestStatevector(unittest.TestCase):
+
+    def test_diagonal_matches_bitstrings(self):
+        rng = np.random.default_rng(3)
+        n = 7
+        linear, quad = rng.normal(size=n), np.triu(rng.normal(size=(n, n)), 1)
+        bits = (np.arange(1 << n)[:, None] >> np.arange(n)) & 1
+        expected = 0.5 + bits @ linear + ((bits @ quad) * bits).sum(axis=1)
+        np.testing.assert_allclose(qubo_diagonal(linear, quad, 0.5), expected)
+
+    def test_mixer_matches_dense_operator(self):
+        n, beta = 5, 0.37
+        rx = np.array([[np.cos(beta), -1j * np.sin(beta)], [-1j * np.sin(beta), np.cos(beta)]])
+        psi = np.random.default_rng(0).normal(size=1 << n) + 0j
+        np.testing.assert_allclose(apply_mixer(psi.copy(), beta, n, block=2), reduce(np.kron, [rx] * n) @ psi)
+
+    def test_twenty_qubits(self):
+        n = 20
+        rng = np.random.default_rng(1)
+        diag = qubo_diagonal(rng.random(n), np.triu(rng.random((n, n)), 1))
+        psi = qaoa_state(diag, n, [0.4], [0.3])
+        self.assertEqual(psi.shape, (1 << n,))
+        self.assertAlmostEqual(float(np.sum(np.abs(psi) ** 2)), 1.0, places=9)
+        self.assertAlmostEqual(abs(uniform_state(n)[0]) ** 2, 1 / (1 << n))
+
+    def test_batch_matches_single_runs_and_gradients(self):
+        rng = np.random.default_rng(5)
+        n, p = 6, 2
+        diag = qubo_diagonal(rng.random(n), np.triu(rng.random((n, n)), 1))
+        gammas, betas = rng.random((7, p)), rng.random((7, p))
+        energy, grad = qaoa_batch(diag, n, gammas, betas, gradient=True, max_amplitudes=3 << n)
+        single = [expectation(qaoa_state(diag, n, g, b), diag) for g, b in zip(gammas, betas)]
+        np.testing.assert_allclose(energy, single)
+        params, eps = np.hstack([gammas, betas]), 1e-6
+        for j in range(2 * p):
+            shift = np.zeros_like(params)
+            shift[:, j] = eps
+            up, _ = qaoa_batch(diag, n, *np.split(params + shift, 2, axis=1))
+            down, _ = qaoa_batch(diag, n, *np.split(params - shift, 2, axis=1))
+            np.testing.assert_allclose(grad[:, j], (up - down) / (2 * eps), atol=1e-6)
+
+class TestReduction(unittest.TestCase):
+
+    def test_chain_and_dead_end_collapse(self):
+        G = nx.Graph()
+        for i, name in enumerate("sabtxy"):
+            G.add_node(name, pos=(16.5, 80.6 + 0.01 * i))
+        G.add_edge("s", "a", weight=1, distance=1)
+        G.add_edge("a", "b", weight=1, distance=1)
+        G.add_edge("b", "t", weight=1, distance=1)
+        G.add_edge("a", "x", weight=0.1, distance=0.1)  # dead end
+        G.add_edge("s", "y", weight=9, distance=9)      # outside the ellipse
+        G.add_edge("y", "t", weight=9, distance=9)
+        problem = reduce_problem(G, "s", "t")
+        self.assertEqual(list(problem.graph.edges()), [("s", "t")])
+        self.assertEqual(problem.expand(["s", "t"]), ["s", "a", "b", "t"])
+        self.assertEqual(problem.expand(["t", "s"]), ["t", "b", "a", "s"])
+
+    def test_reduction_preserves_shortest_route(self):
+        G = grid_city(12)
+        names = list(G.nodes())
+        for s, t in ((names[13], names[-14]), (names[0], names[29])):
+            problem = reduce_problem(G, s, t)
+            self.assertLess(problem.stats["reduced_edges"], G.number_of_edges())
+            path = nx.dijkstra_path(problem.graph, s, t)
+            full = problem.expand(path)
+            self.assertAlmostEqual(sum(G[u][v]["weight"] for u, v in zip(full[:-1], full[1:])),
+                                   nx.dijkstra_path_length(G, s, t))
+            forward = set(problem.arcs())
+            self.assertTrue(all(arc in forward for arc in zip(path[:-1], path[1:])))
+
+class TestQAOASolver(unittest.TestCase):
+
+    def test_route_on_traffic_overlay(self):
+        G = create_city_graph()
+        pred = predict_traffic_weights(G, "Ambulance", minute=9)
+        solver = QAOASolver(pred, "Benz Circle", "Bus Station")
+        n = solver.calculate_qubits()
+        self.assertEqual(n, len(solver.qubits))
+        res = solver.solve()
+        self.assertEqual(res["qubits"], n)
+        self.assertEqual(res["depth"], len(solver.circuit))
+        self.assertEqual(res["path"][0], "Benz Circle")
+        self.assertEqual(res["path"][-1], "Bus Station")
+        for u, v in zip(res["path"][:-1], res["path"][1:]):
+            self.assertTrue(G.has_edge(u, v))
+        self.assertGreaterEqual(res["eta"], solve_classical(pred, "Benz Circle", "Bus Station")["eta"] - 1e-6)
+
+    def test_ground_state_is_best_route(self):
+        G = grid_city(6)
+        names = list(G.nodes())
+        solver = QAOASolver(G, names[0], names[-1], max_qubits=16)
+        solver.calculate_qubits()
+        ground = int(np.argmin(solver.qubo.diagonal()))
+        path = solver.decode(ground)
+        self.assertIsNotNone(path)
+        best = min(solver._route_cost(c) for c in solver.candidates)
+        self.assertLessEqual(solver._route_cost(path), best + 1e-9)
+
+    def test_candidate_encoding_when_segments_do_not_fit(self):
+        G = grid_city(6)
+        names = list(G.nodes())
+        solver = QAOASolver(G, names[0], names[-1], max_qubits=4, reduce_graph=False)
+        self.assertEqual(solver.calculate_qubits(), len(solver.candidates))
+        self.assertEqual(solver.qubo.encoding, "routes")
+        self.assertIn(solver.solve()["path"], [list(c) for c in solver.candidates])
+
+    def test_reduction_errors_are_not_swallowed(self):
+        G = grid_city(6)
+        names = list(G.nodes())
+        with mock.patch("quantum.qaoa_solver.reduce_problem", side_effect=ValueError("not in list")):
+            solver = QAOASolver(G, names[0], names[-1])
+            self.assertIsNone(solver.reduce())
+        with mock.patch("quantum.qaoa_solver.reduce_problem", side_effect=KeyError("bug")):
+            with self.assertRaises(KeyError):
+                QAOASolver(G, names[0], names[-1]).reduce()
+
+    def test_reduction_fits_simulator(self):
+        G = grid_city(12)
+        names = list(G.nodes())
+        solver = QAOASolver(G, names[13], names[-14])
+        n = solver.calculate_qubits()
+        self.assertLessEqual(n, solver.max_qubits)
+        self.assertGreater(solver.reduction["edges"], 3 * n)
+        self.assertEqual(solver.reduction["qubits"], n)
+
+    def test_warm_start_cache(self):
+        cache = ParameterCache()
+        cache.store(("segments", 8, 2, (3, 2, 2)), [0.1, 0.2, 0.3, 0.4], 1.0)
+        self.assertEqual(len(cache.lookup(("segments", 8, 2, (3, 2, 2)))), 1)
+        self.assertEqual(len(cache.lookup(("segments", 9, 2, (3, 3, 2)))), 1)
+        self.assertEqual(cache.lookup(("routes", 8, 2, (3, 2, 2))), [])
+        self.assertEqual(cache.lookup(("segments", 8, 1, (3, 2, 2))), [])
+
+        G = grid_city(6)
+        names = list(G.nodes())
+        cache = ParameterCache()
+        QAOASolver(G, names[0], names[-1], max_qubits=12, warm_start=cache).solve()
+        self.assertEqual((len(cache), cache.hits, cache.misses), (1, 0, 1))
+        QAOASolver(G, names[1], names[-2], max_qubits=12, warm_start=cache).solve()
+        self.assertEqual(cache.hits, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.road_importer import import_road_network, load_cached_graph
+
+OSM_XML = """<?xml version='1.0' encoding='UTF-8'?>
+<osm version="0.6">
+  <node id="1" lat="16.5000" lon="80.6500"><tag k="highway" v="traffic_signals"/></node>
+  <node id="2" lat="16.5010" lon="80.6510"/>
+  <node id="3" lat="16.5020" lon="80.6520"/>
+  <node id="4" lat="16.5030" lon="80.6400"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/><tag k="highway" v="primary"/></way>
+  <way id="11"><nd ref="3"/><nd ref="4"/><tag k="highway" v="residential"/><tag k="maxspeed" v="20"/></way>
+  <way id="12"><nd ref="1"/><nd ref="4"/><tag k="building" v="yes"/></way>
+</osm>
+"""
+
+class TestRoadImporter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cache = os.path.join(self.tmp, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_osm_xml_import(self):
+        path = self._write("city.osm", OSM_XML)
+        C = import_road_network(path, "Testville", cache_dir=self.cache)
+        self.assertEqual(C.number_of_nodes(), 4)
+        self.assertEqual(C.number_of_edges(), 3)  # building way is skipped
+        self.assertFalse(C.weight.flags.writeable)  # read-only memory map
+        # residential segment is capped at its 20 km/h maxspeed
+        e = C.edge_id(C.node_id("3"), C.node_id("4"))
+        self.assertAlmostEqual(C.weight[e], round(C.distance[e] / 20 * 60, 2), delta=0.02)
+
+    def test_short_segments_keep_a_positive_cost(self):
+        path = self._write("short.osm", """<?xml version='1.0' encoding='UTF-8'?>
+<osm version="0.6">
+  <node id="1" lat="16.500000" lon="80.650000"/>
+  <node id="2" lat="16.500005" lon="80.650005"/>
+  <node id="3" lat="16.510000" lon="80.660000"/>
+  <node id="9" lat="16.600000" lon="80.700000"><tag k="amenity" v="bench"/></node>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/><tag k="highway" v="motorway"/></way>
+</osm>
+""")
+        C = import_road_network(path, "Shortville", cache_dir=self.cache)
+        self.assertEqual(C.names, ["1", "2", "3"])  # node 9 is on no road
+        e = C.edge_id(C.node_id("1"), C.node_id("2"))
+        self.assertLess(C.distance[e], 0.005)
+        self.assertGreater(C.weight[e], 0)
+        self.assertGreater(C.base_weight[e], 0)
+
+    def test_csv_import_and_reload(self):
+        nodes = self._write("nodes.csv", "id,lat,lon,name\na,16.50,80.65,Alpha\nb,16.51,80.66,Beta\nc,16.52,80.64,Gamma\n")
+        edges = self._write("edges.csv", "source,target,weight\na,b,4\nb,c,6\nb,a,9\n")
+        C = import_road_network(nodes, "CsvTown", edges_path=edges, cache_dir=self.cache)
+        self.assertEqual(C.number_of_edges(), 2)  # parallel a-b collapsed to fastest
+        self.assertEqual(C.path_cost(["Alpha", "Beta", "Gamma"])[0], 10.0)
+
+        again = load_cached_graph("CsvTown", cache_dir=self.cache)
+        self.assertEqual(again.names, C.names)
+        np.testing.assert_array_equal(again.weight, C.weight)
+
+    def test_geojson_import(self):
+        fc = {"type": "FeatureCollection", "features": [
+            {"type": "Feature", "properties": {"highway": "secondary"},
+             "geometry": {"type": "LineString", "coordinates": [[80.65, 16.50], [80.66, 16.51]]}},
+            {"type": "Feature", "properties": {},
+             "geometry": {"type": "LineString", "coordinates": [[80.66, 16.51], [80.67, 16.50]]}},
+        ]}
+        path = self._write("roads.geojson", json.dumps(fc))
+        C = import_road_network(path, "GeoTown", cache_dir=self.cache)
+        self.assertEqual(C.number_of_nodes(), 3)
+        self.assertEqual(C.number_of_edges(), 2)
+
+    def test_cache_invalidated_on_source_change(self):
+        path = self._write("city.osm", OSM_XML)
+        import_road_network(path, "Testville", cache_dir=self.cache)
+        self._write("city.osm", OSM_XML.replace('<way id="12"><nd ref="1"/><nd ref="4"/><tag k="building" v="yes"/>',
+                                                '<way id="12"><nd ref="1"/><nd ref="4"/><tag k="highway" v="service"/>'))
+        C = load_cached_graph("Testville", cache_dir=self.cache)
+        self.assertEqual(C.number_of_edges(), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.traffic_model import predict_traffic_weights
+from backend.graph_engine import CSRGraph
+from backend.route_cache import RouteCache, route_key, graph_version, cached_solve_classical, cached_qaoa_solve
+from tests.test_routing import grid_city
+
+class TestRouteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.G = grid_city(8)
+        self.minute = [1000]
+        self.cache = RouteCache(maxsize=4, clock=lambda: self.minute[0])
+
+    def test_repeat_solve_is_a_hit(self):
+        pred = predict_traffic_weights(self.G, "Ambulance", minute=1000)
+        first = cached_solve_classical(pred, (0, 0), (7, 7), cache=self.cache)
+        with mock.patch("backend.route_cache.solve_classical") as solve:
+            second = cached_solve_classical(pred, (0, 0), (7, 7), cache=self.cache)
+            solve.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_key_separates_minutes_types_and_graphs(self):
+        a = predict_traffic_weights(self.G, "Ambulance", minute=1000)
+        keys = {
+            route_key(a, (0, 0), (7, 7), "classical"),
+            route_key(predict_traffic_weights(self.G, "Ambulance", minute=1001), (0, 0), (7, 7), "classical"),
+            route_key(predict_traffic_weights(self.G, "Police Response", minute=1000), (0, 0), (7, 7), "classical"),
+            route_key(a, (0, 0), (7, 7), "qaoa"),
+            route_key(predict_traffic_weights(grid_city(8, seed=3), "Ambulance", minute=1000),
+                      (0, 0), (7, 7), "classical"),
+        }
+        self.assertEqual(len(keys), 5)
+        self.assertIsNone(route_key(self.G, (0, 0), (7, 7), "classical"))
+        # Same road network loaded twice shares a version
+        self.assertEqual(graph_version(CSRGraph.from_networkx(self.G)), graph_version(a))
+
+    def test_minute_rollover_expires_entries(self):
+        self.cache.put("k", {"eta": 1.0})
+        self.assertEqual(self.cache.get("k"), {"eta": 1.0})
+        self.minute[0] += 1
+        self.assertIsNone(self.cache.get("k"))
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+
+    def test_lru_eviction(self):
+        for i in range(6):
+            self.cache.put(i, {"eta": i})
+        self.assertEqual(len(self.cache), 4)
+        self.assertIsNone(self.cache.get(0))
+        self.assertEqual(self.cache.get(5), {"eta": 5})
+        self.assertEqual(self.cache.stats()["evictions"], 2)
+
+    def test_qaoa_results_are_cached(self):
+        pred = predict_traffic_weights(self.G, "Ambulance", minute=1000)
+        first = cached_qaoa_solve(pred, (0, 0), (3, 3), cache=self.cache)
+        self.assertEqual(cached_qaoa_solve(pred, (0, 0), (3, 3), cache=self.cache)["path"], first["path"])
+        self.assertEqual(self.cache.hits, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.classical_solver import solve_classical
+from backend.graph_engine import CSRGraph, WeightOverlay
+from backend.database import MissionWriter, RouteTrace, _mission_row, create_tuned_engine, migrate
+from backend.route_cache import graph_version, topology_version
+from backend.route_traces import (encode_path, decode_path, encode_varints, decode_varints, decode_traces,
+                                  decode_weights, edge_ids, edge_usage, trace_row, load_traces)
+from backend.traffic_model import predict_traffic_weights
+from tests.test_routing import grid_city
+
+class TestPathEncoding(unittest.TestCase):
+
+    def test_varint_round_trip(self):
+        values = np.array([0, 1, 127, 128, 300, 2 ** 32, 2 ** 63 - 1], dtype=np.uint64)
+        data = encode_varints(values)
+        self.assertEqual(encode_varints([0, 127, 128]), b"\x00\x7f\x80\x01")
+        np.testing.assert_array_equal(decode_varints(data), values)
+
+    def test_path_round_trip(self):
+        for path in ([], [5], [0, 0], [10, 11, 3, 900000, 2 ** 40, 7]):
+            np.testing.assert_array_equal(decode_path(encode_path(path)), path)
+
+    def test_neighbouring_ids_are_compact(self):
+        path = np.arange(1000, 1100)
+        self.assertEqual(len(encode_path(path)), 2 + 99)
+
+    def test_bulk_decode_matches_single(self):
+        rng = np.random.default_rng(0)
+        paths = [rng.integers(0, 5000, rng.integers(0, 40)) for _ in range(3000)]
+        weights = [rng.random(max(len(p) - 1, 0)).astype(np.float32) for p in paths]
+        nodes, offsets, w, w_offsets = decode_traces([encode_path(p) for p in paths],
+                                                     [x.tobytes() for x in weights])
+        self.assertEqual(len(offsets), len(paths) + 1)
+        for i in (0, 1, 17, 1500, 2999):
+            np.testing.assert_array_equal(nodes[offsets[i]:offsets[i + 1]], paths[i])
+            np.testing.assert_array_equal(w[w_offsets[i]:w_offsets[i + 1]], weights[i])
+        nodes, offsets = decode_traces([])
+        self.assertEqual(len(nodes), 0)
+        np.testing.assert_array_equal(offsets, [0])
+
+class TestRouteTraces(unittest.TestCase):
+
+    def setUp(self):
+        self.G = grid_city(8)
+        self.pred = predict_traffic_weights(self.G, "Ambulance", minute=1000)
+        self.C = self.pred.graph
+        self.route = solve_classical(self.pred, (0, 0), (7, 7))["path"]
+
+    def test_edge_ids_match_scalar_lookup(self):
+        u, v = self.C.edge_u, self.C.edge_v
+        np.testing.assert_array_equal(edge_ids(self.C, u, v), np.arange(self.C.number_of_edges()))
+        np.testing.assert_array_equal(edge_ids(self.C, v, u), np.arange(self.C.number_of_edges()))
+        a, b = self.C.node_id((0, 0)), self.C.node_id((7, 7))
+        self.assertEqual(edge_ids(self.C, [a], [b])[0], -1)
+
+    def test_row_stores_dispatch_weights(self):
+        row = trace_row(self.pred, self.route, "classical", "Vijayawada", "Ambulance")
+        ids = decode_path(row["path"])
+        self.assertEqual([self.C.node_name(i) for i in ids], list(self.route))
+        self.assertEqual(row["graph_version"], topology_version(self.C))
+        # A weight refresh keeps the version, so traces do not split across it
+        refreshed = CSRGraph(self.C.names, self.C.pos, self.C.edge_u, self.C.edge_v, self.C.weight * 2,
+                             self.C.distance, self.C.base_weight * 2)
+        self.assertNotEqual(graph_version(refreshed), graph_version(self.C))
+        self.assertEqual(trace_row(WeightOverlay(refreshed, refreshed.weight), self.route, "classical",
+                                   "Vijayawada", "Ambulance")["graph_version"], row["graph_version"])
+        self.assertEqual(row["n_nodes"], len(self.route))
+        cost, _ = self.C.path_cost(self.route, self.pred.weight)
+        self.assertAlmostEqual(float(decode_weights(row["weights"]).sum()), cost, places=2)
+
+    def test_edge_usage_counts_hops(self):
+        paths = [self.route, self.route, list(reversed(self.route))[:3]]
+        blobs = [encode_path([self.C.node_id(n) for n in p]) for p in paths]
+        nodes, offsets = decode_traces(blobs)
+        usage = edge_usage(self.C, nodes, offsets)
+        self.assertEqual(usage.sum(), 2 * (len(self.route) - 1) + 2)
+        first = edge_ids(self.C, [self.C.node_id(self.route[0])], [self.C.node_id(self.route[1])])[0]
+        self.assertEqual(usage[first], 2)
+
+    def test_writer_stores_traces_with_missions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            eng = create_tuned_engine(f"sqlite:///{os.path.join(tmp, 'history.db')}")
+            migrate(eng)
+            writer = MissionWriter(bind=eng, batch_size=50, flush_ms=50)
+            start = datetime(2026, 10, 16, 12, 0)
+            for i in range(20):
+                ts = start + timedelta(minutes=i)
+                writer.submit(_mission_row("Vijayawada", "Ambulance", "s", "d", 12.0, 10.0, 4.0, 9, ts))
+                row = trace_row(self.pred, self.route, "classical", "Vijayawada", "Ambulance", ts)
+                writer.submit(row, table=RouteTrace.__table__)
+            writer.close()
+
+            cols = load_traces(topology_version(self.C), bind=eng)
+            self.assertEqual(len(cols["id"]), 20)
+            nodes, offsets, weights, _ = decode_traces(cols["path"], cols["weights"])
+            self.assertEqual(len(weights), 20 * (len(self.route) - 1))
+            usage = edge_usage(self.C, nodes, offsets)
+            self.assertEqual(usage.max(), 20)
+            later = load_traces(since=start + timedelta(minutes=15), bind=eng)
+            self.assertEqual(len(later["id"]), 5)
+            with eng.connect() as conn:
+                joined = conn.execute(text("SELECT COUNT(*) FROM missions m JOIN route_traces t "
+                                           "ON t.city = m.city AND t.timestamp = m.timestamp")).scalar()
+            self.assertEqual(joined, 20)
+            eng.dispose()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import sys
+import os
+import random
+
+import networkx as nx
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.city_graph import create_city_graph
+from backend.traffic_model import predict_traffic
+from backend.classical_solver import solve_classical, solve_alternatives, shortest_path, ALGORITHMS
+from backend.geodesy import haversine_km
+
+def grid_city(n=12, seed=7):
+    """
+    n x n street grid around Vijayawada with random travel times >= the
+    straight-line time at 60 km/h.
+    """
+    rng = random.Random(seed)
+    G = nx.Graph()
+    for i in range(n):
+        for j in range(n):
+            G.add_node((i, j), pos=(16.45 + i * 0.005, 80.60 + j * 0.005))
+    for i in range(n):
+        for j in range(n):
+            for di, dj in ((1, 0), (0, 1)):
+                if i + di < n and j + dj < n:
+                    u, v = (i, j), (i + di, j + dj)
+                    d = float(haversine_km(*G.nodes[u]['pos'], *G.nodes[v]['pos']))
+                    w = round(d * rng.uniform(1.0, 4.0), 3)
+                    G.add_edge(u, v, weight=w, distance=round(d, 3), base_weight=w)
+    return G
+
+class TestRoutingAlgorithms(unittest.TestCase):
+
+    def test_all_modes_match_networkx(self):
+        G = grid_city()
+        rng = random.Random(1)
+        nodes = list(G.nodes())
+        for _ in range(20):
+            s, t = rng.sample(nodes, 2)
+            expected = nx.dijkstra_path_length(G, s, t, weight='weight')
+            for algo in ALGORITHMS:
+                path, cost, settled = shortest_path(G, s, t, algo)
+                self.assertAlmostEqual(cost, expected, places=6, msg=algo)
+                self.assertEqual((path[0], path[-1]), (s, t))
+                self.assertLessEqual(settled, G.number_of_nodes())
+
+    def test_astar_settles_fewer_nodes(self):
+        G = grid_city()
+        _, _, dijkstra_settled = shortest_path(G, (0, 0), (11, 11), "dijkstra")
+        _, _, astar_settled = shortest_path(G, (0, 0), (11, 11), "astar")
+        self.assertLessEqual(astar_settled, dijkstra_settled)
+
+    def test_solve_classical_modes_on_traffic_graph(self):
+        for e_type in ("Ambulance", "Organ Transport", "Fire Brigade"):
+            H, _ = predict_traffic(create_city_graph(), e_type)
+            etas = set()
+            for algo in ALGORITHMS:
+                res = solve_classical(H, "Bhavani Island", "Airport (Gannavaram)", algorithm=algo)
+                self.assertEqual(res["algorithm"], algo)
+                self.assertGreater(res["nodes_settled"], 0)
+                etas.add(res["eta"])
+            self.assertEqual(len(etas), 1)
+
+    def test_default_mode_is_single_query(self):
+        res = solve_classical(create_city_graph(), "Benz Circle", "Bhavani Island")
+        self.assertEqual(res["algorithm"], "dijkstra")
+        self.assertIsNotNone(res["nodes_settled"])
+
+    def test_alternatives_are_diverse(self):
+        G = grid_city()
+        best = nx.dijkstra_path_length(G, (0, 0), (11, 11), weight='weight')
+        routes = solve_alternatives(G, (0, 0), (11, 11), k=3, max_overlap=0.5)
+        self.assertEqual(len(routes), 3)
+        self.assertAlmostEqual(routes[0]["eta"], round(best, 2), places=2)
+        edge_sets = [{frozenset(e) for e in zip(r["path"][:-1], r["path"][1:])} for r in routes]
+        for i, r in enumerate(routes):
+            path_w = [G[u][v]['weight'] for u, v in zip(r["path"][:-1], r["path"][1:])]
+            for j, other in enumerate(edge_sets):
+                if i != j:
+                    shared = sum(w for e, w in zip(zip(r["path"][:-1], r["path"][1:]), path_w) if frozenset(e) in other)
+                    self.assertLessEqual(shared / sum(path_w), 0.5 + 1e-9)
+
+    def test_unreachable_returns_none(self):
+        G = grid_city(3)
+        G.add_node("island", pos=(16.0, 80.0))
+        for algo in ALGORITHMS:
+            self.assertIsNone(solve_classical(G, (0, 0), "island", algorithm=algo))
+
+if __name__ == '__main__':
+    unittest.main()
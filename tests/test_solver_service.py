@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.traffic_model import predict_traffic_weights
+from backend.classical_solver import solve_classical
+from backend.solver_service import SolverService, attach_graph, TimeoutError
+from tests.test_routing import grid_city
+
+class TestSolverService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.service = SolverService(max_workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.shutdown()
+
+    def setUp(self):
+        self.G = grid_city(8)
+        self.overlay = predict_traffic_weights(self.G, "Ambulance", minute=30)
+
+    def test_shared_graph_round_trip(self):
+        handle = self.service.share(self.overlay)
+        self.assertIs(handle, self.service.share(self.overlay.graph))
+        C, G = attach_graph(handle)
+        src = self.overlay.graph
+        self.assertEqual(C.names, src.names)
+        np.testing.assert_array_equal(C.indptr, src.indptr)
+        np.testing.assert_array_equal(C.distance, src.distance)
+        self.assertEqual(G.number_of_edges(), self.G.number_of_edges())
+
+    def test_classical_job_matches_inline(self):
+        job = self.service.submit_classical(self.overlay, (0, 0), (7, 7))
+        result = self.service.result(job, timeout=60)
+        inline = solve_classical(self.overlay, (0, 0), (7, 7))
+        self.assertEqual(result["path"], inline["path"])
+        self.assertAlmostEqual(result["eta"], inline["eta"])
+        self.assertEqual(self.service.status(job), "done")
+
+    def test_plain_networkx_graph(self):
+        job = self.service.submit_classical(self.G, (0, 0), (3, 5))
+        self.assertEqual(self.service.result(job, timeout=60)["path"],
+                         solve_classical(self.G, (0, 0), (3, 5))["path"])
+
+    def test_in_place_weight_refresh_is_picked_up(self):
+        G = grid_city(8)
+        job = self.service.submit_classical(G, (0, 0), (3, 5))
+        path = self.service.result(job, timeout=60)["path"]
+        # Jam the old route the way refresh_edge_weights edits a graph
+        for u, v in zip(path[:-1], path[1:]):
+            G[u][v]['weight'] *= 20
+        G.graph["weights_version"] = 1
+        job = self.service.submit_classical(G, (0, 0), (3, 5))
+        self.assertEqual(self.service.result(job, timeout=60)["path"], solve_classical(G, (0, 0), (3, 5))["path"])
+
+    def test_solve_returns_classical_before_deadline(self):
+        classical, quantum, job = self.service.solve(self.overlay, (0, 0), (7, 7), deadline=0)
+        self.assertEqual(classical["path"][0], (0, 0))
+        self.assertIsNone(quantum)
+        with self.assertRaises(TimeoutError):
+            self.service.result(job, timeout=0)
+        quantum = self.service.result(job, timeout=120)
+        self.assertEqual(quantum["path"][0], (0, 0))
+        self.assertEqual(quantum["path"][-1], (7, 7))
+        self.assertGreaterEqual(quantum["eta"], classical["eta"] - 1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
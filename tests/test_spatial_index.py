@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.city_graph import create_city_graph
+from backend.geodesy import distance_km
+from backend.spatial_index import KDTree, SpatialIndex, get_spatial_index
+from tests.test_routing import grid_city
+
+class TestKDTree(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(2)
+        pts = rng.uniform(0, 100, size=(5000, 2))
+        tree = KDTree(pts)
+        for q in rng.uniform(-10, 110, size=(200, 2)):
+            d, i = tree.query(q)
+            brute = np.hypot(*(pts - q).T)
+            self.assertAlmostEqual(d, brute.min())
+            self.assertEqual(sorted(tree.query_ball_point(q, 7.5)), sorted(np.nonzero(brute <= 7.5)[0].tolist()))
+
+class TestSpatialIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.G = create_city_graph()
+        self.index = SpatialIndex(self.G)
+
+    def test_nearest_node(self):
+        name, dist = self.index.nearest_node(16.5010, 80.6540)
+        self.assertEqual(name, "Benz Circle")
+        self.assertAlmostEqual(dist, float(distance_km((16.5010, 80.6540), self.G.nodes[name]['pos'])))
+        rng = np.random.default_rng(4)
+        for lat, lon in rng.uniform([16.48, 80.58], [16.54, 80.71], size=(50, 2)):
+            _, dist = self.index.nearest_node(lat, lon)
+            brute = min(float(distance_km((lat, lon), p)) for _, p in self.G.nodes(data='pos'))
+            self.assertAlmostEqual(dist, brute, places=9)
+
+    def test_nearest_edge_on_segment(self):
+        G = grid_city(20)
+        index = SpatialIndex(G)
+        a, b = G.nodes[(3, 4)]['pos'], G.nodes[(3, 5)]['pos']
+        point = (a[0] + 0.0004, a[1] + 0.3 * (b[1] - a[1]))
+        u, v, t, snapped, dist = index.nearest_edge(*point)
+        self.assertEqual({u, v}, {(3, 4), (3, 5)})
+        self.assertAlmostEqual(t if u == (3, 4) else 1 - t, 0.3, places=2)
+        self.assertLess(dist, 0.05)
+
+    def test_index_is_cached_per_graph(self):
+        self.assertIs(get_spatial_index(self.G), get_spatial_index(self.G))
+        self.assertIsNot(get_spatial_index(self.G), get_spatial_index(create_city_graph()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.traffic_model import predict_traffic_weights, get_traffic_engine
+from backend.classical_solver import solve_classical
+from backend.time_dependent import (TravelTimeProfile, get_travel_time_profile, solve_time_dependent, td_shortest_path,
+                                    BUCKET_MINUTES, HORIZON_MINUTES)
+from tests.test_routing import grid_city
+
+class TestTimeDependentRouting(unittest.TestCase):
+
+    def setUp(self):
+        self.G = grid_city(10)
+        self.names = list(self.G.nodes())
+
+    def test_profile_samples_match_forecast_buckets(self):
+        profile = get_travel_time_profile(self.G, "Ambulance", minute=500)
+        self.assertIs(profile, get_travel_time_profile(self.G, "Ambulance", minute=500))
+        self.assertEqual(profile.horizon, HORIZON_MINUTES)
+        for k in (0, 3, len(profile.samples) - 1):
+            pred = predict_traffic_weights(self.G, "Ambulance", time_offset=k * BUCKET_MINUTES, minute=500)
+            np.testing.assert_array_equal(profile.samples[k], pred.weight)
+        # FIFO: entering an edge later never means leaving it earlier
+        self.assertTrue((profile.weights[:-1] <= profile.weights[1:] + BUCKET_MINUTES + 1e-9).all())
+
+    def test_interpolation(self):
+        engine = get_traffic_engine(self.G)
+        samples = np.array([[10.0, 2.0], [20.0, 2.0], [20.0, 4.0]])
+        profile = TravelTimeProfile(engine.graph, "Custom", 0, samples)
+        self.assertEqual(profile.travel_time(0, 0), 10.0)
+        self.assertAlmostEqual(profile.travel_time(0, 2.5), 15.0)
+        self.assertAlmostEqual(profile.travel_time(1, 7.5), 3.0)
+        self.assertEqual(profile.travel_time(1, 99), 4.0)
+        np.testing.assert_allclose(profile.at(2.5).weight, [15.0, 2.0])
+
+    def test_constant_profile_matches_static_route(self):
+        C = get_traffic_engine(self.G).graph
+        profile = TravelTimeProfile(C, "Custom", 0, np.vstack([C.weight] * 13))
+        s, t = self.names[0], self.names[-1]
+        path, arrive, _ = td_shortest_path(profile, C.node_id(s), C.node_id(t))
+        self.assertAlmostEqual(arrive, solve_classical(self.G, s, t)["eta"], places=2)
+
+    def test_td_astar_matches_td_dijkstra(self):
+        for s, t in ((self.names[0], self.names[-1]), (self.names[7], self.names[62])):
+            a = solve_time_dependent(self.G, s, t, "Fire Brigade", minute=42)
+            d = solve_time_dependent(self.G, s, t, "Fire Brigade", minute=42, algorithm="dijkstra")
+            self.assertAlmostEqual(a["eta"], d["eta"], places=6)
+            self.assertLessEqual(a["nodes_settled"], d["nodes_settled"])
+            self.assertAlmostEqual(a["arrivals"][-1], a["eta"], places=1)
+            # The static minute-zero route priced in time can only be slower
+            static = solve_classical(predict_traffic_weights(self.G, "Fire Brigade", minute=42), s, t)
+            profile = get_travel_time_profile(self.G, "Fire Brigade", minute=42)
+            self.assertLessEqual(a["eta"], profile.path_eta(static["path"])[-1] + 1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import sys
+import os
+import random
+
+import numpy as np
+
+# Add root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.city_graph import create_city_graph
+from backend.traffic_model import (predict_traffic, predict_traffic_weights, get_traffic_engine,
+                                   PRIORITY_FACTORS)
+
+class TestTrafficEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.G = create_city_graph()
+
+    def test_deterministic_within_minute(self):
+        a = predict_traffic_weights(self.G, "Ambulance", minute=1000)
+        b = predict_traffic_weights(self.G, "Ambulance", minute=1000)
+        c = predict_traffic_weights(self.G, "Ambulance", minute=1001)
+        np.testing.assert_array_equal(a.weight, b.weight)
+        self.assertFalse(np.array_equal(a.weight, c.weight))
+        np.testing.assert_array_equal(a.weight, predict_traffic_weights(self.G, "Ambulance", time_offset=1, minute=999).weight)
+
+    def test_global_random_untouched(self):
+        random.seed(42)
+        expected = [random.random() for _ in range(3)]
+        random.seed(42)
+        predict_traffic(self.G, "Fire Brigade")
+        self.assertEqual([random.random() for _ in range(3)], expected)
+
+    def test_weights_within_model_bounds(self):
+        engine = get_traffic_engine(self.G)
+        self.assertIs(engine, get_traffic_engine(self.G))
+        for e_type, factor in PRIORITY_FACTORS.items():
+            pred = engine.predict(e_type, minute=5)
+            upper = 1.8 + (0.5 if e_type == "Fire Brigade" else 0)
+            low = engine.base * engine.hub_penalty * 0.8 * factor
+            high = engine.base * engine.hub_penalty * upper * factor
+            self.assertTrue(np.all(pred.weight >= np.round(low, 2)))
+            self.assertTrue(np.all(pred.weight <= np.round(high, 2)))
+            expected = np.where(pred.ratio > 2.0, "High", np.where(pred.ratio > 1.3, "Medium", "Low"))
+            np.testing.assert_array_equal(pred.status, expected)
+
+    def test_predict_traffic_compat(self):
+        H, stats = predict_traffic(self.G, "Ambulance")
+        self.assertEqual(len(stats), self.G.number_of_edges())
+        for (u, v), d in stats.items():
+            self.assertEqual(H[u][v]['weight'], d['predicted'])
+            self.assertEqual(H[u][v]['congestion_level'], d['status'])
+            self.assertEqual(self.G[u][v]['weight'], self.G[u][v]['base_weight'])  # input untouched
+
+if __name__ == '__main__':
+    unittest.main()